@@ -0,0 +1,110 @@
+"""
+Benchmark the parse time of the supported configuration source formats.
+
+Generates a synthetic configuration with a number of step namespaces, each holding a
+list of items, serializes it in every registered format and reports the time to parse
+the document, and to fully convert and substitute it.
+
+Usage:
+
+    python benchmarks/source_formats.py [--namespaces 50] [--items 200] [--repeat 5]
+"""
+
+import argparse
+import json
+import timeit
+
+import yaml
+
+from django_setup_configuration.sources import SOURCE_FORMATS
+
+
+def build_config(namespaces: int, items: int) -> dict:
+    return {
+        key: value
+        for i in range(namespaces)
+        for key, value in (
+            (f"step_{i}_enabled", i % 2 == 0),
+            (
+                f"step_{i}",
+                {
+                    "items": [
+                        {"name": f"item-{i}-{j}", "value": j, "enabled": j % 3 == 0}
+                        for j in range(items)
+                    ]
+                },
+            ),
+        )
+    }
+
+
+def to_toml(config: dict) -> str:
+    # Minimal emitter for the fixed shape produced by `build_config`, to avoid a
+    # dependency on a TOML writer
+    lines = [
+        f"{key} = {json.dumps(value)}"
+        for key, value in config.items()
+        if isinstance(value, bool)
+    ]
+    for key, value in config.items():
+        if isinstance(value, bool):
+            continue
+        for item in value["items"]:
+            lines.append(f"[[{key}.items]]")
+            lines.extend(
+                f"{item_key} = {json.dumps(item_value)}"
+                for item_key, item_value in item.items()
+            )
+    return "\n".join(lines) + "\n"
+
+
+SERIALIZERS = {
+    "yaml": lambda config: yaml.safe_dump(config, sort_keys=False),
+    "json": json.dumps,
+    "toml": to_toml,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--namespaces", type=int, default=50)
+    parser.add_argument("--items", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    config = build_config(args.namespaces, args.items)
+    print(
+        f"{args.namespaces} namespaces x {args.items} items, "
+        f"best of {args.repeat} runs\n"
+    )
+    print(f"{'format':<8}{'size (kB)':>12}{'parse (ms)':>14}{'convert all (ms)':>20}")
+
+    for name, source_format in SOURCE_FORMATS.items():
+        if (serialize := SERIALIZERS.get(name)) is None:
+            continue
+
+        content = serialize(config).encode("utf-8")
+        assert source_format.parse(content).to_dict() == config
+
+        parse_time = min(
+            timeit.repeat(
+                lambda fmt=source_format, c=content: fmt.parse(c),
+                number=1,
+                repeat=args.repeat,
+            )
+        )
+        convert_time = min(
+            timeit.repeat(
+                lambda fmt=source_format, c=content: fmt.parse(c).to_dict(),
+                number=1,
+                repeat=args.repeat,
+            )
+        )
+        print(
+            f"{name:<8}{len(content) / 1024:>12.1f}"
+            f"{parse_time * 1000:>14.1f}{convert_time * 1000:>20.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
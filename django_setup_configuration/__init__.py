@@ -1,5 +1,31 @@
-from .configuration import BaseConfigurationStep
-from .fields import DjangoModelRef
-from .models import ConfigurationModel
+from importlib import import_module
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .configuration import BaseConfigurationStep
+    from .configuration_models import ConfigurationModel
+    from .fields import DjangoModelRef
 
 __all__ = ["DjangoModelRef", "BaseConfigurationStep", "ConfigurationModel"]
+
+# The public API is imported on first access, because importing it pulls in pydantic
+# and the Django model layer, which would otherwise slow down every `manage.py`
+# invocation through INSTALLED_APPS
+_LAZY_EXPORTS = {
+    "DjangoModelRef": ".fields",
+    "BaseConfigurationStep": ".configuration",
+    "ConfigurationModel": ".configuration_models",
+}
+
+
+def __getattr__(name: str):
+    if module_name := _LAZY_EXPORTS.get(name):
+        value = getattr(import_module(module_name, __name__), name)
+        globals()[name] = value
+        return value
+
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__))
@@ -3,3 +3,4 @@ from django.apps import AppConfig
 
 class DjangoSetupConfigurationConfig(AppConfig):
     name = "django_setup_configuration"
+    default_auto_field = "django.db.models.BigAutoField"
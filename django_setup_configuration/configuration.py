@@ -1,8 +1,12 @@
 from abc import ABC, abstractmethod
-from typing import Generic, TypeVar
+from collections.abc import Hashable, Iterable
+from typing import TYPE_CHECKING, Any, Generic, TypeVar
 
+from django_setup_configuration.configuration_models import ConfigurationModel
 from django_setup_configuration.exceptions import ConfigurationException
-from django_setup_configuration.models import ConfigurationModel
+
+if TYPE_CHECKING:
+    from django_setup_configuration.context import PrefetchRequest, RunContext
 
 TConfigModel = TypeVar("TConfigModel", bound=ConfigurationModel)
 
@@ -18,6 +22,11 @@ class BaseConfigurationStep(ABC, Generic[TConfigModel]):
             information about Django model fields
         namespace (`str`): the namespace of configuration variables for a given
             configuration
+        context (`RunContext | None`): the state shared by the steps of a run, which
+            is set by the runner while the step is executed
+        timeout (`float | None`): the maximum number of seconds the step may take to
+            execute, see `SetupConfigurationRunner`. Must be positive. Defaults to the
+            runner's `step_timeout`.
 
     Example:
         ```python
@@ -40,6 +49,8 @@ class BaseConfigurationStep(ABC, Generic[TConfigModel]):
     config_model: type[TConfigModel]
     namespace: str
     enable_setting: str
+    context: "RunContext | None" = None
+    timeout: float | None = None
 
     def __init__(self):
         for attr in (
@@ -65,3 +76,109 @@ class BaseConfigurationStep(ABC, Generic[TConfigModel]):
         if the configuration has an error
         """
         ...
+
+    def get_prefetch_requests(self, model: TConfigModel) -> list["PrefetchRequest"]:
+        """
+        Declare the objects which the step needs, e.g. the users matching the usernames
+        in the configuration.
+
+        The runner fetches the declared objects in bulk before the step is executed,
+        merging the requests of all steps which target the same table, and registers
+        them in `self.context.identity_map`. Objects which do not exist are not
+        registered. Note that an object may have been changed by a preceding step,
+        unless that step registered it in the identity map as well.
+
+        Returns:
+            list[PrefetchRequest]: The objects to prefetch, none by default.
+        """
+        return []
+
+    def plan(self, model: TConfigModel) -> list[str] | None:
+        """
+        Describe the changes that executing the step would make, without making them.
+
+        Returns:
+            list[str] | None: A description of each change, or None if the step does
+                not support planning.
+        """
+        return None
+
+    def diff(self, model: TConfigModel) -> list[str] | None:
+        """
+        Compare the configuration to the current state of the database, to detect
+        changes made by other means than the step (drift).
+
+        The comparison must be read-only, and is not run in a transaction, so it should
+        use as few (bulk) queries as possible.
+
+        Returns:
+            list[str] | None: A description of each difference, or None if the step
+                does not support drift detection.
+        """
+        return None
+
+    def export(self) -> dict[str, Any] | None:
+        """
+        Return the current state of the database as configuration data for the step.
+
+        By default, the data is derived from the `DjangoModelRef` fields of the list
+        fields of `config_model`, see `django_setup_configuration.export.
+        get_model_export`. Lists of items may be returned as lazy iterators, so that
+        they can be exported incrementally.
+
+        Returns:
+            dict[str, Any] | None: The configuration data, which must be valid for
+                `config_model`, or None if the step does not support exporting.
+        """
+        from django_setup_configuration.export import get_model_export
+
+        return get_model_export(self.config_model)
+
+
+class ShardableConfigurationStep(BaseConfigurationStep[TConfigModel]):
+    """
+    A configuration step which applies a list of independent items, and can optionally
+    be executed in shards across worker processes.
+
+    If `shards` is more than 1, the runner partitions the items by a hash of their
+    natural key (see `get_item_key`), and calls `execute_items` for each partition in
+    a separate worker process. Each worker uses its own database connection and
+    transaction, so the changes of a shard are committed independently: they are not
+    rolled back if another step (or shard) fails, and the workers cannot see the
+    uncommitted changes of preceding steps. If other steps were executed before it in
+    the same run, the step is executed in the runner's process and transaction
+    instead, as the workers could wait for the locks held by that transaction.
+
+    Attributes:
+        shards (`int`): the number of shards to split the items into. Defaults to 1,
+            i.e. the step is executed in the runner's process and transaction.
+    """
+
+    shards: int = 1
+
+    @abstractmethod
+    def get_items(self, model: TConfigModel) -> Iterable[Any]:
+        """
+        Return the items to apply from the step's configuration.
+        """
+        ...
+
+    @abstractmethod
+    def get_item_key(self, item: Any) -> Hashable:
+        """
+        Return the natural key of an item, which determines the shard it belongs to.
+        """
+        ...
+
+    @abstractmethod
+    def execute_items(self, model: TConfigModel, items: list[Any]) -> None:
+        """
+        Apply a subset of the items.
+
+        :raises: :class: `django_setup_configuration.exceptions.ConfigurationRunFailed`
+        if the configuration has an error
+        """
+        ...
+
+    def execute(self, model: TConfigModel) -> None:
+        self.execute_items(model, list(self.get_items(model)))
@@ -0,0 +1,138 @@
+import threading
+from typing import Any
+
+from pydantic import BaseModel
+from pydantic.fields import FieldInfo
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+from django_setup_configuration.fields import (
+    UNMAPPED_DJANGO_FIELD,
+    DjangoModelRef,
+    DjangoModelRefInfo,
+)
+
+_resolve_lock = threading.RLock()
+
+
+class DjangoRefsMetaclass(BaseModel.__class__):  # type: ignore
+    """
+    A custom Pydantic metaclass to derive annotations from `DjangoModelRef` fields.
+
+    This metaclass is required to define DjangoModelRef without explicit
+    annotations, instead taking the type from the underlying Django model field.
+    Do not use this directly: instead, using `ConfigurationModel`.
+
+    The Django fields are not resolved when the class is created, which would require
+    the Django app registry to be ready. Instead, the fields are collected with a
+    placeholder annotation, and resolved the first time the model's fields are
+    accessed or its schema is built (see `ConfigurationModel`).
+    """
+
+    def __new__(
+        cls,
+        name: str,
+        bases: tuple[type[Any], ...],
+        namespace: dict[str, Any],
+        *args,
+        **kwargs: Any,
+    ):
+        annotations = namespace.setdefault("__annotations__", {})
+
+        if meta := namespace.get("Meta", None):
+            extra_kwargs = getattr(meta, "extra_kwargs", {})
+            if django_model_refs := getattr(meta, "django_model_refs", None):
+                if not isinstance(django_model_refs, dict):
+                    raise ValueError("`django_model_refs` must be a dict")
+
+                for model_cls, fields in django_model_refs.items():
+                    for field in fields:
+                        field_kwargs = extra_kwargs.get(field, {})
+                        namespace[field] = DjangoModelRef(
+                            model_cls, field, **field_kwargs
+                        )
+
+        # Maps attribute names to their DjangoModelRefInfo, and whether the annotation
+        # should be inferred from the Django field upon resolution
+        refs: dict[str, tuple[DjangoModelRefInfo, bool]] = {}
+        for base in reversed(bases):
+            refs.update(getattr(base, "__django_model_refs__", {}))
+        for key in annotations.keys() | namespace.keys():
+            refs.pop(key, None)
+
+        for key, value in namespace.items():
+            if isinstance(value, DjangoModelRefInfo):
+                infer_annotation = key not in annotations
+                if infer_annotation:
+                    annotations[key] = Any
+
+                refs[key] = (value, infer_annotation)
+
+        new_cls = super().__new__(cls, name, bases, namespace, *args, **kwargs)
+        new_cls.__django_model_refs__ = refs
+        new_cls.__django_model_refs_resolved__ = not refs
+        return new_cls
+
+    # Pydantic >= 2.10 stores the fields in `__pydantic_fields__` and exposes them
+    # through a `model_fields` property, which is what allows overriding it here
+    @property
+    def model_fields(cls) -> dict[str, FieldInfo]:
+        cls.resolve_django_model_refs()
+        return getattr(cls, "__pydantic_fields__", {})
+
+    def resolve_django_model_refs(cls) -> None:
+        """
+        Resolve the `DjangoModelRef` fields of the model, if not resolved already.
+
+        Raises:
+            ValueError: If a type can not be inferred for a field, and the field does
+                not have an explicit annotation.
+        """
+        if cls.__dict__.get("__django_model_refs_resolved__", True):
+            return
+
+        with _resolve_lock:
+            if cls.__django_model_refs_resolved__:
+                return
+
+            fields = cls.__pydantic_fields__
+            for key, (ref, infer_annotation) in cls.__django_model_refs__.items():
+                ref.resolve()
+                if not infer_annotation:
+                    annotation = fields[key].annotation
+                elif ref.python_type is UNMAPPED_DJANGO_FIELD:
+                    # We were unable to map this type, and the user did not override
+                    # the annotation. Raise an exception and prompt to user to add one.
+                    raise ValueError(
+                        f"We could not infer a type for attribute `{key}` with "
+                        f"Django field type {type(ref.django_field)}. Please "
+                        "add an explicit type annotation."
+                    )
+                else:
+                    annotation = ref.python_type
+
+                fields[key] = FieldInfo.from_annotated_attribute(annotation, ref)
+
+            cls.__django_model_refs_resolved__ = True
+
+
+class ConfigurationModel(BaseSettings, metaclass=DjangoRefsMetaclass):
+    """
+    A base for defining configuration settings to be used in a BaseConfigurationStep.
+
+    The validation schema of the model (and the types of its `DjangoModelRef` fields)
+    is only built the first time the model is used.
+    """
+
+    model_config = SettingsConfigDict(extra="forbid", defer_build=True)
+
+    @classmethod
+    def model_rebuild(cls, **kwargs) -> bool | None:
+        cls.resolve_django_model_refs()
+        return super().model_rebuild(**kwargs)
+
+    @classmethod
+    def __get_pydantic_core_schema__(cls, source, handler, /):
+        # Called when the schema is built for this model, including when it is nested
+        # in another model, in which case `model_rebuild` is not necessarily called
+        cls.resolve_django_model_refs()
+        return handler(source)
@@ -0,0 +1,212 @@
+from collections import defaultdict
+from collections.abc import Hashable, Iterable
+from dataclasses import dataclass, field
+from typing import Any, TypeVar
+
+from django.db import models
+
+TModel = TypeVar("TModel", bound=models.Model)
+
+IDENTITY_MAP_CHUNK_SIZE = 2000
+PREFETCH_BATCH_SIZE = 1000
+
+
+@dataclass(frozen=True)
+class PrefetchRequest:
+    """
+    A declaration of the objects of `model` whose `key_field` is one of `values`.
+
+    Steps return these from `BaseConfigurationStep.get_prefetch_requests`, so that the
+    runner can fetch the objects in bulk before the steps are executed, and register
+    them in the identity map of the run under `key_field`.
+    """
+
+    model: type[models.Model]
+    key_field: str
+    values: frozenset[Hashable] = field(default_factory=frozenset)
+
+    def __post_init__(self):
+        # Allow any iterable of values, while keeping the request hashable
+        object.__setattr__(self, "values", frozenset(self.values))
+
+
+class IdentityMap:
+    """
+    A cache of model instances, keyed by their model and a natural key.
+
+    A natural key consists of one or more fields, which are passed as keyword
+    arguments, e.g. `identity_map.lookup(Site, domain="example.com")`. An object can
+    be registered under several natural keys (e.g. a user by username and by email).
+
+    Example:
+        ```python
+        # A step registers the objects it created or fetched
+        identity_map.prefetch(Group.objects.filter(name__in=names), "name")
+        identity_map.add(site, "domain")
+
+        # A later step resolves them without queries
+        group = identity_map.get(Group, name="Editors")
+        ```
+    """
+
+    def __init__(self):
+        self._objects: dict[tuple[str, tuple[str, ...], tuple], models.Model] = {}
+        self._prefetched: set[PrefetchRequest] = set()
+        # The ids of the objects handed out or registered since the last `savepoint`
+        self._used: set[int] = set()
+
+    @staticmethod
+    def _make_key(
+        model: type[models.Model], natural_key: dict[str, Hashable]
+    ) -> tuple[str, tuple[str, ...], tuple]:
+        if not natural_key:
+            raise ValueError("Provide at least one natural key field")
+
+        fields = tuple(sorted(natural_key))
+        return (
+            model._meta.concrete_model._meta.label_lower,
+            fields,
+            tuple(natural_key[name] for name in fields),
+        )
+
+    def __len__(self) -> int:
+        return len(self._objects)
+
+    def add(self, obj: models.Model, *key_fields: str) -> None:
+        """
+        Register an object under the natural key consisting of `key_fields`.
+        """
+        natural_key = {name: getattr(obj, name) for name in key_fields}
+        self._objects[self._make_key(type(obj), natural_key)] = obj
+        self._used.add(id(obj))
+
+    def prefetch(
+        self,
+        queryset: models.QuerySet,
+        *key_fields: str,
+        chunk_size: int = IDENTITY_MAP_CHUNK_SIZE,
+    ) -> list[models.Model]:
+        """
+        Fetch the objects of `queryset` with a single query, and register them under
+        the natural key consisting of `key_fields`.
+
+        Returns:
+            list[Model]: The fetched objects.
+        """
+        objects = list(queryset.iterator(chunk_size=chunk_size))
+        for obj in objects:
+            self.add(obj, *key_fields)
+        return objects
+
+    def lookup(self, model: type[TModel], **natural_key: Hashable) -> TModel | None:
+        """
+        Return the registered object with the natural key, or None.
+        """
+        obj = self._objects.get(self._make_key(model, natural_key))
+        if obj is not None:
+            self._used.add(id(obj))
+        return obj
+
+    def get(self, model: type[TModel], **natural_key: Hashable) -> TModel:
+        """
+        Return the registered object with the natural key, fetching and registering
+        it if it was not registered yet.
+
+        Raises:
+            Model.DoesNotExist: If the object does not exist.
+        """
+        if (obj := self.lookup(model, **natural_key)) is None:
+            obj = model._default_manager.get(**natural_key)
+            self.add(obj, *natural_key)
+        return obj
+
+    def prefetch_requests(
+        self,
+        requests: Iterable[PrefetchRequest],
+        *,
+        batch_size: int = PREFETCH_BATCH_SIZE,
+    ) -> int:
+        """
+        Fetch and register the objects declared by `requests`.
+
+        Requests for the same model and key field (e.g. of different steps) are merged,
+        so each table is queried once per `batch_size` values. Requests which were
+        fetched before, and values which are already registered, are skipped.
+
+        Returns:
+            int: The number of objects fetched.
+        """
+        values_by_target: dict[tuple[type[models.Model], str], set] = defaultdict(set)
+        for request in requests:
+            if request in self._prefetched:
+                continue
+
+            self._prefetched.add(request)
+            model = request.model._meta.concrete_model
+            values_by_target[(model, request.key_field)].update(request.values)
+
+        fetched = 0
+        for (model, key_field), values in values_by_target.items():
+            missing = [
+                value
+                for value in values
+                if self.lookup(model, **{key_field: value}) is None
+            ]
+            for start in range(0, len(missing), batch_size):
+                queryset = model._default_manager.filter(
+                    **{f"{key_field}__in": missing[start : start + batch_size]}
+                )
+                fetched += len(self.prefetch(queryset, key_field))
+        return fetched
+
+    def copy(self) -> "IdentityMap":
+        identity_map = IdentityMap()
+        identity_map._objects = self._objects.copy()
+        identity_map._prefetched = self._prefetched.copy()
+        return identity_map
+
+    def savepoint(self) -> "IdentityMap":
+        """
+        Return a copy of the map to restore with `rollback`, and start tracking the
+        objects which are handed out or registered from now on.
+        """
+        self._used = set()
+        return self.copy()
+
+    def rollback(self, savepoint: "IdentityMap") -> "IdentityMap":
+        """
+        Return the map as it was at `savepoint`, without the objects which were
+        handed out or registered since. These may have been modified in memory by
+        the changes which were rolled back, so they are fetched again when needed.
+        """
+        identity_map = IdentityMap()
+        identity_map._objects = {
+            key: obj
+            for key, obj in savepoint._objects.items()
+            if id(obj) not in self._used
+        }
+        # The dropped objects are not fetched again for the requests which were
+        # fetched before
+        if len(identity_map) == len(savepoint):
+            identity_map._prefetched = savepoint._prefetched.copy()
+        return identity_map
+
+
+class RunContext:
+    """
+    State shared by the steps of a single run of `SetupConfigurationRunner`.
+
+    The context is available to a step as `self.context` while it is executed (except
+    in the worker processes of sharded steps).
+
+    Attributes:
+        identity_map (`IdentityMap`): the objects created or fetched by the steps, so
+            that later steps can resolve them without queries. If a step fails, the
+            objects it registered or looked up are discarded along with its database
+            changes, as it may have modified them in memory.
+        data (`dict`): arbitrary values shared between steps
+    """
+
+    def __init__(self):
+        self.identity_map = IdentityMap()
+        self.data: dict[str, Any] = {}
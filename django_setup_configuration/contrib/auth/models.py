@@ -1,6 +1,12 @@
+from typing import Annotated
+
 from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+
+from pydantic import Field, StringConstraints
 
-from django_setup_configuration.models import ConfigurationModel
+from django_setup_configuration.configuration_models import ConfigurationModel
+from django_setup_configuration.fields import StreamedList
 
 User = get_user_model()
 
@@ -26,4 +32,42 @@ class UserConfigurationItem(ConfigurationModel):
 
 
 class UserConfigurationModel(ConfigurationModel):
-    users: list[UserConfigurationItem]
+    users: StreamedList[UserConfigurationItem]
+    prune: bool = Field(
+        default=False,
+        description="Delete the users which were configured by this step before, but "
+        "were removed from the list of users since.",
+    )
+    only_changed: bool = Field(
+        default=False,
+        description="Only update the users which were added or changed in the "
+        "configuration since the last run, or which no longer exist. Changes made to "
+        "the other users by other means (e.g. in the admin) are not reverted.",
+    )
+
+
+# A permission as `app_label.codename`
+PermissionLabel = Annotated[str, StringConstraints(pattern=r"^[^.]+\..+$")]
+
+
+class GroupConfigurationItem(ConfigurationModel):
+    permissions: list[PermissionLabel] = Field(
+        default_factory=list,
+        description="The permissions of the group, as `app_label.codename`. Any "
+        "other permissions of the group are removed.",
+        examples=[["auth.view_user", "sites.change_site"]],
+    )
+    users: list[str] | None = Field(
+        default=None,
+        description="The users (by their username field) which are the members of "
+        "the group. Any other members are removed from the group. If omitted, the "
+        "members of the group are not changed.",
+        examples=[["admin"]],
+    )
+
+    class Meta:
+        django_model_refs = {Group: ("name",)}
+
+
+class GroupConfigurationModel(ConfigurationModel):
+    groups: list[GroupConfigurationItem]
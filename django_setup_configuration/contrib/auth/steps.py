@@ -1,19 +1,82 @@
+import itertools
 import warnings
+from collections import defaultdict
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from functools import partial
+from typing import Any
 
 from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group, Permission
+from django.db import models
 
 from django_setup_configuration.configuration import BaseConfigurationStep
+from django_setup_configuration.context import IdentityMap, PrefetchRequest
+from django_setup_configuration.contrib.sync.prune import (
+    PRUNE_BATCH_SIZE,
+    delete_in_batches,
+)
+from django_setup_configuration.contrib.sync.steps import iter_chunks
+from django_setup_configuration.exceptions import ConfigurationRunFailed
+from django_setup_configuration.export import EXPORT_CHUNK_SIZE
+from django_setup_configuration.journal import (
+    JournalChanges,
+    StepJournal,
+    get_item_digest,
+)
 
-from .models import UserConfigurationModel
+from .models import GroupConfigurationModel, UserConfigurationModel
 
 User = get_user_model()
 
+# The environment variable providing the password of all exported users. The
+# password is only used for the users that do not exist yet, so one is sufficient.
+EXPORTED_PASSWORD_ENV = "SETUP_CONFIGURATION_EXPORTED_PASSWORD"
+
+
+def _fetch_unregistered(
+    identity_map: IdentityMap,
+    model: type[models.Model],
+    key_field: str,
+    values: Iterable[str],
+    *,
+    batch_size: int,
+) -> None:
+    """
+    Fetch and register the objects with the natural keys `values` which are not
+    registered in the identity map yet, `batch_size` keys per query.
+    """
+    missing = [
+        value
+        for value in values
+        if identity_map.lookup(model, **{key_field: value}) is None
+    ]
+    for chunk in iter_chunks(missing, batch_size):
+        identity_map.prefetch(
+            model._default_manager.filter(**{f"{key_field}__in": chunk}), key_field
+        )
+
 
 class UserConfigurationStep(BaseConfigurationStep):
     """
     Creates or updates one or more default users based on
     YAML settings. Note that a provided password
     will only be used if the user does not exist yet.
+
+    If `only_changed` is enabled, only the users which were added or changed in the
+    configuration since the last run (or which no longer exist) are applied, see
+    `StepJournal`.
+
+    If `prune` is enabled, the users which were configured by this step before, but
+    were removed from the configuration since, are deleted, `prune_batch_size` at a
+    time. Other users are never deleted. Use `--plan` to review them first.
+
+    The users are validated once per run, while comparing them to the journal (see
+    `StreamedList`), and the existing users are fetched in batches along the way.
+
+    When exported, the passwords of the users are replaced with the required
+    `value_from` environment variable `EXPORTED_PASSWORD_ENV`, which is shared by all
+    users, so the exported configuration cannot be applied without providing it.
     """
 
     verbose_name = "User Configuration Step"
@@ -21,11 +84,154 @@ class UserConfigurationStep(BaseConfigurationStep):
     config_model = UserConfigurationModel
     namespace = "default_user_configuration_config"
 
-    def execute(self, model):
+    prune_batch_size = PRUNE_BATCH_SIZE
+
+    def _get_changes(
+        self, model: UserConfigurationModel, identity_map: IdentityMap | None = None
+    ) -> tuple[StepJournal, JournalChanges]:
+        username_field = get_user_model().USERNAME_FIELD
+
+        def get_existing_keys(keys):
+            if identity_map is not None:
+                # Registers the users, so they are not fetched again when applied
+                _fetch_unregistered(
+                    identity_map,
+                    User,
+                    username_field,
+                    keys,
+                    batch_size=self.prune_batch_size,
+                )
+                return [
+                    key
+                    for key in keys
+                    if identity_map.lookup(User, **{username_field: key})
+                ]
+
+            return User.objects.filter(**{f"{username_field}__in": keys}).values_list(
+                username_field, flat=True
+            )
+
+        journal = StepJournal.for_step(self)
+        changes = journal.get_changes(
+            model.users,
+            key=lambda user_item: getattr(user_item, username_field),
+            get_existing_keys=get_existing_keys,
+            # The digests are unsalted, and the other fields are stored in the user
+            # table, so a digest including the password would reveal it. It is only
+            # used for new users, so changing it does not have to be detected.
+            digest=partial(get_item_digest, exclude={"password"}),
+        )
+        return journal, changes
+
+    def _get_prunable(self, removed_keys: Iterable[str]) -> list[tuple[int, str]]:
+        username_field = get_user_model().USERNAME_FIELD
+        removed = iter(removed_keys)
+
+        prunable = []
+        while batch := list(itertools.islice(removed, self.prune_batch_size)):
+            prunable += User.objects.filter(
+                **{f"{username_field}__in": batch}
+            ).values_list("pk", username_field)
+        return prunable
+
+    def plan(self, model: UserConfigurationModel) -> list[str]:
+        _, changes = self._get_changes(model)
+        username_field = get_user_model().USERNAME_FIELD
+
+        plan = [
+            f"Create user {getattr(user_item, username_field)}"
+            for user_item in changes.added
+        ]
+        plan += [
+            f"Update user {getattr(user_item, username_field)}"
+            for user_item in changes.changed
+        ]
+        if not model.only_changed and changes.unchanged:
+            plan.append(
+                f"Update {changes.unchanged_count} unchanged users, reverting any "
+                "changes made by other means"
+            )
+        if model.prune:
+            plan += [
+                f"Delete user {username}"
+                for _, username in self._get_prunable(changes.removed)
+            ]
+        return plan
+
+    def diff(self, model: UserConfigurationModel) -> list[str]:
+        username_field = get_user_model().USERNAME_FIELD
+        fields = ["email", "username", "is_staff", "is_superuser"]
+
+        differences = []
+        usernames = set()
+        for chunk in iter_chunks(model.users, self.prune_batch_size):
+            usernames.update(getattr(user_item, username_field) for user_item in chunk)
+            existing = {
+                values[username_field]: values
+                for values in User.objects.filter(
+                    **{
+                        f"{username_field}__in": [
+                            getattr(user_item, username_field) for user_item in chunk
+                        ]
+                    }
+                ).values(*fields)
+            }
+            for user_item in chunk:
+                username_value = getattr(user_item, username_field)
+                if (values := existing.get(username_value)) is None:
+                    differences.append(f"User {username_value} is missing")
+                    continue
+
+                differences += [
+                    f"User {username_value}: {name} is {values[name]!r}, expected "
+                    f"{getattr(user_item, name)!r}"
+                    for name in fields
+                    if values[name] != getattr(user_item, name)
+                ]
+
+        if model.prune:
+            # Rather than `_get_changes`, which would validate the users again
+            removed = StepJournal.for_step(self).get_removed_keys(usernames)
+            differences += [
+                f"User {username} is not in the configuration"
+                for _, username in self._get_prunable(removed)
+            ]
+        return differences
 
-        for user_item in model.users:
-            User = get_user_model()
-            username_field = User.USERNAME_FIELD
+    def export(self) -> dict | None:
+        if (data := super().export()) is None:
+            return None
+
+        # Passwords are not exported. A well-known placeholder would become the
+        # password of the users created from the export, so require a secret instead.
+        data["users"] = (
+            {
+                **user,
+                "password": {"value_from": {"env": EXPORTED_PASSWORD_ENV}},
+            }
+            for user in data["users"]
+        )
+        return data
+
+    def execute(self, model: UserConfigurationModel) -> None:
+        User = get_user_model()
+        username_field = User.USERNAME_FIELD
+
+        # The unchanged users were fetched while comparing them to the journal
+        identity_map = self.context.identity_map if self.context else None
+        journal, changes = self._get_changes(model, identity_map)
+        user_items = changes.pending
+        if identity_map is not None:
+            _fetch_unregistered(
+                identity_map,
+                User,
+                username_field,
+                [getattr(user_item, username_field) for user_item in user_items],
+                batch_size=self.prune_batch_size,
+            )
+        if not model.only_changed:
+            user_items += changes.unchanged
+        for user_item in user_items:
             username_value = getattr(user_item, username_field)
 
             defaults = {
@@ -39,14 +245,23 @@ class UserConfigurationStep(BaseConfigurationStep):
             if username_field != "username":
                 defaults["username"] = user_item.username
 
-            user, created = User.objects.update_or_create(
-                **{username_field: username_value}, defaults=defaults
-            )
+            if identity_map is not None and (
+                user := identity_map.lookup(User, **{username_field: username_value})
+            ):
+                for name, value in defaults.items():
+                    setattr(user, name, value)
+                user.save(update_fields=defaults)
+            else:
+                user, created = User.objects.update_or_create(
+                    **{username_field: username_value}, defaults=defaults
+                )
 
-            if created:
-                user.set_password(user_item.password)
+                if created:
+                    user.set_password(user_item.password)
+                    user.save()
 
-            user.save()
+            if identity_map is not None:
+                identity_map.add(user, username_field)
 
             if user.check_password(user_item.password):
                 warnings.warn(
@@ -55,3 +270,306 @@ class UserConfigurationStep(BaseConfigurationStep):
                     "Make sure to change the password in the admin panel.\n\n",
                     stacklevel=2,
                 )
+
+        if model.prune:
+            delete_in_batches(
+                User.objects.all(),
+                [pk for pk, _ in self._get_prunable(changes.removed)],
+                batch_size=self.prune_batch_size,
+            )
+
+        # Unless they are pruned, keep track of the removed users so they can still
+        # be pruned on a later run
+        journal.record(changes, keep_removed=not model.prune)
+
+
+@dataclass
+class MembershipChanges:
+    """
+    The changes to the rows of a many-to-many `through` table of groups, by
+    (group name, key) pairs, where the key identifies the other side of the relation.
+    """
+
+    to_add: list[tuple[str, str]] = field(default_factory=list)
+    # The primary key of the row of each membership to remove
+    to_remove: dict[tuple[str, str], Any] = field(default_factory=dict)
+
+
+class GroupConfigurationStep(BaseConfigurationStep[GroupConfigurationModel]):
+    """
+    Creates groups, and sets their permissions and members.
+
+    The permissions of each configured group are set to exactly the listed permissions
+    (as `app_label.codename`), which are resolved with a single query. If `users` is
+    provided for a group, its members are set to exactly these users, otherwise the
+    members are not changed. The memberships are changed with bulk inserts into and
+    deletes from the `through` tables, `batch_size` rows at a time. Groups which are
+    not in the configuration are not changed.
+
+    The users must exist, e.g. by configuring them with `UserConfigurationStep` in a
+    preceding step.
+    """
+
+    verbose_name = "Group Configuration Step"
+    enable_setting = "group_configuration_enable"
+    config_model = GroupConfigurationModel
+    namespace = "group_configuration_config"
+
+    batch_size = 1000
+
+    def get_prefetch_requests(
+        self, model: GroupConfigurationModel
+    ) -> list[PrefetchRequest]:
+        return [
+            self._get_groups_request(model),
+            PrefetchRequest(
+                User, get_user_model().USERNAME_FIELD, self._get_usernames(model)
+            ),
+        ]
+
+    def _get_groups_request(self, model: GroupConfigurationModel) -> PrefetchRequest:
+        return PrefetchRequest(Group, "name", [item.name for item in model.groups])
+
+    def _get_usernames(self, model: GroupConfigurationModel) -> set[str]:
+        return {username for item in model.groups for username in item.users or []}
+
+    def _get_permissions(self, model: GroupConfigurationModel) -> dict[str, int]:
+        labels = {label for item in model.groups for label in item.permissions}
+        codenames = {label.split(".", 1)[1] for label in labels}
+
+        # Codenames are not unique across apps, so the permissions with any of the
+        # codenames are fetched and indexed by their label
+        index = {
+            f"{app_label}.{codename}": pk
+            for pk, app_label, codename in Permission.objects.filter(
+                codename__in=codenames
+            ).values_list("pk", "content_type__app_label", "codename")
+        }
+        if unknown := sorted(labels - index.keys()):
+            raise ConfigurationRunFailed(
+                f"Unknown permissions: {', '.join(unknown)}. Permissions must be "
+                "specified as `app_label.codename`"
+            )
+        return {label: index[label] for label in labels}
+
+    def _get_membership_changes(
+        self,
+        through: type[models.Model],
+        key_fields: tuple[str, ...],
+        desired: dict[str, set[str]],
+        groups: dict[str, Group],
+    ) -> MembershipChanges:
+        # The key of an existing row consists of the `key_fields`, joined by a dot
+        existing: dict[str, dict[str, Any]] = {name: {} for name in desired}
+        names_by_pk = {
+            groups[name].pk: name for name in desired if not groups[name]._state.adding
+        }
+        for chunk in iter_chunks(names_by_pk, self.batch_size):
+            rows = through.objects.filter(group_id__in=chunk).values_list(
+                "pk", "group_id", *key_fields
+            )
+            for pk, group_id, *key in rows:
+                existing[names_by_pk[group_id]][".".join(map(str, key))] = pk
+
+        changes = MembershipChanges()
+        for name, keys in desired.items():
+            changes.to_add += [
+                (name, key) for key in sorted(keys - existing[name].keys())
+            ]
+            changes.to_remove.update(
+                ((name, key), pk)
+                for key, pk in sorted(existing[name].items())
+                if key not in keys
+            )
+        return changes
+
+    def _get_changes(
+        self, model: GroupConfigurationModel, identity_map: IdentityMap
+    ) -> tuple[dict[str, Group], MembershipChanges, MembershipChanges]:
+        # If a group occurs more than once, the last occurrence is used
+        items = {item.name: item for item in model.groups}
+        groups = {
+            name: identity_map.lookup(Group, name=name) or Group(name=name)
+            for name in items
+        }
+
+        permission_changes = self._get_membership_changes(
+            Group.permissions.through,
+            ("permission__content_type__app_label", "permission__codename"),
+            {name: set(item.permissions) for name, item in items.items()},
+            groups,
+        )
+        user_changes = self._get_membership_changes(
+            User.groups.through,
+            (f"user__{get_user_model().USERNAME_FIELD}",),
+            {
+                name: set(item.users)
+                for name, item in items.items()
+                if item.users is not None
+            },
+            groups,
+        )
+        return groups, permission_changes, user_changes
+
+    def _get_read_only_changes(
+        self, model: GroupConfigurationModel
+    ) -> tuple[dict[str, Group], MembershipChanges, MembershipChanges]:
+        # The run context is not used, as the step is not executed
+        identity_map = IdentityMap()
+        identity_map.prefetch_requests(
+            [self._get_groups_request(model)], batch_size=self.batch_size
+        )
+        return self._get_changes(model, identity_map)
+
+    def plan(self, model: GroupConfigurationModel) -> list[str]:
+        self._get_permissions(model)
+        groups, permission_changes, user_changes = self._get_read_only_changes(model)
+
+        plan = [
+            f"Create group {name}"
+            for name, group in groups.items()
+            if group._state.adding
+        ]
+        plan += [
+            f"Add permission {label} to group {name}"
+            for name, label in permission_changes.to_add
+        ]
+        plan += [
+            f"Remove permission {label} from group {name}"
+            for name, label in permission_changes.to_remove
+        ]
+        plan += [
+            f"Add user {username} to group {name}"
+            for name, username in user_changes.to_add
+        ]
+        plan += [
+            f"Remove user {username} from group {name}"
+            for name, username in user_changes.to_remove
+        ]
+        return plan
+
+    def diff(self, model: GroupConfigurationModel) -> list[str]:
+        groups, permission_changes, user_changes = self._get_read_only_changes(model)
+
+        differences = [
+            f"Group {name} is missing"
+            for name, group in groups.items()
+            if group._state.adding
+        ]
+        for kind, changes in (
+            ("permission", permission_changes),
+            ("user", user_changes),
+        ):
+            differences += [
+                f"Group {name}: {kind} {key} is missing" for name, key in changes.to_add
+            ]
+            differences += [
+                f"Group {name}: {kind} {key} is not in the configuration"
+                for name, key in changes.to_remove
+            ]
+        return differences
+
+    def export(self) -> dict:
+        permissions = defaultdict(list)
+        rows = (
+            Group.permissions.through.objects.order_by(
+                "permission__content_type__app_label", "permission__codename"
+            )
+            .values_list(
+                "group_id",
+                "permission__content_type__app_label",
+                "permission__codename",
+            )
+            .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+        )
+        for group_id, app_label, codename in rows:
+            permissions[group_id].append(f"{app_label}.{codename}")
+
+        # The members are not exported, so they are left untouched when applied
+        groups = (
+            Group.objects.order_by("pk")
+            .values_list("pk", "name")
+            .iterator(chunk_size=EXPORT_CHUNK_SIZE)
+        )
+        return {
+            "groups": (
+                {"name": name, "permissions": permissions[pk]} for pk, name in groups
+            )
+        }
+
+    def execute(self, model: GroupConfigurationModel) -> None:
+        # A no-op for the requests which were prefetched by the runner already
+        identity_map = self.context.identity_map if self.context else IdentityMap()
+        identity_map.prefetch_requests(
+            self.get_prefetch_requests(model), batch_size=self.batch_size
+        )
+
+        permissions = self._get_permissions(model)
+        username_field = get_user_model().USERNAME_FIELD
+        usernames = self._get_usernames(model)
+        # The runner prefetches the objects before any step is executed, so objects
+        # which preceding steps created without registering them are fetched here
+        _fetch_unregistered(
+            identity_map, User, username_field, usernames, batch_size=self.batch_size
+        )
+        _fetch_unregistered(
+            identity_map,
+            Group,
+            "name",
+            {item.name for item in model.groups},
+            batch_size=self.batch_size,
+        )
+
+        users = {}
+        for username in usernames:
+            if not (user := identity_map.lookup(User, **{username_field: username})):
+                raise ConfigurationRunFailed(f"User {username} does not exist")
+            users[username] = user
+
+        groups, permission_changes, user_changes = self._get_changes(
+            model, identity_map
+        )
+
+        new_groups = [group for group in groups.values() if group._state.adding]
+        for group in new_groups:
+            group.full_clean(exclude=("id",), validate_unique=False)
+        Group.objects.bulk_create(new_groups, batch_size=self.batch_size)
+        if any(group.pk is None for group in new_groups):
+            # Not all databases return the primary keys of created objects
+            created = Group.objects.in_bulk(
+                [group.name for group in new_groups], field_name="name"
+            )
+            groups.update(created)
+
+        for group in groups.values():
+            identity_map.add(group, "name")
+
+        PermissionThrough = Group.permissions.through
+        delete_in_batches(
+            PermissionThrough.objects.all(),
+            permission_changes.to_remove.values(),
+            batch_size=self.batch_size,
+        )
+        PermissionThrough.objects.bulk_create(
+            [
+                PermissionThrough(
+                    group_id=groups[name].pk, permission_id=permissions[label]
+                )
+                for name, label in permission_changes.to_add
+            ],
+            batch_size=self.batch_size,
+        )
+
+        UserThrough = User.groups.through
+        delete_in_batches(
+            UserThrough.objects.all(),
+            user_changes.to_remove.values(),
+            batch_size=self.batch_size,
+        )
+        UserThrough.objects.bulk_create(
+            [
+                UserThrough(group_id=groups[name].pk, user_id=users[username].pk)
+                for name, username in user_changes.to_add
+            ],
+            batch_size=self.batch_size,
+        )
@@ -1,6 +1,9 @@
 from django.contrib.sites.models import Site
 
-from django_setup_configuration.models import ConfigurationModel
+from pydantic import Field
+
+from django_setup_configuration.configuration_models import ConfigurationModel
+from django_setup_configuration.fields import StreamedList
 
 
 class SiteConfigurationModel(ConfigurationModel):
@@ -14,4 +17,14 @@ class SiteConfigurationModel(ConfigurationModel):
 
 
 class SitesConfigurationModel(ConfigurationModel):
-    items: list[SiteConfigurationModel]
+    items: StreamedList[SiteConfigurationModel]
+    prune: bool = Field(
+        default=False,
+        description="Delete the sites whose domain is not in the list of items.",
+    )
+    only_changed: bool = Field(
+        default=False,
+        description="Only update the sites which were added or changed in the "
+        "configuration since the last run, or which no longer exist. Changes made to "
+        "the other sites by other means (e.g. in the admin) are not reverted.",
+    )
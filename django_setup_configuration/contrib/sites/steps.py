@@ -1,17 +1,38 @@
+import itertools
+from collections.abc import Collection
+
 from django.conf import settings
 from django.contrib.sites.models import Site
-from django.core.exceptions import ImproperlyConfigured
 
 from django_setup_configuration.configuration import BaseConfigurationStep
 from django_setup_configuration.contrib.sites.models import (
+    SiteConfigurationModel,
     SitesConfigurationModel,
 )
+from django_setup_configuration.contrib.sync.prune import (
+    PRUNE_BATCH_SIZE,
+    delete_in_batches,
+    get_prunable,
+)
+from django_setup_configuration.contrib.sync.steps import iter_chunks
 from django_setup_configuration.exceptions import ConfigurationRunFailed
+from django_setup_configuration.export import EXPORT_CHUNK_SIZE
+from django_setup_configuration.journal import JournalChanges, StepJournal
 
 
 class SitesConfigurationStep(BaseConfigurationStep):
     """
     This step configures one or more ``django.contrib.sites.Site`` objects
+
+    The current site is always updated. If `only_changed` is enabled, the other sites
+    are only updated if they were added or changed in the configuration since the last
+    run (or no longer exist), see `StepJournal`.
+
+    If `prune` is enabled, the sites whose domain is not in the configuration are
+    deleted, `prune_batch_size` at a time. Use `--plan` to review them first.
+
+    The sites are validated once, while comparing them to the journal (see
+    `StreamedList`), and the domains to keep are taken from the result.
     """
 
     config_model = SitesConfigurationModel
@@ -20,34 +41,173 @@ class SitesConfigurationStep(BaseConfigurationStep):
     namespace = "sites_config"
     enable_setting = "sites_config_enable"
 
-    def execute(self, model: SitesConfigurationModel) -> None:
-        if not model.items:
-            raise ConfigurationRunFailed("Please specify one or more sites")
-
-        first_site, other_sites = model.items[0], model.items[1:]
-
-        # We need to ensure the current site is updated, to make sure that `get_current`
-        # keeps working. The first site in the list is treated as the current site.
-        current_site = None
+    prune_batch_size = PRUNE_BATCH_SIZE
 
+    def _get_current_site(self) -> Site:
         try:
-            current_site = Site.objects.get_current()
-        except (Site.DoesNotExist, ImproperlyConfigured):
+            # Rather than `Site.objects.get_current()`, as its cache is shared by all
+            # databases the step may be executed against
+            return Site.objects.get(pk=settings.SITE_ID)
+        except (Site.DoesNotExist, AttributeError):
             current_site = Site()
 
             # We have no current site, which means there is no site pointed to by
             # settings.SITE_ID -- however, `get_current()` expects a Site with that ID
             # to exist, so we have to make sure the created site receives that ID.
             current_site.pk = settings.SITE_ID
+            return current_site
+
+    def _get_changes(
+        self, model: SitesConfigurationModel
+    ) -> tuple[StepJournal, JournalChanges]:
+        journal = StepJournal.for_step(self)
+        changes = journal.get_changes(
+            itertools.islice(model.items, 1, None),
+            key=lambda item: item.domain,
+            get_existing_keys=lambda domains: Site.objects.filter(
+                domain__in=domains
+            ).values_list("domain", flat=True),
+        )
+        return journal, changes
+
+    @staticmethod
+    def _get_domains(
+        first_site: SiteConfigurationModel, changes: JournalChanges
+    ) -> set[str]:
+        return {
+            first_site.domain,
+            *(item.domain for item in changes.pending),
+            *(item.domain for item in changes.unchanged),
+        }
+
+    def _get_prunable(
+        self, domains: Collection[str], current_site: Site
+    ) -> list[tuple[int, str]]:
+        # The current site is never pruned, as it is updated to the first item
+        return get_prunable(
+            Site.objects.exclude(pk=current_site.pk),
+            "domain",
+            domains,
+            chunk_size=self.prune_batch_size,
+        )
+
+    def plan(self, model: SitesConfigurationModel) -> list[str]:
+        if not model.items:
+            raise ConfigurationRunFailed("Please specify one or more sites")
+
+        changes = []
+        first_site, current_site = model.items[0], self._get_current_site()
+        if current_site._state.adding or (current_site.domain, current_site.name) != (
+            first_site.domain,
+            first_site.name,
+        ):
+            changes.append(f"Update current site to {first_site.domain}")
+
+        _, journal_changes = self._get_changes(model)
+        changes += [f"Create site {item.domain}" for item in journal_changes.added]
+        changes += [f"Update site {item.domain}" for item in journal_changes.changed]
+        if not model.only_changed and journal_changes.unchanged:
+            changes.append(
+                f"Update {journal_changes.unchanged_count} unchanged sites, reverting "
+                "any changes made by other means"
+            )
 
+        if model.prune:
+            domains = self._get_domains(first_site, journal_changes)
+            changes += [
+                f"Delete site {domain}"
+                for _, domain in self._get_prunable(domains, current_site)
+            ]
+        return changes
+
+    def diff(self, model: SitesConfigurationModel) -> list[str]:
+        if not model.items:
+            raise ConfigurationRunFailed("Please specify one or more sites")
+
+        differences = []
+        first_site, current_site = model.items[0], self._get_current_site()
+        if current_site._state.adding:
+            differences.append("The current site is missing")
+        else:
+            differences += [
+                f"Current site: {name} is {actual!r}, expected {expected!r}"
+                for name, actual, expected in (
+                    ("domain", current_site.domain, first_site.domain),
+                    ("name", current_site.name, first_site.name),
+                )
+                if actual != expected
+            ]
+
+        domains = {first_site.domain}
+        other_sites = itertools.islice(model.items, 1, None)
+        for chunk in iter_chunks(other_sites, self.prune_batch_size):
+            domains.update(item.domain for item in chunk)
+            existing = dict(
+                Site.objects.filter(
+                    domain__in=[item.domain for item in chunk]
+                ).values_list("domain", "name")
+            )
+            for item in chunk:
+                if item.domain not in existing:
+                    differences.append(f"Site {item.domain} is missing")
+                elif (name := existing[item.domain]) != item.name:
+                    differences.append(
+                        f"Site {item.domain}: name is {name!r}, expected {item.name!r}"
+                    )
+
+        if model.prune:
+            differences += [
+                f"Site {domain} is not in the configuration"
+                for _, domain in self._get_prunable(domains, current_site)
+            ]
+        return differences
+
+    def export(self) -> dict:
+        # The current site has to be the first item
+        current_site = self._get_current_site()
+        sites = Site.objects.order_by("pk").values("domain", "name")
+        items = sites.exclude(pk=current_site.pk).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+        if not current_site._state.adding:
+            items = itertools.chain(
+                [{"domain": current_site.domain, "name": current_site.name}], items
+            )
+        return {"items": items}
+
+    def execute(self, model: SitesConfigurationModel) -> None:
+        if not model.items:
+            raise ConfigurationRunFailed("Please specify one or more sites")
+
+        first_site = model.items[0]
+
+        # We need to ensure the current site is updated, to make sure that `get_current`
+        # keeps working. The first site in the list is treated as the current site.
+        current_site = self._get_current_site()
         current_site.domain = first_site.domain
         current_site.name = first_site.name
         current_site.full_clean(exclude=("id",), validate_unique=False)
         current_site.save()
+        if self.context:
+            self.context.identity_map.add(current_site, "domain")
 
-        for item in other_sites:
+        journal, changes = self._get_changes(model)
+        items = changes.pending
+        if not model.only_changed:
+            items += changes.unchanged
+        for item in items:
             site_instance = Site(domain=item.domain, name=item.name)
             site_instance.full_clean(exclude=("id",), validate_unique=False)
-            Site.objects.update_or_create(
+            site, _ = Site.objects.update_or_create(
                 domain=site_instance.domain, defaults={"name": site_instance.name}
             )
+            if self.context:
+                self.context.identity_map.add(site, "domain")
+
+        journal.record(changes)
+
+        if model.prune:
+            domains = self._get_domains(first_site, changes)
+            delete_in_batches(
+                Site.objects.all(),
+                [pk for pk, _ in self._get_prunable(domains, current_site)],
+                batch_size=self.prune_batch_size,
+            )
@@ -0,0 +1,64 @@
+import itertools
+from collections.abc import Collection, Iterable, Sequence
+from typing import Any
+
+from django.db import models
+
+PRUNE_BATCH_SIZE = 1000
+
+
+def get_prunable(
+    queryset: models.QuerySet,
+    key_fields: str | Sequence[str],
+    keys: Collection[Any],
+    *,
+    chunk_size: int = PRUNE_BATCH_SIZE,
+) -> list[tuple[Any, Any]]:
+    """
+    Return the rows of `queryset` whose natural key is not in `keys`.
+
+    The set difference is computed with a single query, which only fetches the primary
+    key and natural key of the rows.
+
+    Args:
+        queryset: the rows which can be pruned
+        key_fields: the field of the natural key, or a sequence of fields for a
+            composite key, in which case the keys are tuples
+        keys: the natural keys of the rows to keep
+        chunk_size: the number of rows to fetch from the database at once
+
+    Returns:
+        list[tuple[Any, Any]]: the primary key and natural key of each row to prune
+    """
+    composite = not isinstance(key_fields, str)
+    fields = key_fields if composite else (key_fields,)
+
+    prunable = []
+    rows = queryset.values_list("pk", *fields)
+    for pk, *key in rows.iterator(chunk_size=chunk_size):
+        key = tuple(key) if composite else key[0]
+        if key not in keys:
+            prunable.append((pk, key))
+    return prunable
+
+
+def delete_in_batches(
+    queryset: models.QuerySet,
+    pks: Iterable[Any],
+    *,
+    batch_size: int = PRUNE_BATCH_SIZE,
+) -> int:
+    """
+    Delete the rows of `queryset` with the given primary keys, `batch_size` at a time.
+
+    Returns:
+        int: the number of rows deleted, excluding cascaded deletes
+    """
+    model_label = queryset.model._meta.label
+    iterator = iter(pks)
+
+    deleted = 0
+    while batch := list(itertools.islice(iterator, batch_size)):
+        _, per_model = queryset.filter(pk__in=batch).delete()
+        deleted += per_model.get(model_label, 0)
+    return deleted
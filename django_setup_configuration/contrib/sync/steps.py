@@ -0,0 +1,396 @@
+import inspect
+import itertools
+import logging
+import threading
+from collections.abc import Hashable, Iterable, Iterator, Sequence
+from dataclasses import dataclass, field
+from functools import reduce
+from operator import or_
+from typing import Any, ClassVar
+
+from django.apps import apps
+from django.db import models
+
+from django_setup_configuration.configuration import BaseConfigurationStep
+from django_setup_configuration.configuration_models import ConfigurationModel
+from django_setup_configuration.contrib.sync.prune import (
+    delete_in_batches,
+    get_prunable,
+)
+from django_setup_configuration.exceptions import ConfigurationException
+from django_setup_configuration.fields import DjangoModelRef, StreamedList
+
+logger = logging.getLogger(__name__)
+
+# The number of composite natural keys to match per query
+COMPOSITE_KEY_CHUNK_SIZE = 100
+
+
+def get_model(model: type[models.Model] | str) -> type[models.Model]:
+    if isinstance(model, str):
+        return apps.get_model(model)
+    return model
+
+
+def get_default_sync_fields(model: type[models.Model]) -> tuple[str, ...]:
+    """
+    Return the fields which are configurable by default: the editable, concrete fields
+    of the model, excluding the primary key and relations.
+    """
+    return tuple(
+        model_field.name
+        for model_field in model._meta.concrete_fields
+        if model_field.editable
+        and not model_field.primary_key
+        and not model_field.is_relation
+    )
+
+
+def iter_chunks(items: Iterable[Any], chunk_size: int) -> Iterator[list[Any]]:
+    if isinstance(items, StreamedList):
+        yield from items.chunks(chunk_size)
+        return
+
+    iterator = iter(items)
+    while chunk := list(itertools.islice(iterator, chunk_size)):
+        yield chunk
+
+
+@dataclass
+class SyncResult:
+    """
+    The number of rows written by a `ModelSyncStep`.
+    """
+
+    created: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    deleted: int = 0
+
+
+@dataclass
+class SyncBatch:
+    """
+    The changes required to synchronize a batch of items.
+
+    Attributes:
+        to_create (`list[Model]`): the (unsaved) objects to create
+        to_update (`list[tuple[Model, dict]]`): the objects to update, which already
+            have their new values, and the previous values of their changed fields
+        unchanged (`list[Model]`): the objects that are up to date
+    """
+
+    to_create: list[models.Model] = field(default_factory=list)
+    to_update: list[tuple[models.Model, dict[str, Any]]] = field(default_factory=list)
+    unchanged: list[models.Model] = field(default_factory=list)
+
+
+class _DerivedConfigModel:
+    """
+    The `config_model` of a `ModelSyncStep` class which is derived from its model.
+
+    The configuration model is only built on first access, rather than when the class
+    is created, as resolving the model requires the app registry to be ready. Each
+    subclass gets its own configuration model.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    def __get__(self, instance, owner: type["ModelSyncStep"]):
+        if (config_model := owner.__dict__.get("_config_model")) is None:
+            with self._lock:
+                if (config_model := owner.__dict__.get("_config_model")) is None:
+                    config_model = owner.build_config_model()
+                    owner._config_model = config_model
+        return config_model
+
+
+class ModelSyncStep(BaseConfigurationStep):
+    """
+    A configuration step which synchronizes a list of items with the rows of a Django
+    model, identified by a natural key.
+
+    Unless `config_model` is set explicitly, it is derived from the model when it is
+    first accessed: a list of items under `items`, with a `DjangoModelRef` field for
+    each of the `fields`.
+    The items are applied in batches: the existing rows of a batch are fetched with a
+    single query, and only the new and changed rows are written using `bulk_create`
+    and `bulk_update`. Note that this means that `Model.save` is not called, and no
+    signals are sent. The synchronized objects are added to the identity map of the
+    run context, by their natural key.
+
+    Attributes:
+        model (`type[Model] | str`): the model to synchronize, or its
+            `"app_label.ModelName"`
+        natural_key (`tuple[str, ...]`): the fields which identify a row
+        fields (`tuple[str, ...] | None`): the configurable fields, by default the
+            editable non-relational fields of the model (see `get_default_sync_fields`)
+        prune (`bool`): whether to delete the rows of `get_queryset` which are not in
+            the configuration
+        batch_size (`int`): the number of items to apply, or rows to delete, at once
+        sync_result (`SyncResult`): the number of rows written by the last execution
+
+    Example:
+        ```python
+        class TagConfigurationStep(ModelSyncStep):
+            verbose_name = "Tags"
+            namespace = "tags"
+            enable_setting = "tags_enable"
+            model = Tag
+            natural_key = ("slug",)
+            prune = True
+        ```
+    """
+
+    model: type[models.Model] | str
+    natural_key: tuple[str, ...]
+    fields: tuple[str, ...] | None = None
+    prune: bool = False
+    batch_size: int = 1000
+
+    items_attribute: ClassVar[str] = "items"
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+
+        if isinstance(getattr(cls, "natural_key", None), str):
+            cls.natural_key = (cls.natural_key,)
+
+        # Subclasses of a class with a derived config_model inherit the descriptor,
+        # which derives their own. The model is not resolved here, as the steps may
+        # be defined before the app registry is ready.
+        if getattr(cls, "model", None) and (
+            inspect.getattr_static(cls, "config_model", None) is None
+        ):
+            cls.config_model = _DerivedConfigModel()
+
+        # Explicit fields can be checked without resolving the model
+        if cls.fields and getattr(cls, "natural_key", None):
+            cls.get_sync_fields()
+
+    @classmethod
+    def get_sync_fields(cls) -> tuple[str, ...]:
+        fields = cls.fields or get_default_sync_fields(get_model(cls.model))
+        missing = [name for name in cls.natural_key if name not in fields]
+        if missing:
+            raise ConfigurationException(
+                f"The natural key field(s) {', '.join(missing)} of {cls.__name__} "
+                "must be part of its fields"
+            )
+        return tuple(fields)
+
+    @classmethod
+    def build_config_model(cls) -> type[ConfigurationModel]:
+        """
+        Build the configuration model for the step from its model and fields.
+        """
+        model = get_model(cls.model)
+        item_model = type(ConfigurationModel)(
+            f"{model.__name__}ConfigurationItem",
+            (ConfigurationModel,),
+            {
+                "__module__": cls.__module__,
+                "__qualname__": f"{cls.__qualname__}.{model.__name__}ConfigurationItem",
+                **{name: DjangoModelRef(model, name) for name in cls.get_sync_fields()},
+            },
+        )
+        return type(ConfigurationModel)(
+            f"{cls.__name__}ConfigurationModel",
+            (ConfigurationModel,),
+            {
+                "__module__": cls.__module__,
+                "__qualname__": f"{cls.__qualname__}.ConfigurationModel",
+                "__annotations__": {cls.items_attribute: StreamedList[item_model]},
+            },
+        )
+
+    def __init__(self):
+        super().__init__()
+        self.sync_fields = self.get_sync_fields()
+
+    def get_queryset(self) -> models.QuerySet:
+        """
+        Return the rows the step manages, which limits the rows that can be pruned.
+        """
+        return get_model(self.model)._default_manager.all()
+
+    def get_items(self, model: ConfigurationModel) -> Iterable[Any]:
+        return getattr(model, self.items_attribute)
+
+    def get_item_key(self, item: Any) -> Hashable:
+        return tuple(getattr(item, name) for name in self.natural_key)
+
+    def get_object_key(self, obj: models.Model) -> Hashable:
+        return tuple(getattr(obj, name) for name in self.natural_key)
+
+    def get_item_values(self, item: Any) -> dict[str, Any]:
+        """
+        Return the field values to write for an item.
+        """
+        return {name: getattr(item, name) for name in self.sync_fields}
+
+    def _filter_by_keys(
+        self, queryset: models.QuerySet, keys: Sequence[Hashable]
+    ) -> Iterator[models.Model]:
+        """
+        Return the objects of `queryset` with the natural keys `keys`.
+        """
+        if len(self.natural_key) == 1:
+            yield from queryset.filter(
+                **{f"{self.natural_key[0]}__in": [key[0] for key in keys]}
+            )
+            return
+
+        # Composite keys are matched with one condition per key, which databases limit
+        # the number of (e.g. SQLite's maximum expression tree depth of 1000)
+        for chunk in iter_chunks(keys, COMPOSITE_KEY_CHUNK_SIZE):
+            yield from queryset.filter(
+                reduce(
+                    or_,
+                    (
+                        models.Q(**dict(zip(self.natural_key, key, strict=True)))
+                        for key in chunk
+                    ),
+                )
+            )
+
+    def _reconcile(
+        self, model: ConfigurationModel, keys: set[Hashable]
+    ) -> Iterator[SyncBatch]:
+        """
+        Compare the items to the existing rows, one batch at a time, without writing
+        to the database. The keys of the items are added to `keys`.
+        """
+        queryset = self.get_queryset()
+        model_cls = queryset.model
+
+        for chunk in iter_chunks(self.get_items(model), self.batch_size):
+            items = {self.get_item_key(item): item for item in chunk}
+            keys.update(items)
+            existing = {
+                self.get_object_key(obj): obj
+                for obj in self._filter_by_keys(queryset, list(items))
+            }
+
+            batch = SyncBatch()
+            for key, item in items.items():
+                values = self.get_item_values(item)
+                if (obj := existing.get(key)) is None:
+                    batch.to_create.append(model_cls(**values))
+                    continue
+
+                previous = {
+                    name: getattr(obj, name)
+                    for name, value in values.items()
+                    if getattr(obj, name) != value
+                }
+                if not previous:
+                    batch.unchanged.append(obj)
+                    continue
+
+                for name in previous:
+                    setattr(obj, name, values[name])
+                batch.to_update.append((obj, previous))
+
+            yield batch
+
+    def get_prunable(self, keys: set[Hashable]) -> list[tuple[Any, Hashable]]:
+        """
+        Return the primary key and natural key of the rows which are not in `keys`.
+        """
+        return get_prunable(
+            self.get_queryset(), self.natural_key, keys, chunk_size=self.batch_size
+        )
+
+    def _describe(self, key: Hashable) -> str:
+        model_name = get_model(self.model)._meta.verbose_name
+        return f"{model_name} {', '.join(str(value) for value in key)}"
+
+    def plan(self, model: ConfigurationModel) -> list[str]:
+        changes, keys = [], set()
+        for batch in self._reconcile(model, keys):
+            changes += [
+                f"Create {self._describe(self.get_object_key(obj))}"
+                for obj in batch.to_create
+            ]
+            changes += [
+                f"Update {self._describe(self.get_object_key(obj))}"
+                for obj, _ in batch.to_update
+            ]
+
+        if self.prune:
+            changes += [
+                f"Delete {self._describe(key)}" for _, key in self.get_prunable(keys)
+            ]
+        return changes
+
+    def diff(self, model: ConfigurationModel) -> list[str]:
+        differences, keys = [], set()
+        for batch in self._reconcile(model, keys):
+            differences += [
+                f"{self._describe(self.get_object_key(obj))} is missing"
+                for obj in batch.to_create
+            ]
+            for obj, previous in batch.to_update:
+                differences += [
+                    f"{self._describe(self.get_object_key(obj))}: {name} is "
+                    f"{value!r}, expected {getattr(obj, name)!r}"
+                    for name, value in previous.items()
+                ]
+
+        if self.prune:
+            differences += [
+                f"{self._describe(key)} is not in the configuration"
+                for _, key in self.get_prunable(keys)
+            ]
+        return differences
+
+    def execute(self, model: ConfigurationModel) -> None:
+        self.sync_result = result = SyncResult()
+        manager = get_model(self.model)._default_manager
+        keys = set()
+
+        for batch in self._reconcile(model, keys):
+            to_update = [obj for obj, _ in batch.to_update]
+            for obj in itertools.chain(batch.to_create, to_update):
+                obj.full_clean(validate_unique=False)
+
+            created = manager.bulk_create(batch.to_create)
+            if any(obj.pk is None for obj in created):
+                # Not all databases return the primary keys of created objects, which
+                # the objects in the identity map need
+                created = list(
+                    self._filter_by_keys(
+                        manager.all(), [self.get_object_key(obj) for obj in created]
+                    )
+                )
+            if to_update:
+                update_fields = set().union(
+                    *(previous for _, previous in batch.to_update)
+                )
+                manager.bulk_update(to_update, sorted(update_fields))
+
+            result.created += len(batch.to_create)
+            result.updated += len(to_update)
+            result.unchanged += len(batch.unchanged)
+
+            if self.context:
+                for obj in itertools.chain(created, to_update, batch.unchanged):
+                    self.context.identity_map.add(obj, *self.natural_key)
+
+        if self.prune:
+            result.deleted = delete_in_batches(
+                self.get_queryset(),
+                [pk for pk, _ in self.get_prunable(keys)],
+                batch_size=self.batch_size,
+            )
+
+        logger.info(
+            "%s: %d created, %d updated, %d unchanged, %d deleted",
+            self.verbose_name,
+            result.created,
+            result.updated,
+            result.unchanged,
+            result.deleted,
+        )
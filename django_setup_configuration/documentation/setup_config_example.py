@@ -28,6 +28,7 @@ from ruamel.yaml.comments import CommentedMap
 from ruamel.yaml.scalarstring import LiteralScalarString
 
 from django_setup_configuration.configuration import BaseConfigurationStep
+from django_setup_configuration.fields import StreamedList
 
 NO_EXAMPLE = object()
 
@@ -308,7 +309,7 @@ def _process_field_type(
             example=data, commented_out_examples=commented_out_examples
         )
 
-    if get_origin(field_type) is list:
+    if get_origin(field_type) in (list, StreamedList):
         items = [
             _process_field_type(
                 get_args(field_type)[0], field_info, field_name, depth + 1
@@ -124,6 +124,10 @@ class SetupConfigUsageDirective(Directive):
     def _load_steps(self, configured_steps) -> list[StepInfo]:  # -> list:
         steps_info: list[StepInfo] = []
         for step_path in configured_steps:
+            if isinstance(step_path, tuple):
+                # Steps can be declared as a tuple of their path and enable setting
+                step_path, _ = step_path
+
             step_cls = import_string(step_path)
             step_info = StepInfo(
                 title=step_cls.verbose_name,
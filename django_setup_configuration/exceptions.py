@@ -12,6 +12,49 @@ class ConfigurationException(Exception):
     """
 
 
+_MAX_INPUT_VALUE_LENGTH = 50
+
+
+def format_validation_error(
+    validation_error: ValidationError, *, max_errors: int | None = None
+) -> str:
+    """
+    Render a pydantic ValidationError, optionally only rendering the first errors.
+
+    Rendering is relatively slow for validation errors with a very large number of
+    errors (e.g. one for every item of a long list), hence the option to cap it.
+
+    Args:
+        validation_error (ValidationError): The validation error to render.
+        max_errors (int | None, optional): The maximum number of errors to render, or
+            None to render all errors. Defaults to None.
+
+    Returns:
+        str: The rendered validation error, in the format used by pydantic.
+    """
+    error_count = validation_error.error_count()
+    if max_errors is None or error_count <= max_errors:
+        return str(validation_error)
+
+    lines = [
+        f"{error_count} validation error{'s' if error_count != 1 else ''} for "
+        f"{validation_error.title}"
+    ]
+    for error in validation_error.errors(include_url=False)[:max_errors]:
+        input_value = repr(error["input"])
+        if len(input_value) > _MAX_INPUT_VALUE_LENGTH:
+            input_value = input_value[: _MAX_INPUT_VALUE_LENGTH - 3] + "..."
+
+        lines.append(".".join(str(part) for part in error["loc"]))
+        lines.append(
+            f"  {error['msg']} [type={error['type']}, input_value={input_value}, "
+            f"input_type={type(error['input']).__name__}]"
+        )
+
+    lines.append(f"... and {error_count - max_errors} more errors (not shown)")
+    return "\n".join(lines)
+
+
 class PrerequisiteFailed(ConfigurationException):
     """
     Raises an error when the configuration step can't be started
@@ -25,9 +68,13 @@ class PrerequisiteFailed(ConfigurationException):
     ):
         self.step = step
         self.validation_error = validation_error
-        super().__init__(
-            f"Failed to load config model for {step}. Further "
-            f"details:\n{str(validation_error)}"
+        # The message is only rendered when needed, see `__str__`
+        super().__init__(step, validation_error)
+
+    def __str__(self):
+        return (
+            f"Failed to load config model for {self.step}. Further "
+            f"details:\n{str(self.validation_error)}"
         )
 
 
@@ -39,6 +86,20 @@ class ConfigurationRunFailed(ConfigurationException):
     pass
 
 
+class StepTimeout(ConfigurationRunFailed):
+    """
+    Raised when a configuration step exceeds its time budget
+    """
+
+    step: "BaseConfigurationStep"
+    timeout: float
+
+    def __init__(self, step: "BaseConfigurationStep", timeout: float, message: str):
+        self.step = step
+        self.timeout = timeout
+        super().__init__(message)
+
+
 class ImproperlyConfigured(ConfigurationException):
     """
     Raised when the library is not properly configured
@@ -51,9 +112,16 @@ class ValidateRequirementsFailure(ConfigurationException):
     """
 
     exceptions: list[PrerequisiteFailed]
+    unvalidated_steps: list["BaseConfigurationStep"]
 
-    def __init__(self, exceptions: list[PrerequisiteFailed]):
+    def __init__(
+        self,
+        exceptions: list[PrerequisiteFailed],
+        unvalidated_steps: list["BaseConfigurationStep"] | None = None,
+    ):
         self.exceptions = exceptions
+        # Steps which were not validated, because validation stopped early
+        self.unvalidated_steps = unvalidated_steps or []
         super().__init__(
             "One or more steps were provided with incomplete or incorrect settings"
         )
@@ -0,0 +1,144 @@
+import itertools
+import typing
+from collections.abc import Iterable, Iterator, Mapping, Sequence
+from os import PathLike
+from typing import IO, Any
+
+import yaml
+
+from django_setup_configuration.configuration import BaseConfigurationStep
+from django_setup_configuration.configuration_models import ConfigurationModel
+from django_setup_configuration.fields import StreamedList
+
+EXPORT_CHUNK_SIZE = 2000
+
+
+def _get_list_item_model(annotation: Any) -> type[ConfigurationModel] | None:
+    if typing.get_origin(annotation) not in (list, StreamedList):
+        return None
+
+    (item_model,) = typing.get_args(annotation) or (None,)
+    if isinstance(item_model, type) and issubclass(item_model, ConfigurationModel):
+        return item_model
+    return None
+
+
+def _iter_rows(
+    item_model: type[ConfigurationModel], chunk_size: int
+) -> Iterator[dict[str, Any]] | None:
+    item_model.resolve_django_model_refs()
+    refs = {
+        name: ref.django_field
+        for name, (ref, _) in item_model.__django_model_refs__.items()
+    }
+    django_models = {django_field.model for django_field in refs.values()}
+    if len(django_models) != 1:
+        return None
+
+    # Fields without a counterpart in the database can only be exported if optional
+    if any(
+        field_info.is_required()
+        for name, field_info in item_model.model_fields.items()
+        if name not in refs
+    ):
+        return None
+
+    (django_model,) = django_models
+    rows = (
+        django_model._default_manager.order_by("pk")
+        .values_list(*(django_field.attname for django_field in refs.values()))
+        .iterator(chunk_size=chunk_size)
+    )
+    # Validating the rows ensures that the exported values can be loaded again
+    return (
+        item_model.model_validate(dict(zip(refs, row, strict=True))).model_dump(
+            mode="json"
+        )
+        for row in rows
+    )
+
+
+def get_model_export(
+    config_model: type[ConfigurationModel], *, chunk_size: int = EXPORT_CHUNK_SIZE
+) -> dict[str, Any] | None:
+    """
+    Derive the export of a configuration model from its `DjangoModelRef` fields.
+
+    This supports configuration models whose list fields (`list` or `StreamedList`)
+    contain items which reference the fields of a single Django model: all rows of
+    that model are exported for each such field. The other fields of the
+    configuration model must be optional.
+
+    Returns:
+        dict[str, Any] | None: The data of the configuration model, with a lazy
+            iterator of the rows for each list field, or None if the export can not be
+            derived.
+    """
+    data = {}
+    for name, field_info in config_model.model_fields.items():
+        item_model = _get_list_item_model(field_info.annotation)
+        if item_model and (rows := _iter_rows(item_model, chunk_size)) is not None:
+            data[name] = rows
+        elif field_info.is_required():
+            return None
+
+    return data or None
+
+
+def _dump(data: Any, indent: int) -> str:
+    content = yaml.safe_dump(data, default_flow_style=False, sort_keys=False)
+    return "".join(" " * indent + line for line in content.splitlines(keepends=True))
+
+
+def _dump_key(key: str, indent: int) -> str:
+    return _dump({key: None}, indent).replace(": null\n", ":\n")
+
+
+def _write_mapping(stream: IO[str], data: Mapping[str, Any], indent: int):
+    for key, value in data.items():
+        if isinstance(value, Mapping) and value:
+            stream.write(_dump_key(key, indent))
+            _write_mapping(stream, value, indent + 2)
+        elif isinstance(value, Iterable) and not isinstance(value, str | list | dict):
+            iterator = iter(value)
+            first = next(iterator, None)
+            if first is None:
+                stream.write(_dump({key: []}, indent))
+                continue
+
+            stream.write(_dump_key(key, indent))
+            for item in itertools.chain([first], iterator):
+                stream.write(_dump([item], indent))
+        else:
+            stream.write(_dump({key: value}, indent))
+
+
+def write_export(
+    destination: PathLike | str | IO[str],
+    steps: Sequence[BaseConfigurationStep],
+) -> list[BaseConfigurationStep]:
+    """
+    Export the current database state of the steps to a YAML configuration file.
+
+    The data of each step is taken from its `export` method, and written under its
+    namespace, along with its enable setting. Lists of items are written as they are
+    read from the database, so large tables can be exported in constant memory.
+
+    Returns:
+        list[BaseConfigurationStep]: The steps which were exported, i.e. excluding the
+            steps which do not support exporting.
+    """
+    if isinstance(destination, str | PathLike):
+        with open(destination, "w", encoding="utf-8") as stream:
+            return write_export(stream, steps)
+
+    exported = []
+    for step in steps:
+        if (data := step.export()) is None:
+            continue
+
+        _write_mapping(
+            destination, {step.enable_setting: True, step.namespace: data}, indent=0
+        )
+        exported.append(step)
+    return exported
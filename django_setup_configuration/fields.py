@@ -1,15 +1,23 @@
 import datetime
 import decimal
-from collections.abc import Mapping
-from typing import Any, Literal
+import functools
+from collections.abc import Iterator, Sequence
+from typing import Any, ClassVar, Generic, Literal, TypeVar, get_args
 
 from django.apps import apps as django_apps
 from django.core.exceptions import FieldDoesNotExist
 from django.db import models
 from django.db.models.fields import NOT_PROVIDED, Field
 
-from pydantic import PydanticSchemaGenerationError, TypeAdapter, ValidationError, constr
+from pydantic import (
+    GetCoreSchemaHandler,
+    PydanticSchemaGenerationError,
+    TypeAdapter,
+    ValidationError,
+    constr,
+)
 from pydantic.fields import FieldInfo
+from pydantic_core import core_schema
 
 
 def get_model_from_ref(ref: str | type[models.Model]) -> type[models.Model]:
@@ -51,6 +59,79 @@ class UNMAPPED_DJANGO_FIELD:
 
 _SLUG_RE = r"^[-a-zA-Z0-9_]+\z"
 
+DJANGO_FIELD_TYPES: dict[type[Field], Any] = {
+    # String-based fields
+    models.CharField: str,
+    models.TextField: str,
+    models.EmailField: str,
+    models.URLField: str,
+    models.UUIDField: str,
+    models.SlugField: constr(pattern=_SLUG_RE),
+    # Integer-based fields
+    models.AutoField: int,
+    models.SmallAutoField: int,
+    models.IntegerField: int,
+    models.BigIntegerField: int,
+    models.PositiveIntegerField: int,
+    models.PositiveSmallIntegerField: int,
+    models.PositiveBigIntegerField: int,
+    models.SmallIntegerField: int,
+    # Other numeric
+    models.FloatField: float,
+    models.DecimalField: decimal.Decimal,
+    # Datetime
+    models.TimeField: datetime.time,
+    models.DateTimeField: datetime.datetime,
+    models.DurationField: datetime.timedelta,
+    # Misc
+    models.BooleanField: bool,
+    models.JSONField: dict,
+}
+
+# Inferred field info for each (model, field name, overrides), see `DjangoModelRefInfo`
+_field_info_cache: dict[tuple, tuple[Any, dict[str, Any]]] = {}
+
+
+def register_django_field_type(field_class: type[Field], python_type: Any) -> None:
+    """
+    Register the Python type to use for a Django field class (and its subclasses).
+
+    Args:
+        field_class (type[django.db.models.Field]): The Django field class.
+        python_type (Any): The type to use as the annotation for DjangoModelRef fields
+            referencing this field class.
+    """
+    DJANGO_FIELD_TYPES[field_class] = python_type
+    get_django_field_type.cache_clear()
+    _field_info_cache.clear()
+
+
+@functools.cache
+def get_django_field_type(field_class: type[Field]) -> Any:
+    """
+    Get the Python type for a Django field class.
+
+    The type registered for the nearest class in the MRO of the field class is used,
+    so subclasses of registered fields inherit their type.
+
+    Returns:
+        The Python type, or `UNMAPPED_DJANGO_FIELD` if no type is registered.
+    """
+    for klass in field_class.__mro__:
+        if klass in DJANGO_FIELD_TYPES:
+            return DJANGO_FIELD_TYPES[klass]
+
+    # If a type is unmapped, we return a sentinel value here to be picked up
+    # by the metaclass, which will subsequently check if the user has
+    # overridden the type annotation. If not, an exception will be raised
+    # prompting the user to do so.
+    return UNMAPPED_DJANGO_FIELD
+
+
+@functools.lru_cache(maxsize=256)
+def _get_type_adapter(python_type: Any) -> TypeAdapter:
+    return TypeAdapter(python_type)
+
 
 class DjangoModelRefInfo(FieldInfo):
     """
@@ -67,6 +148,28 @@ class DjangoModelRefInfo(FieldInfo):
         default: Any = NOT_PROVIDED,
         **kwargs,
     ):
+        self.model = model
+        self.field_name = field_name
+        self.is_resolved = False
+        self._ref_default = default
+        self._ref_kwargs = kwargs
+
+        # The reference to the Django field is only resolved on first use (see
+        # `resolve`), until then this is a placeholder without any annotation
+        super().__init__()
+
+    def resolve(self) -> "DjangoModelRefInfo":
+        """
+        Resolve the referenced Django field and derive the field info from it.
+
+        This requires the Django app registry to be ready. It is called by
+        `ConfigurationModel` when its fields are first used, and is idempotent.
+        """
+        if self.is_resolved:
+            return self
+
+        model, field_name = self.model, self.field_name
+        default, kwargs = self._ref_default, dict(self._ref_kwargs)
         try:
             resolved_model = get_model_from_ref(model)
             self.django_field = resolved_model._meta.get_field(field_name)
@@ -76,8 +179,40 @@ class DjangoModelRefInfo(FieldInfo):
                 f"{model if isinstance(model, str) else model.__class__}"
             ) from None
 
-        self.model = model
-        self.field_name = field_name
+        # Inferring the type and default is relatively expensive, and the same fields
+        # tend to be referenced from several configuration models
+        try:
+            cache_key = (
+                resolved_model,
+                field_name,
+                type(default),
+                default,
+                tuple(sorted(kwargs.items())),
+            )
+            hash(cache_key)
+        except TypeError:
+            cache_key = None
+
+        if cache_key is not None and cache_key in _field_info_cache:
+            self.python_type, field_info_creation_kwargs = _field_info_cache[cache_key]
+        else:
+            field_info_creation_kwargs = self._infer_field_info(default, kwargs)
+            if cache_key is not None:
+                _field_info_cache[cache_key] = (
+                    self.python_type,
+                    field_info_creation_kwargs,
+                )
+
+        super().__init__(**field_info_creation_kwargs)
+        self.is_resolved = True
+        return self
+
+    def _infer_field_info(self, default: Any, kwargs: dict) -> dict[str, Any]:
+        """
+        Infer the Python type and field info arguments from the Django field.
+
+        Sets `python_type`, and returns the keyword arguments for `FieldInfo`.
+        """
         self.python_type = self._get_python_type(self.django_field)
         field_info_creation_kwargs: dict[str, Any] = {
             "title": self.django_field.verbose_name,
@@ -118,7 +253,7 @@ class DjangoModelRefInfo(FieldInfo):
             # field's python type and, if not, expand the annotation to include the
             # default value.
             try:
-                TypeAdapter(self.python_type).validate_python(inferred_default)
+                _get_type_adapter(self.python_type).validate_python(inferred_default)
             except PydanticSchemaGenerationError:
                 # For unmapped fields, this is an expected failure, and we can't amend
                 # the annotation because we don't have a base type to amend. In that
@@ -157,7 +292,7 @@ class DjangoModelRefInfo(FieldInfo):
         if examples := kwargs.get("examples"):
             field_info_creation_kwargs["examples"] = examples
 
-        return super().__init__(**field_info_creation_kwargs)
+        return field_info_creation_kwargs
 
     @staticmethod
     def _get_python_type(
@@ -171,56 +306,7 @@ class DjangoModelRefInfo(FieldInfo):
             )
             return Literal[choice_values]
 
-        mapping: Mapping[
-            type[Field],
-            type[
-                str
-                | int
-                | float
-                | bool
-                | decimal.Decimal
-                | datetime.time
-                | datetime.datetime
-                | datetime.timedelta
-                | dict
-            ],
-        ] = {
-            # String-based fields
-            models.CharField: str,
-            models.TextField: str,
-            models.EmailField: str,
-            models.URLField: str,
-            models.UUIDField: str,
-            models.SlugField: constr(pattern=_SLUG_RE),
-            # Integer-based fields
-            models.AutoField: int,
-            models.SmallAutoField: int,
-            models.IntegerField: int,
-            models.BigIntegerField: int,
-            models.PositiveIntegerField: int,
-            models.PositiveSmallIntegerField: int,
-            models.PositiveBigIntegerField: int,
-            models.SmallIntegerField: int,
-            # Other numeric
-            models.FloatField: float,
-            models.DecimalField: decimal.Decimal,
-            # Datetime
-            models.TimeField: datetime.time,
-            models.DateTimeField: datetime.datetime,
-            models.DurationField: datetime.timedelta,
-            # Misc
-            models.BooleanField: bool,
-            models.JSONField: dict,
-        }
-        try:
-            field_type = type(django_field)
-            return mapping[field_type]
-        except KeyError:
-            # If a type is unmapped, we return a sentinel value here to be picked up
-            # by the metaclass, which will subsequently check if the user has
-            # overridden the type annotation. If not, an exception will be raised
-            # prompting the user to do so.
-            return UNMAPPED_DJANGO_FIELD
+        return get_django_field_type(type(django_field))
 
 
 def DjangoModelRef(
@@ -257,3 +343,110 @@ def DjangoModelRef(
         default=default,
         **kwargs,
     )
+
+
+T = TypeVar("T")
+
+
+class StreamedList(Generic[T]):
+    """
+    A list-field annotation for large lists, which validates its items in chunks.
+
+    When the model is validated, the items are validated one chunk at a time and
+    subsequently discarded, so only the raw input is kept in memory. Validation errors
+    are reported for each invalid item, with its index in the list. When iterated
+    over, the items are validated again, one chunk at a time, so that a step can
+    consume the items incrementally (e.g. using `chunks` for bulk operations).
+
+    Note that every pass over the list (iterating, `chunks`, indexing, comparing)
+    validates the items it accesses again, and the validated items are not cached.
+    Steps should therefore pass over the list once, e.g. by collecting what they need
+    for later along the way, rather than iterating it repeatedly.
+
+    Example:
+        class UsersConfigurationModel(ConfigurationModel):
+            users: StreamedList[UserConfigurationItem]
+    """
+
+    chunk_size: ClassVar[int] = 1000
+
+    def __init__(self, items: Sequence[Any], adapter: TypeAdapter):
+        self._items = items
+        self._adapter = adapter
+
+    def chunks(self, chunk_size: int | None = None) -> Iterator[list[T]]:
+        """
+        Validate and yield the items in chunks of (at most) `chunk_size` items.
+        """
+        chunk_size = chunk_size or self.chunk_size
+        for start in range(0, len(self._items), chunk_size):
+            yield self._adapter.validate_python(self._items[start : start + chunk_size])
+
+    def __iter__(self) -> Iterator[T]:
+        # Validates all the items again, see the class docstring
+        for chunk in self.chunks():
+            yield from chunk
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __getitem__(self, index: int | slice):
+        if isinstance(index, slice):
+            return self._adapter.validate_python(self._items[index])
+        return self._adapter.validate_python([self._items[index]])[0]
+
+    def __eq__(self, other):
+        if isinstance(other, StreamedList | list | tuple):
+            return len(self) == len(other) and list(self) == list(other)
+        return NotImplemented
+
+    __hash__ = None  # type: ignore
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(<{len(self)} items>)"
+
+    @classmethod
+    def __get_pydantic_core_schema__(
+        cls, source: Any, handler: GetCoreSchemaHandler
+    ) -> core_schema.CoreSchema:
+        (item_type,) = get_args(source) or (Any,)
+        item_schema = handler.generate_schema(item_type)
+
+        @functools.cache
+        def get_adapter(adapter_type: Any) -> TypeAdapter:
+            # Built on first use, as the item type might not be complete yet
+            return TypeAdapter(adapter_type)
+
+        def validate(value: Any, validate_list) -> StreamedList:
+            if isinstance(value, StreamedList):
+                return value
+
+            adapter = get_adapter(list[item_type])
+            if not isinstance(value, list | tuple):
+                # Let pydantic handle (or reject) other kinds of input
+                return cls(validate_list(value), adapter)
+
+            invalid_items = {}
+            for start in range(0, len(value), cls.chunk_size):
+                chunk = value[start : start + cls.chunk_size]
+                try:
+                    adapter.validate_python(chunk)
+                except ValidationError as exc:
+                    for error in exc.errors(include_url=False):
+                        index = error["loc"][0]
+                        invalid_items[start + index] = chunk[index]
+
+            if invalid_items:
+                # Validate only the invalid items again, keyed by their index, to
+                # report their errors (with their original types) at the right index
+                get_adapter(dict[int, item_type]).validate_python(invalid_items)
+
+            return cls(value, adapter)
+
+        return core_schema.no_info_wrap_validator_function(
+            validate,
+            core_schema.list_schema(item_schema),
+            serialization=core_schema.plain_serializer_function_ser_schema(
+                list, return_schema=core_schema.list_schema(item_schema)
+            ),
+        )
@@ -0,0 +1,221 @@
+import hashlib
+import json
+from collections.abc import Callable, Collection, Hashable, Iterable, Sequence
+from dataclasses import dataclass, field
+from typing import Any, Generic, TypeVar
+
+from pydantic import BaseModel
+
+from django_setup_configuration.configuration import BaseConfigurationStep
+from django_setup_configuration.models import StepJournalEntry
+
+T = TypeVar("T")
+
+JOURNAL_BATCH_SIZE = 1000
+
+
+def get_item_digest(item: Any, *, exclude: Collection[str] = ()) -> str:
+    """
+    Return a stable digest of a configuration item.
+
+    Pydantic models are hashed by their JSON representation, which means that secrets
+    (e.g. `SecretStr` fields) do not contribute to the digest. Secrets stored in plain
+    `str` fields would, and can be brute-forced from the unsalted digest, so they
+    should be passed as `exclude`.
+    """
+    if isinstance(item, BaseModel):
+        item = item.model_dump(mode="json", exclude=set(exclude))
+    elif exclude and isinstance(item, dict):
+        item = {name: value for name, value in item.items() if name not in exclude}
+
+    data = json.dumps(item, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(data.encode()).hexdigest()
+
+
+@dataclass
+class JournalChanges(Generic[T]):
+    """
+    The changes of a list of configuration items relative to the last applied run.
+
+    Attributes:
+        added (`list`): the items which were not applied before
+        changed (`list`): the items which were applied before, with different values
+        removed (`list[str]`): the keys of the items applied before, which are no
+            longer part of the configuration
+        unchanged (`list`): the items which were applied before with the same values,
+            and which do not have to be applied unless the database may have been
+            changed by other means
+    """
+
+    added: list[T] = field(default_factory=list)
+    changed: list[T] = field(default_factory=list)
+    removed: list[str] = field(default_factory=list)
+    unchanged: list[T] = field(default_factory=list)
+
+    # The digests of the added and changed items, recorded by `StepJournal.record`
+    digests: dict[str, str] = field(default_factory=dict, repr=False)
+
+    @property
+    def pending(self) -> list[T]:
+        """
+        The items which have to be applied, i.e. the added and changed items.
+        """
+        return self.added + self.changed
+
+    @property
+    def unchanged_count(self) -> int:
+        return len(self.unchanged)
+
+    @property
+    def has_changes(self) -> bool:
+        return bool(self.added or self.changed or self.removed)
+
+
+class StepJournal:
+    """
+    Tracks the configuration items applied by a step, so that subsequent runs only
+    have to apply the items that were added or changed in the meantime.
+
+    The journal stores a digest per item natural key, and is scoped to the namespace
+    of the step. Because it only knows about the configuration, changes made to the
+    database by other means (e.g. in the admin) are not detected, unless the step
+    provides a way to check which objects still exist (see `get_changes`).
+
+    Example:
+        ```python
+        def execute(self, model):
+            journal = StepJournal.for_step(self)
+            changes = journal.get_changes(model.items, key=lambda item: item.slug)
+            for item in changes.pending:
+                Foo.objects.update_or_create(slug=item.slug, defaults=...)
+            journal.record(changes)
+        ```
+
+    The records are written in the transaction of the step, so they are rolled back
+    along with the changes of the step if the run fails.
+    """
+
+    def __init__(self, step: str, *, batch_size: int = JOURNAL_BATCH_SIZE):
+        self.step = step
+        self.batch_size = batch_size
+
+    @classmethod
+    def for_step(cls, step: BaseConfigurationStep, **kwargs) -> "StepJournal":
+        return cls(step.namespace, **kwargs)
+
+    def get_digests(self) -> dict[str, str]:
+        """
+        Return the digests of the items as they were last applied, by their key.
+        """
+        return dict(
+            StepJournalEntry.objects.filter(step=self.step).values_list("key", "digest")
+        )
+
+    def get_removed_keys(self, keys: Collection[str]) -> list[str]:
+        """
+        Return the keys of the items applied before, which are not in `keys`.
+
+        Unlike `get_changes`, this does not need the configuration items themselves.
+        """
+        return [key for key in self.get_digests() if key not in keys]
+
+    def get_changes(
+        self,
+        items: Iterable[T],
+        *,
+        key: Callable[[T], Hashable],
+        get_existing_keys: Callable[[Sequence[str]], Iterable[str]] | None = None,
+        digest: Callable[[T], str] = get_item_digest,
+    ) -> JournalChanges[T]:
+        """
+        Compare the configuration items to the items that were last applied.
+
+        Args:
+            items: the configuration items
+            key: a callable returning the natural key of an item, which is stored as
+                a string
+            get_existing_keys: an optional callable which receives a batch of keys of
+                unchanged items, and returns the keys for which the object still
+                exists. Unchanged items whose object no longer exists are reported as
+                added, so they are applied again.
+            digest: a callable returning the digest of an item, which is stored.
+                Defaults to `get_item_digest`; pass e.g. `partial(get_item_digest,
+                exclude={"password"})` to leave secrets out of the stored digests.
+
+        Returns:
+            JournalChanges: the added, changed and removed items. If an item occurs
+                more than once, only the last occurrence is considered.
+        """
+        previous = self.get_digests()
+        changes: JournalChanges[T] = JournalChanges()
+
+        added: dict[str, T] = {}
+        changed: dict[str, T] = {}
+        unchanged: dict[str, T] = {}
+        for item in items:
+            item_key = str(key(item))
+            item_digest = digest(item)
+            for bucket in (added, changed, unchanged):
+                bucket.pop(item_key, None)
+
+            if item_key not in previous:
+                added[item_key] = item
+            elif previous[item_key] != item_digest:
+                changed[item_key] = item
+            else:
+                unchanged[item_key] = item
+            changes.digests[item_key] = item_digest
+
+        if get_existing_keys and unchanged:
+            unchanged_keys = list(unchanged)
+            existing = set()
+            for start in range(0, len(unchanged_keys), self.batch_size):
+                batch = unchanged_keys[start : start + self.batch_size]
+                existing.update(str(k) for k in get_existing_keys(batch))
+
+            for item_key in unchanged_keys:
+                if item_key not in existing:
+                    added[item_key] = unchanged.pop(item_key)
+
+        for item_key in unchanged:
+            del changes.digests[item_key]
+
+        changes.added = list(added.values())
+        changes.changed = list(changed.values())
+        changes.removed = [
+            k for k in previous if k not in changes.digests and k not in unchanged
+        ]
+        changes.unchanged = list(unchanged.values())
+        return changes
+
+    def record(self, changes: JournalChanges, *, keep_removed: bool = False) -> None:
+        """
+        Record the changes as applied.
+
+        Args:
+            changes: the changes returned by `get_changes`
+            keep_removed: whether to keep the records of the removed items, so they
+                are reported as removed again on the next run (e.g. because the step
+                did not act on them yet)
+        """
+        stale_keys = list(changes.digests)
+        if not keep_removed:
+            stale_keys += changes.removed
+        for start in range(0, len(stale_keys), self.batch_size):
+            StepJournalEntry.objects.filter(
+                step=self.step, key__in=stale_keys[start : start + self.batch_size]
+            ).delete()
+
+        StepJournalEntry.objects.bulk_create(
+            (
+                StepJournalEntry(step=self.step, key=item_key, digest=digest)
+                for item_key, digest in changes.digests.items()
+            ),
+            batch_size=self.batch_size,
+        )
+
+    def clear(self) -> None:
+        """
+        Remove all records of the step, so that all items are applied on the next run.
+        """
+        StepJournalEntry.objects.filter(step=self.step).delete()
@@ -1,15 +1,40 @@
 import functools
+import sys
 import textwrap
+from os import PathLike
 from pathlib import Path
 
 from django.core.management import BaseCommand, CommandError
-
-from django_setup_configuration.exceptions import ValidateRequirementsFailure
-from django_setup_configuration.runner import SetupConfigurationRunner
+from django.db import DEFAULT_DB_ALIAS
 
 indent = functools.partial(textwrap.indent, prefix=" " * 4)
 
 
+def positive_int(value: str) -> int:
+    if (number := int(value)) < 1:
+        raise ValueError(f"{value} is not a positive integer")
+    return number
+
+
+def positive_float(value: str) -> float:
+    if (number := float(value)) <= 0:
+        raise ValueError(f"{value} is not a positive number")
+    return number
+
+
+def get_committed_steps(step_results) -> list[str]:
+    """
+    Describe the executed steps whose changes were committed by worker processes, and
+    are therefore not rolled back when the run fails.
+    """
+    return [
+        f"`{result.step}`"
+        + (" (only the shards which succeeded)" if result.run_exception else "")
+        for result in step_results
+        if result.executed_in_workers
+    ]
+
+
 class Command(BaseCommand):
     help = (
         "Bootstrap the initial configuration of the application. "
@@ -20,13 +45,94 @@ class Command(BaseCommand):
         "in the admin if you run the command after making these changes. "
     )
     output_transaction = True
+    stealth_options = ("stdin",)
 
     def add_arguments(self, parser):
+        # Imports that pull in pydantic and the configuration steps are deferred, so
+        # they are only paid for when the command is actually used
+        from django_setup_configuration.sources import SOURCE_FORMATS
+
         parser.add_argument(
             "--yaml-file",
             type=str,
-            required=True,
-            help="Path to YAML file containing the configurations",
+            nargs="+",
+            action="extend",
+            help="Path to YAML file containing the configurations, or `-` to read "
+            "from stdin. Gzip and bzip2 compressed files are supported. Can be "
+            "provided multiple times, or point to a directory of YAML files, in which "
+            "case the files are merged in order, with later files taking precedence.",
+        )
+        parser.add_argument(
+            "--format",
+            dest="source_format",
+            choices=sorted(SOURCE_FORMATS),
+            default=None,
+            help="The format of the configuration files. By default, the format is "
+            "detected from the file extension, falling back to YAML (e.g. for stdin).",
+        )
+        parser.add_argument(
+            "--snapshot",
+            type=str,
+            help="Path to a snapshot created with --compile, to use instead of "
+            "--yaml-file. The snapshot must have been created for the same steps.",
+        )
+        parser.add_argument(
+            "--compile",
+            type=str,
+            metavar="OUT",
+            help="Validate the configuration and write the validated configuration to "
+            "a snapshot at the given path, without executing the steps. Note that the "
+            "snapshot contains the values substituted from environment variables.",
+        )
+        parser.add_argument(
+            "--only",
+            type=str,
+            nargs="+",
+            action="extend",
+            metavar="STEP",
+            help="Only consider the given steps, specified by their class path or "
+            "namespace, or a glob pattern of these (e.g. `myapp.steps.*` or `oidc_*`). "
+            "Steps outside the selection are not loaded.",
+        )
+        parser.add_argument(
+            "--exclude",
+            type=str,
+            nargs="+",
+            action="extend",
+            metavar="STEP",
+            help="Ignore the given steps, specified like --only.",
+        )
+        parser.add_argument(
+            "--fail-fast",
+            type=positive_int,
+            nargs="?",
+            const=1,
+            default=0,
+            metavar="N",
+            help="Stop validating after the first step (or N steps) with invalid "
+            "configuration settings.",
+        )
+        parser.add_argument(
+            "--max-errors-per-step",
+            type=positive_int,
+            default=None,
+            metavar="N",
+            help="Only show the first N validation errors for each step with invalid "
+            "configuration settings.",
+        )
+        parser.add_argument(
+            "--validation-workers",
+            type=positive_int,
+            default=1,
+            metavar="N",
+            help="Validate the configuration settings of up to N steps concurrently.",
+        )
+        parser.add_argument(
+            "--validation-processes",
+            action="store_true",
+            default=False,
+            help="Use worker processes rather than threads for --validation-workers, "
+            "which can be faster for very large configurations.",
         )
         parser.add_argument(
             "--validate-only",
@@ -35,37 +141,181 @@ class Command(BaseCommand):
             help="Validate that all the step configurations can be successfully loaded "
             "from source, without actually executing the steps.",
         )
+        parser.add_argument(
+            "--step-timeout",
+            type=positive_float,
+            metavar="SECONDS",
+            help="The maximum time each step may take to execute, unless the step "
+            "declares its own timeout. A step which exceeds it fails, and the run is "
+            "rolled back.",
+        )
+        parser.add_argument(
+            "--timeout",
+            type=positive_float,
+            metavar="SECONDS",
+            help="The maximum time all steps together may take to execute.",
+        )
+        parser.add_argument(
+            "--max-retries",
+            type=positive_int,
+            metavar="N",
+            help="Retry a step up to N times if it fails due to a deadlock (on "
+            "PostgreSQL) or a locked database (on SQLite) caused by concurrent "
+            "transactions.",
+        )
+        parser.add_argument(
+            "--database",
+            dest="databases",
+            type=str,
+            nargs="+",
+            action="extend",
+            metavar="ALIAS",
+            help="Execute the steps against the given databases instead of the default "
+            "database, each in its own transaction. Requires "
+            "`django_setup_configuration.routers.SetupConfigurationDatabaseRouter` in "
+            "the DATABASE_ROUTERS setting.",
+        )
+        parser.add_argument(
+            "--tenant",
+            dest="tenants",
+            type=str,
+            action="append",
+            metavar="ALIAS=FILE",
+            help="Execute the steps against the database ALIAS, with the configuration "
+            "in FILE merged over the configuration of --yaml-file. Can be provided "
+            "multiple times, and combined with --database.",
+        )
+        parser.add_argument(
+            "--target-workers",
+            type=positive_int,
+            default=1,
+            metavar="N",
+            help="Execute the steps against up to N databases concurrently, when "
+            "executing them against multiple databases.",
+        )
+        parser.add_argument(
+            "--export",
+            metavar="DESTINATION",
+            help="Export the current database state of the configured steps to a YAML "
+            "file (or to stdout with -), instead of applying a configuration. The "
+            "file can subsequently be used with --yaml-file. User passwords are not "
+            "exported: applying the file requires the environment variable "
+            "SETUP_CONFIGURATION_EXPORTED_PASSWORD, which provides the password of "
+            "all exported users that do not exist yet.",
+        )
+        parser.add_argument(
+            "--check-drift",
+            action="store_true",
+            default=False,
+            help="Validate the configuration and compare it to the current state of "
+            "the database, without executing the steps. Exits with a non-zero code if "
+            "differences are found.",
+        )
+        parser.add_argument(
+            "--plan",
+            action="store_true",
+            default=False,
+            help="Validate the configuration and report the changes the steps would "
+            "make (e.g. the objects they would delete), without executing them.",
+        )
 
     def handle(self, **options):
+        from django_setup_configuration.exceptions import (
+            ValidateRequirementsFailure,
+            format_validation_error,
+        )
+        from django_setup_configuration.runner import SetupConfigurationRunner
+        from django_setup_configuration.sources import STDIN
+
         validate_only = options["validate_only"]
-        yaml_file = Path(options["yaml_file"]).resolve()
-        if not yaml_file.exists():
-            raise CommandError(f"Yaml file `{yaml_file}` does not exist.")
+        yaml_files = options.get("yaml_file") or []
+        if isinstance(yaml_files, str | PathLike):
+            yaml_files = [yaml_files]
+
+        if export_destination := options.get("export"):
+            if yaml_files or options.get("snapshot"):
+                raise CommandError(
+                    "--export cannot be combined with --yaml-file or --snapshot."
+                )
+
+            self._export(export_destination, options)
+            return
+
+        if snapshot := options.get("snapshot"):
+            if yaml_files:
+                raise CommandError("--yaml-file and --snapshot cannot be combined.")
+
+            snapshot = Path(snapshot).resolve()
+            if not snapshot.exists():
+                raise CommandError(f"Snapshot `{snapshot}` does not exist.")
+
+            self.stdout.write(f"Loading config settings from snapshot {snapshot}")
+        elif not yaml_files and not options.get("tenants"):
+            raise CommandError(
+                "Error: the following arguments are required: --yaml-file"
+            )
+
+        yaml_sources, source_names = [], []
+        for yaml_file in yaml_files:
+            if yaml_file == STDIN:
+                # Allow passing a stream when invoked through `call_command`
+                yaml_sources.append(options.get("stdin") or sys.stdin.buffer)
+                source_names.append("<stdin>")
+                continue
+
+            yaml_file = Path(yaml_file).resolve()
+            if not yaml_file.exists():
+                raise CommandError(f"Yaml file `{yaml_file}` does not exist.")
 
-        self.stdout.write(f"Loading config settings from {yaml_file}")
+            yaml_sources.append(yaml_file)
+            source_names.append(str(yaml_file))
+
+        if yaml_sources:
+            self.stdout.write(f"Loading config settings from {', '.join(source_names)}")
+
+        databases = options.get("databases") or []
+        if len(databases) > 1 or options.get("tenants"):
+            self._execute_targets(yaml_sources, options)
+            return
 
         try:
-            runner = SetupConfigurationRunner(yaml_source=options["yaml_file"])
+            runner = SetupConfigurationRunner(
+                yaml_source=yaml_sources,
+                source_format=options.get("source_format"),
+                snapshot_source=snapshot,
+                only=options.get("only"),
+                exclude=options.get("exclude"),
+                step_timeout=options.get("step_timeout"),
+                timeout=options.get("timeout"),
+                max_retries=options.get("max_retries") or 0,
+                using=databases[0] if databases else DEFAULT_DB_ALIAS,
+            )
         except Exception as exc:
             raise CommandError(str(exc)) from None
 
-        if not runner.configured_steps:
+        if not runner.configured_steps and not runner.deferred_steps:
+            if runner.only or runner.exclude:
+                raise CommandError("No steps match the step selection, aborting.")
             raise CommandError("No steps configured, aborting.")
 
         self.stdout.write("The following steps are configured:")
+        enabled_steps = runner.enabled_steps
         for step in runner.configured_steps:
-            step_is_enabled = step in runner.enabled_steps
+            step_is_enabled = step in enabled_steps
             self.stdout.write(
                 indent(
                     f"{step.verbose_name} from {step.__class__}"
                     f" [{'enabled' if step_is_enabled else '***disabled***'}]"
                 ),
             )
+        for deferred_step in runner.deferred_steps:
+            self.stdout.write(indent(f"{deferred_step} [***disabled***]"))
 
-        if not runner.enabled_steps:
+        if not enabled_steps:
             raise CommandError("No steps enabled, aborting.")
 
-        if disabled_steps := runner.disabled_steps:
+        disabled_steps = runner.disabled_steps
+        if disabled_steps or runner.deferred_steps:
             self.stdout.write(
                 "The following steps will be skipped because they are disabled:",
                 self.style.WARNING,
@@ -78,13 +328,22 @@ class Command(BaseCommand):
                     ),
                     self.style.WARNING,
                 )
+            for deferred_step in runner.deferred_steps:
+                self.stdout.write(
+                    indent(f"{deferred_step} [{deferred_step.enable_setting} = false]"),
+                    self.style.WARNING,
+                )
 
         # 1. Check prerequisites of all steps
         steps_with_invalid_requirements = []
         self.stdout.write()
         self.stdout.write("Validating requirements...")
         try:
-            runner.validate_all_requirements()
+            runner.validate_all_requirements(
+                fail_fast=options.get("fail_fast") or 0,
+                workers=options.get("validation_workers") or 1,
+                use_processes=options.get("validation_processes", False),
+            )
         except ValidateRequirementsFailure as exc_group:
             for exc in exc_group.exceptions:
                 self.stderr.write(
@@ -94,10 +353,25 @@ class Command(BaseCommand):
                     )
                 )
                 # Print an indented version of the validation error
-                self.stderr.write(indent(str(exc.validation_error)), self.style.ERROR)
+                self.stderr.write(
+                    indent(
+                        format_validation_error(
+                            exc.validation_error,
+                            max_errors=options.get("max_errors_per_step"),
+                        )
+                    ),
+                    self.style.ERROR,
+                )
                 self.stderr.write()
                 steps_with_invalid_requirements.append(exc.step)
 
+            if unvalidated_steps := exc_group.unvalidated_steps:
+                self.stderr.write(
+                    f"Stopped validating early, {len(unvalidated_steps)} steps were "
+                    "not validated.",
+                    self.style.WARNING,
+                )
+
             raise CommandError(
                 f"Failed to validate requirements for {len(exc_group.exceptions)} steps"
             ) from None
@@ -106,30 +380,256 @@ class Command(BaseCommand):
             "Valid configuration settings found for all steps.", self.style.SUCCESS
         )
 
+        if compile_destination := options.get("compile"):
+            digest = runner.compile_snapshot(compile_destination)
+            self.stdout.write(
+                f"Wrote configuration snapshot to {compile_destination} "
+                f"(sha256: {digest})",
+                self.style.SUCCESS,
+            )
+            return
+
         # Bail out early if we're only validating
         if validate_only:
             return
 
+        if options.get("check_drift"):
+            self.stdout.write()
+            self.stdout.write("Checking for drift...")
+            drifted_steps = 0
+            for step_diff in runner.diff_all():
+                if step_diff.differences is None:
+                    self.stdout.write(
+                        indent(
+                            f"{step_diff.step.verbose_name}: drift detection is not "
+                            "supported by this step"
+                        ),
+                        self.style.WARNING,
+                    )
+                    continue
+
+                if not step_diff.differences:
+                    self.stdout.write(
+                        indent(f"{step_diff.step.verbose_name}: no drift"),
+                        self.style.SUCCESS,
+                    )
+                    continue
+
+                drifted_steps += 1
+                self.stdout.write(
+                    indent(f"{step_diff.step.verbose_name}:"), self.style.ERROR
+                )
+                for difference in step_diff.differences:
+                    self.stdout.write(indent(difference, prefix=" " * 8))
+
+            if drifted_steps:
+                raise CommandError(f"Drift detected for {drifted_steps} steps")
+
+            self.stdout.write("No drift detected.", self.style.SUCCESS)
+            return
+
+        if options.get("plan"):
+            self.stdout.write()
+            self.stdout.write("Planned changes:")
+            for step_plan in runner.plan_all():
+                self.stdout.write(indent(f"{step_plan.step.verbose_name}:"))
+                if step_plan.changes is None:
+                    changes = ["(planning is not supported by this step)"]
+                else:
+                    changes = step_plan.changes or ["(no changes)"]
+                for change in changes:
+                    self.stdout.write(indent(change, prefix=" " * 8))
+            return
+
         # 2. Execute steps
         self.stdout.write()
         self.stdout.write("Executing steps...")
-        for result in runner.execute_all_iter():
+        results = runner.execute_all()
+        for result in results:
             if exc := result.run_exception:
                 self.stderr.write(
                     f"Error while executing step `{result.step}`", self.style.ERROR
                 )
                 self.stderr.write(indent(str(exc)))
 
-                raise CommandError(
-                    "Aborting run due to a failed step. All database changes have been"
-                    " rolled back."
-                ) from exc
+                message = "Aborting run due to a failed step. All database changes"
+                if committed_steps := get_committed_steps(results):
+                    message += (
+                        " have been rolled back, except those of the sharded steps "
+                        f"{', '.join(committed_steps)}, which were committed by "
+                        "their worker processes."
+                    )
+                else:
+                    message += " have been rolled back."
+                raise CommandError(message) from exc
             else:
-                self.stdout.write(
-                    indent(f"Successfully executed step: {result.step}"),
-                    self.style.SUCCESS,
-                )
+                message = f"Successfully executed step: {result.step}"
+                if result.retries:
+                    message += (
+                        f" (after {result.retries} "
+                        f"{'retry' if result.retries == 1 else 'retries'}, waited "
+                        f"{result.retry_wait:.1f}s)"
+                    )
+                self.stdout.write(indent(message), self.style.SUCCESS)
 
         # Done
         self.stdout.write("")
         self.stdout.write("Configuration completed.", self.style.SUCCESS)
+
+    def _execute_targets(self, yaml_sources: list, options):
+        from django_setup_configuration.exceptions import ImproperlyConfigured
+        from django_setup_configuration.targets import RunTarget, execute_targets_iter
+
+        for option in ("snapshot", "compile", "validate_only", "check_drift", "plan"):
+            if options.get(option):
+                raise CommandError(
+                    f"--{option.replace('_', '-')} cannot be combined with multiple "
+                    "databases or --tenant."
+                )
+
+        targets = [
+            RunTarget(name=alias, using=alias)
+            for alias in options.get("databases") or []
+        ]
+        for tenant in options.get("tenants") or []:
+            alias, _, tenant_file = tenant.partition("=")
+            if not alias or not tenant_file:
+                raise CommandError(f"Invalid tenant `{tenant}`, expected ALIAS=FILE.")
+
+            tenant_file = Path(tenant_file).resolve()
+            if not tenant_file.exists():
+                raise CommandError(f"Yaml file `{tenant_file}` does not exist.")
+
+            targets.append(RunTarget(name=alias, using=alias, yaml_source=tenant_file))
+
+        if len({target.name for target in targets}) != len(targets):
+            raise CommandError("Each database can only be configured once per run.")
+
+        self.stdout.write()
+        self.stdout.write(f"Executing steps against {len(targets)} databases...")
+        results = execute_targets_iter(
+            targets,
+            yaml_source=yaml_sources or None,
+            max_workers=options.get("target_workers") or 1,
+            source_format=options.get("source_format"),
+            only=options.get("only"),
+            exclude=options.get("exclude"),
+            step_timeout=options.get("step_timeout"),
+            timeout=options.get("timeout"),
+            max_retries=options.get("max_retries") or 0,
+        )
+        failed_targets = 0
+        committed_targets = 0
+        try:
+            for result in results:
+                if not result.succeeded:
+                    failed_targets += 1
+                    if get_committed_steps(result.step_results):
+                        committed_targets += 1
+                self._report_target(result, options)
+        except ImproperlyConfigured as exc:
+            raise CommandError(str(exc)) from None
+
+        if failed_targets:
+            message = (
+                f"Failed to configure {failed_targets} of {len(targets)} databases. "
+                "All database changes of these databases have been rolled back"
+            )
+            if committed_targets:
+                message += (
+                    ", except those of the sharded steps listed above, which were "
+                    "committed by their worker processes"
+                )
+            raise CommandError(f"{message}.")
+
+        self.stdout.write("")
+        self.stdout.write("Configuration completed.", self.style.SUCCESS)
+
+    def _report_target(self, result, options):
+        from django_setup_configuration.exceptions import (
+            ValidateRequirementsFailure,
+            format_validation_error,
+        )
+
+        name = result.target.name
+        if result.succeeded:
+            executed_steps = sum(
+                1 for step_result in result.step_results if step_result.has_run
+            )
+            self.stdout.write(
+                indent(
+                    f"{name}: successfully executed {executed_steps} steps "
+                    f"({result.duration:.1f}s)"
+                ),
+                self.style.SUCCESS,
+            )
+            return
+
+        self.stderr.write(indent(f"{name}: failed"), self.style.ERROR)
+        if isinstance(exc := result.exception, ValidateRequirementsFailure):
+            for step_exc in exc.exceptions:
+                self.stderr.write(
+                    indent(
+                        "Invalid configuration settings for step"
+                        f' "{step_exc.step.verbose_name}":',
+                        prefix=" " * 8,
+                    ),
+                    self.style.ERROR,
+                )
+                self.stderr.write(
+                    indent(
+                        format_validation_error(
+                            step_exc.validation_error,
+                            max_errors=options.get("max_errors_per_step"),
+                        ),
+                        prefix=" " * 12,
+                    ),
+                    self.style.ERROR,
+                )
+        elif exc is not None:
+            self.stderr.write(indent(str(exc), prefix=" " * 8))
+
+        for step_result in result.failed_steps:
+            self.stderr.write(
+                indent(
+                    f"Error while executing step `{step_result.step}`", prefix=" " * 8
+                ),
+                self.style.ERROR,
+            )
+            self.stderr.write(indent(str(step_result.run_exception), prefix=" " * 12))
+
+        if committed_steps := get_committed_steps(result.step_results):
+            self.stderr.write(
+                indent(
+                    "Committed by worker processes, not rolled back: "
+                    f"{', '.join(committed_steps)}",
+                    prefix=" " * 8,
+                ),
+                self.style.WARNING,
+            )
+
+    def _export(self, destination: str, options):
+        from django_setup_configuration.runner import SetupConfigurationRunner
+        from django_setup_configuration.sources import STDIN
+
+        databases = options.get("databases") or []
+        if len(databases) > 1 or options.get("tenants"):
+            raise CommandError(
+                "--export cannot be combined with multiple databases or --tenant."
+            )
+
+        runner = SetupConfigurationRunner(
+            only=options.get("only"),
+            exclude=options.get("exclude"),
+            using=databases[0] if databases else DEFAULT_DB_ALIAS,
+        )
+        if destination == STDIN:
+            exported_steps = runner.export(self.stdout)
+        else:
+            exported_steps = runner.export(destination)
+
+        # Report on stderr, which keeps stdout clean when exporting to stdout
+        for step in exported_steps:
+            self.stderr.write(indent(f"Exported step: {step}"), self.style.SUCCESS)
+        if not exported_steps:
+            raise CommandError("None of the configured steps support exporting.")
@@ -2,7 +2,7 @@ import collections
 import os
 from collections.abc import Mapping, Sequence
 from pathlib import Path
-from typing import Any, TypeAlias
+from typing import TYPE_CHECKING, Any, TypeAlias
 
 import pydantic
 from pydantic import create_model
@@ -18,7 +18,10 @@ from pydantic_settings import (
 )
 from pydantic_settings.sources import PydanticBaseSettingsSource
 
-from django_setup_configuration.models import ConfigurationModel
+from django_setup_configuration.configuration_models import ConfigurationModel
+
+if TYPE_CHECKING:
+    from django_setup_configuration.sources import ConfigDocument
 
 ConfigSourceModels = collections.namedtuple(
     "ConfigSourceModels", ["enable_setting_source", "config_settings_source"]
@@ -64,10 +67,22 @@ class ValueFrom(pydantic.BaseModel):
 
 
 class YamlWithEnvSubstitution(YamlConfigSettingsSource):
-    """Modified YAML source that recursively substitutes markers with env vars."""
+    """Modified YAML source that recursively substitutes markers with env vars.
+
+    If a `config_document` is provided, it is used instead of reading the YAML file,
+    and only the keys required by the settings class are taken from it.
+    """
 
-    def __init__(self, namespace: str, **kwargs):
+    def __init__(
+        self,
+        namespace: str,
+        *,
+        config_document: "ConfigDocument | None" = None,
+        **kwargs,
+    ):
         self.namespace = namespace
+        self.config_document = config_document
+        self._required_keys = list(kwargs["settings_cls"].model_fields)
         super().__init__(**kwargs)
 
     @staticmethod
@@ -125,6 +140,12 @@ class YamlWithEnvSubstitution(YamlConfigSettingsSource):
             case _:
                 return data
 
+    def _read_files(self, files, *args, **kwargs) -> dict[str, Any]:
+        if self.config_document is not None:
+            return self.config_document.to_dict(self._required_keys)
+
+        return super()._read_files(files, *args, **kwargs)
+
     def _read_file(self, file_path: Path) -> dict[str, Any]:
         # We override this method to perform environment variable substitution before
         # the parent class validates the loaded data against the Pydantic model, which
@@ -144,6 +165,7 @@ def create_config_source_models(
     config_model: ConfigurationModel,
     *,
     yaml_file: str | None = None,
+    config_document: "ConfigDocument | None" = None,
 ) -> ConfigSourceModels:
     """
     Construct a pair of ConfigurationModels to load step settings from a source.
@@ -155,6 +177,9 @@ def create_config_source_models(
             into `namespace` in the resulting config settings source model.
         yaml_file (str | None, optional): A YAML file from which to load the enable
             setting and config values. Defaults to None.
+        config_document (ConfigDocument | None, optional): An already parsed document
+            from which to load the enable setting and config values, which takes
+            precedence over `yaml_file`. Defaults to None.
 
     Returns:
         ConfigSourceModels: A named tuple containing two ConfigurationModel classes,
@@ -185,7 +210,10 @@ def create_config_source_models(
                 InitSettingsSource(settings_cls, init_kwargs=init_settings.init_kwargs),
             ) + (
                 YamlWithEnvSubstitution(
-                    namespace=namespace, settings_cls=settings_cls, yaml_file=yaml_file
+                    namespace=namespace,
+                    config_document=config_document,
+                    settings_cls=settings_cls,
+                    yaml_file=yaml_file,
                 ),
             )
 
@@ -1,68 +1,41 @@
-from typing import Any
+from importlib import import_module
 
-from pydantic import BaseModel
-from pydantic_settings import BaseSettings, SettingsConfigDict
+from django.db import models
 
-from django_setup_configuration.fields import (
-    UNMAPPED_DJANGO_FIELD,
-    DjangoModelRef,
-    DjangoModelRefInfo,
-    get_model_from_ref,
-)
+# The configuration models live in `configuration_models`, because this module is
+# imported by the app registry on every `manage.py` invocation, whereas importing them
+# pulls in pydantic. They can still be imported from here.
+_LAZY_EXPORTS = {
+    "ConfigurationModel": ".configuration_models",
+    "DjangoRefsMetaclass": ".configuration_models",
+}
 
 
-class DjangoRefsMetaclass(BaseModel.__class__):  # type: ignore
-    """
-    A custom Pydantic metaclass to derive annotations from `DjangoModelRef` fields.
-
-    This metaclass is required to define DjangoModelRef without explicit
-    annotations, instead taking the type from the underlying Django model field.
-    Do not use this directly: instead, using `ConfigurationModel`.
-    """
-
-    def __new__(
-        cls,
-        name: str,
-        bases: tuple[type[Any], ...],
-        namespace: dict[str, Any],
-        *args,
-        **kwargs: Any,
-    ):
-        annotations = namespace.setdefault("__annotations__", {})
-
-        if meta := namespace.get("Meta", None):
-            extra_kwargs = getattr(meta, "extra_kwargs", {})
-            if django_model_refs := getattr(meta, "django_model_refs", None):
-                if not isinstance(django_model_refs, dict):
-                    raise ValueError("`django_model_refs` must be a dict")
+def __getattr__(name: str):
+    if module_name := _LAZY_EXPORTS.get(name):
+        value = getattr(import_module(module_name, __package__), name)
+        globals()[name] = value
+        return value
 
-                for model_cls, fields in django_model_refs.items():
-                    for field in fields:
-                        field_kwargs = extra_kwargs.get(field, {})
-                        namespace[field] = DjangoModelRef(
-                            get_model_from_ref(model_cls), field, **field_kwargs
-                        )
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-        for key, value in namespace.items():
-            if isinstance(value, DjangoModelRefInfo):
-                if key not in annotations:
-                    # We were unable to map this type, and the user did not override
-                    # the annotation. Raise an exception and prompt to user to add one.
-                    if value.python_type is UNMAPPED_DJANGO_FIELD:
-                        raise ValueError(
-                            f"We could not infer a type for attribute `{key}` with "
-                            f"Django field type {type(value.django_field)}. Please "
-                            "add an explicit type annotation."
-                        )
 
-                    annotations[key] = value.python_type
-
-        return super().__new__(cls, name, bases, namespace, *args, **kwargs)
-
-
-class ConfigurationModel(BaseSettings, metaclass=DjangoRefsMetaclass):
+class StepJournalEntry(models.Model):
     """
-    A base for defining configuration settings to be used in a BaseConfigurationStep.
+    The digest of a configuration item, as it was last applied by a step.
     """
 
-    model_config = SettingsConfigDict(extra="forbid")
+    step = models.CharField(max_length=255)
+    key = models.CharField(max_length=255)
+    digest = models.CharField(max_length=64)
+
+    class Meta:
+        app_label = "django_setup_configuration"
+        constraints = [
+            models.UniqueConstraint(
+                fields=("step", "key"), name="unique_step_journal_entry"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.step}: {self.key}"
@@ -0,0 +1,45 @@
+import random
+
+from django.db import DatabaseError
+
+from django_setup_configuration.timeouts import get_sqlstate
+
+# The SQLSTATE code of deadlocks (PostgreSQL). Serialization failures (40001) are not
+# included: they only occur under REPEATABLE READ or SERIALIZABLE, where retrying in the
+# same transaction reuses the same snapshot, and fails again. Deadlocks on MySQL and
+# MariaDB (1213) roll back the entire transaction, including the savepoint of the step,
+# so they cannot be retried by the step either.
+TRANSIENT_SQLSTATES = frozenset({"40P01"})
+# The messages of errors raised when another connection holds a lock (SQLite)
+TRANSIENT_SQLITE_MESSAGES = ("database is locked", "database table is locked")
+
+RETRY_BACKOFF = 0.1
+RETRY_MAX_DELAY = 5.0
+
+
+def is_transient_error(exc: BaseException) -> bool:
+    """
+    Whether a database error is caused by concurrent transactions (e.g. a deadlock),
+    and leaves the enclosing transaction intact, so the work may succeed if it is
+    retried from a savepoint.
+    """
+    if not isinstance(exc, DatabaseError):
+        return False
+
+    if get_sqlstate(exc) in TRANSIENT_SQLSTATES:
+        return True
+
+    return any(message in str(exc) for message in TRANSIENT_SQLITE_MESSAGES)
+
+
+def get_retry_delay(
+    retry: int, *, backoff: float = RETRY_BACKOFF, max_delay: float = RETRY_MAX_DELAY
+) -> float:
+    """
+    Return the time to wait before the `retry`-th retry (starting at 0).
+
+    The delay is drawn uniformly up to an exponentially growing bound ("full
+    jitter"), so that concurrent transactions which conflicted do not retry in
+    lockstep.
+    """
+    return random.uniform(0, min(max_delay, backoff * 2**retry))
@@ -0,0 +1,79 @@
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from django_setup_configuration.exceptions import ImproperlyConfigured
+
+_current_database: ContextVar[str | None] = ContextVar(
+    "setup_configuration_database", default=None
+)
+
+
+def get_current_database() -> str | None:
+    """
+    Return the database alias the steps are currently executed against, if any.
+    """
+    return _current_database.get()
+
+
+@contextmanager
+def use_database(using: str) -> Iterator[None]:
+    """
+    Route the queries made in the block to the database `using`, see
+    `SetupConfigurationDatabaseRouter`.
+
+    The alias is stored in a context variable, so blocks in different threads can use
+    different databases concurrently.
+    """
+    token = _current_database.set(using)
+    try:
+        yield
+    finally:
+        _current_database.reset(token)
+
+
+class SetupConfigurationDatabaseRouter:
+    """
+    Route all queries made by the configuration steps to the database the runner is
+    executing them against (see `SetupConfigurationRunner.using`).
+
+    Queries made outside of a run are left to the other routers. Add the router to the
+    start of `settings.DATABASE_ROUTERS` to run steps against other databases than the
+    default database.
+    """
+
+    def db_for_read(self, model, **hints) -> str | None:
+        return get_current_database()
+
+    def db_for_write(self, model, **hints) -> str | None:
+        return get_current_database()
+
+
+def check_database(using: str) -> None:
+    """
+    Check that the steps can be executed against the database `using`.
+
+    Raises:
+        ImproperlyConfigured: If the database is not configured, or if it is not the
+            default database and `SetupConfigurationDatabaseRouter` is not installed.
+    """
+    if using not in connections.databases:
+        raise ImproperlyConfigured(
+            f"The database `{using}` is not configured in `settings.DATABASES`"
+        )
+
+    router_path = (
+        f"{SetupConfigurationDatabaseRouter.__module__}."
+        f"{SetupConfigurationDatabaseRouter.__qualname__}"
+    )
+    if using != DEFAULT_DB_ALIAS and not any(
+        router == router_path or isinstance(router, SetupConfigurationDatabaseRouter)
+        for router in settings.DATABASE_ROUTERS
+    ):
+        raise ImproperlyConfigured(
+            f"Executing steps against the database `{using}` requires "
+            f"`{router_path}` in `settings.DATABASE_ROUTERS`"
+        )
@@ -1,34 +1,144 @@
+import copy
 import inspect
 import logging
-from collections.abc import Generator
+import multiprocessing
+import time
+import zlib
+from collections import deque
+from collections.abc import Callable, Generator, Hashable, Iterable, Iterator, Sequence
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
 from dataclasses import dataclass
+from fnmatch import fnmatchcase
 from functools import partial
 from os import PathLike
 from pathlib import Path
-from typing import Any
+from typing import IO, Any, TypeAlias
 
+import django
+from django.apps import apps as django_apps
 from django.conf import settings
-from django.db import transaction
+from django.db import DEFAULT_DB_ALIAS, transaction
 from django.utils.module_loading import import_string
 
-from pydantic import ValidationError
+from pydantic import TypeAdapter, ValidationError
 
-from django_setup_configuration.configuration import BaseConfigurationStep
+from django_setup_configuration.configuration import (
+    BaseConfigurationStep,
+    ShardableConfigurationStep,
+)
+from django_setup_configuration.configuration_models import ConfigurationModel
+from django_setup_configuration.context import RunContext
 from django_setup_configuration.exceptions import (
     ConfigurationException,
     ConfigurationRunFailed,
     ImproperlyConfigured,
     PrerequisiteFailed,
+    StepTimeout,
     ValidateRequirementsFailure,
 )
 from django_setup_configuration.model_utils import (
     ConfigSourceModels,
     create_config_source_models,
 )
-from django_setup_configuration.models import ConfigurationModel
+from django_setup_configuration.retries import (
+    RETRY_BACKOFF,
+    get_retry_delay,
+    is_transient_error,
+)
+from django_setup_configuration.routers import check_database, use_database
+from django_setup_configuration.sources import (
+    STDIN,
+    ConfigDocument,
+    ConfigSource,
+    load_snapshot,
+    load_source,
+    resolve_source_paths,
+    write_snapshot,
+)
+from django_setup_configuration.timeouts import TimeLimitExceeded, limit_duration
 
 logger = logging.getLogger(__name__)
 
+# A step class, its dotted path, or a tuple of its dotted path and enable setting
+StepSpec: TypeAlias = type[BaseConfigurationStep] | str | tuple[str, str]
+
+_enable_flag_adapter = TypeAdapter(bool)
+
+
+def _initialize_worker():
+    # Worker processes which are not forked need to set up Django themselves
+    if not django_apps.ready:
+        django.setup()
+
+
+def _validate_step_config(
+    step_path: str, namespace_data: Any, object_source: dict
+) -> bool:
+    """
+    Validate the configuration for a step in a worker process.
+
+    Returns:
+        bool: Whether the configuration is valid.
+    """
+    step = import_string(step_path)()
+    config_source_models = create_config_source_models(
+        enable_setting_key=step.enable_setting,
+        namespace=step.namespace,
+        config_model=step.config_model,
+        config_document=ConfigDocument(
+            {} if namespace_data is None else {step.namespace: namespace_data},
+            # The data was already substituted by the runner
+            substitute=False,
+        ),
+    )
+    try:
+        config_source_models.config_settings_source(**object_source)
+    except ValidationError:
+        return False
+    return True
+
+
+def _execute_shard(
+    step_path: str,
+    model_data: dict,
+    items: list[Any],
+    shard: int,
+    using: str = DEFAULT_DB_ALIAS,
+) -> "ShardExecutionResult":
+    """
+    Execute a shard of the items of a ShardableConfigurationStep in a worker process.
+    """
+    step = import_string(step_path)()
+    model = step.config_model.model_validate(model_data)
+
+    start = time.monotonic()
+    with use_database(using), transaction.atomic(using=using):
+        step.execute_items(model, items)
+
+    return ShardExecutionResult(
+        shard=shard, item_count=len(items), duration=time.monotonic() - start
+    )
+
+
+def partition_items(
+    items: Iterable[Any], *, key: Callable[[Any], Hashable], shards: int
+) -> list[list[Any]]:
+    """
+    Partition items into shards, by a stable hash of their natural key.
+    """
+    partitions: list[list[Any]] = [[] for _ in range(shards)]
+    for item in items:
+        partitions[zlib.crc32(repr(key(item)).encode()) % shards].append(item)
+    return partitions
+
+
+@dataclass(frozen=True)
+class ShardExecutionResult:
+    shard: int
+    item_count: int
+    duration: float
+
 
 @dataclass(frozen=True)
 class StepExecutionResult:
@@ -37,26 +147,125 @@ class StepExecutionResult:
     has_run: bool = False
     run_exception: BaseException | None = None
     config_model: ConfigurationModel | None = None
+    shard_results: tuple[ShardExecutionResult, ...] = ()
+    # Whether the step was executed in worker processes, which commit their changes
+    # independently of the run's transaction: even if the step failed, the shards
+    # which succeeded are not rolled back
+    executed_in_workers: bool = False
+    # The number of times the step was retried after a transient database error, and
+    # the total time waited before the retries
+    retries: int = 0
+    retry_wait: float = 0.0
+
+    @property
+    def item_count(self) -> int | None:
+        """The total number of items applied, for sharded steps."""
+        if not self.shard_results:
+            return None
+        return sum(result.item_count for result in self.shard_results)
+
+
+@dataclass
+class StepPlan:
+    step: BaseConfigurationStep
+    # A description of each change, or None if the step does not support planning
+    changes: list[str] | None
+
+
+@dataclass
+class StepDiff:
+    step: BaseConfigurationStep
+    # A description of each difference, or None if the step does not support diffing
+    differences: list[str] | None
+
+
+@dataclass(frozen=True)
+class DeferredStep:
+    """
+    A configured step which was not imported, because it is not enabled.
+    """
+
+    path: str
+    enable_setting: str
+
+    def __str__(self):
+        return self.path
 
 
 class SetupConfigurationRunner:
     """
     A utility class to validate and run one or more BaseConfigurationSteps.
+
+    The `yaml_source` can be a single file, directory, stream or `STDIN`, or a sequence
+    of these which are merged in order (see `django_setup_configuration.sources`). The
+    format of each source is detected from its file suffix, unless `source_format` is
+    provided.
+    Runners can share their parsed sources by passing the same `source_cache`, a dict
+    which maps each source to its parsed document.
+
+    Steps can be provided as a class, a dotted path, or a tuple of a dotted path and
+    the step's `enable_setting`. Steps of the latter form are only imported if they
+    are enabled in the sources; otherwise they are listed in `deferred_steps`.
+
+    The steps can be narrowed down using `only` and `exclude`, which take step paths,
+    namespaces or glob patterns of these (e.g. `myapp.steps.*` or `oidc_*`). Steps
+    outside the selection are ignored entirely. Note that steps can only be selected
+    by namespace after importing them, whereas paths are matched without importing.
+
+    The time a step may take to execute can be limited with `step_timeout` (in
+    seconds), which can be overridden per step with `BaseConfigurationStep.timeout`,
+    and the time all steps may take with `timeout`. All of these must be positive,
+    otherwise `ImproperlyConfigured` is raised. A step which exceeds its time
+    fails with `StepTimeout`, and its changes are rolled back. See
+    `django_setup_configuration.timeouts.limit_duration` for how the time is limited
+    on each database backend. The time of sharded steps is not limited, but they
+    are not started once the `timeout` of the run has passed.
+
+    Sharded steps are only executed in worker processes if no other steps were
+    executed before them in the run. Otherwise, the workers could wait for the locks
+    held by the run's transaction, which is only committed after the workers complete,
+    so such steps are executed in the runner's process and transaction instead.
+
+    A step which fails due to a transient database error which leaves the transaction
+    of the run intact, i.e. a deadlock on PostgreSQL or a lock error on SQLite (see
+    `django_setup_configuration.retries.is_transient_error`), is retried up to
+    `max_retries` times: its savepoint is rolled back and it is executed again after
+    a jittered, exponentially growing delay starting at `retry_backoff` seconds.
+    Sharded steps are not retried.
+
+    The steps are executed against the database `using`. To use another database than
+    the default database, `SetupConfigurationDatabaseRouter` has to be installed, which
+    routes the queries of the steps to this database. Use `for_database` to apply the
+    same configuration to several databases, without parsing and validating it again.
     """
 
     configured_steps: list[BaseConfigurationStep]
-    yaml_source: PathLike | None
+    deferred_steps: list[DeferredStep]
+    yaml_source: ConfigSource | Sequence[ConfigSource] | None
+    yaml_sources: list[Path | str | IO]
     object_source: dict | None
+    using: str
 
+    _config_document: ConfigDocument | None
     _config_source_models_for_step: dict[BaseConfigurationStep, ConfigSourceModels]
     _config_for_step: dict[BaseConfigurationStep, ConfigurationModel]
 
     def __init__(
         self,
         *,
-        steps: list[type[BaseConfigurationStep] | str] | None = None,
-        yaml_source: PathLike | str | None = None,
+        steps: list[StepSpec] | None = None,
+        yaml_source: ConfigSource | Sequence[ConfigSource] | None = None,
         object_source: dict | None = None,
+        source_format: str | None = None,
+        snapshot_source: ConfigSource | None = None,
+        only: Sequence[str] | None = None,
+        exclude: Sequence[str] | None = None,
+        step_timeout: float | None = None,
+        timeout: float | None = None,
+        max_retries: int = 0,
+        retry_backoff: float = RETRY_BACKOFF,
+        using: str = DEFAULT_DB_ALIAS,
+        source_cache: dict[Path | str | IO, ConfigDocument] | None = None,
     ):
         if not (configured_steps := steps or settings.SETUP_CONFIGURATION_STEPS):
             raise ImproperlyConfigured(
@@ -64,61 +273,224 @@ class SetupConfigurationRunner:
                 "`settings.SETUP_CONFIGURATION_STEPS`"
             )
 
-        self.configured_steps = self._initialize_steps(configured_steps)
+        for name, value in (("step_timeout", step_timeout), ("timeout", timeout)):
+            if value is not None and value <= 0:
+                raise ImproperlyConfigured(
+                    f"`{name}` must be a positive number of seconds, got {value!r}"
+                )
+
+        # (path, step class, declared enable setting) for each step: steps declared
+        # with their enable setting are only imported once they are known to be enabled
+        step_entries: list[tuple[str, type[BaseConfigurationStep] | None, str | None]]
+        step_entries = []
+        self.only = list(only or [])
+        self.exclude = list(exclude or [])
+        for step in configured_steps:
+            step_cls, enable_setting = None, None
+            if isinstance(step, tuple):
+                path, enable_setting = step
+            elif isinstance(step, str):
+                path = step
+            else:
+                step_cls = self._import_step(step)
+                path = self._get_step_path(step_cls)
+
+            # Steps are selected by path where possible, so that steps outside the
+            # selection are not imported
+            if (is_selected := self._is_selected(path)) is None:
+                step_cls = step_cls or self._import_step(path)
+                is_selected = self._is_selected(path, step_cls.namespace)
+
+            if not is_selected:
+                continue
+
+            if enable_setting is None:
+                step_cls = step_cls or self._import_step(path)
+                path = self._get_step_path(step_cls)
+
+            step_entries.append((path, step_cls, enable_setting))
+
+        check_database(using)
+        self.using = using
+
+        self._configured_step_paths = [path for path, _, _ in step_entries]
+        self.object_source = object_source
+        self.yaml_source = None
+        self.yaml_sources = []
+        self._config_document = None
         if yaml_source:
-            self.yaml_source = (
-                Path(yaml_source) if isinstance(yaml_source, str) else yaml_source
+            if isinstance(yaml_source, str | PathLike) and yaml_source != STDIN:
+                self.yaml_source = Path(yaml_source).resolve()
+            else:
+                self.yaml_source = yaml_source
+
+            # All files are parsed once and merged into a single document shared by all
+            # steps, but the namespace for each step is only converted, merged and
+            # substituted once it is requested
+            self.yaml_sources = resolve_source_paths(self.yaml_source)
+            self._config_document = ConfigDocument.merge(
+                [
+                    self._load_source(path, source_format, source_cache)
+                    for path in self.yaml_sources
+                ]
             )
-            self.yaml_source = self.yaml_source.resolve()
-            if not self.yaml_source.exists():
+
+        if snapshot_source:
+            if yaml_source:
                 raise ConfigurationException(
-                    f"YAML source is not an existing file path: {self.yaml_source}"
+                    "Provide either a YAML source or a snapshot source, not both"
+                )
+
+            # The snapshot contains data which has been substituted and validated
+            # before, so it can be loaded into the step models directly
+            self._config_document = load_snapshot(
+                snapshot_source, steps=self.configured_step_paths
+            )
+
+        self.configured_steps = []
+        self.deferred_steps = []
+        for path, step_cls, enable_setting in step_entries:
+            if enable_setting is not None:
+                if step_cls is None:
+                    if not self._is_enabled(enable_setting):
+                        self.deferred_steps.append(DeferredStep(path, enable_setting))
+                        continue
+
+                    step_cls = self._import_step(path)
+
+                if step_cls.enable_setting != enable_setting:
+                    raise ConfigurationException(
+                        f"Your configured steps declare `{enable_setting}` as the "
+                        f"enable setting for `{path}`, but the step uses "
+                        f"`{step_cls.enable_setting}`"
+                    )
+
+            step = step_cls()
+            if step.timeout is not None and step.timeout <= 0:
+                raise ImproperlyConfigured(
+                    f"The timeout of step `{path}` must be a positive number of "
+                    f"seconds, got {step.timeout!r}"
                 )
+            self.configured_steps.append(step)
 
+        # The source models are built on first use, so never for disabled steps, and
+        # the validated models are reused by subsequent runs
         self._config_source_models_for_step = {}
         self._config_for_step = {}
-        for step in self.configured_steps:
-            config_source_models = create_config_source_models(
-                enable_setting_key=step.enable_setting,
-                namespace=step.namespace,
-                config_model=step.config_model,  # type: ignore
-                yaml_file=yaml_source,
+        self.context = RunContext()
+
+        self.step_timeout = step_timeout
+        self.timeout = timeout
+        # The time at which the `timeout` of the current run passes
+        self._deadline: float | None = None
+        # Whether steps were executed in the transaction of the current run
+        self._has_executed_steps = False
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+
+    @staticmethod
+    def _load_source(
+        path: Path | str | IO,
+        source_format: str | None,
+        source_cache: dict[Path | str | IO, ConfigDocument] | None,
+    ) -> ConfigDocument:
+        if source_cache is None:
+            return load_source(path, source_format=source_format)
+
+        if (document := source_cache.get(path)) is None:
+            document = source_cache[path] = load_source(
+                path, source_format=source_format
             )
-            self._config_source_models_for_step[step] = config_source_models
+        return document
 
-        self.object_source = object_source
+    @staticmethod
+    def _import_step(step: type[BaseConfigurationStep] | str):
+        try:
+            step_cls = import_string(step) if isinstance(step, str) else step
+        except ImportError as exc:
+            raise ConfigurationException(
+                f"Your configured steps contain `{step}`, which cannot be imported"
+            ) from exc
 
-    @classmethod
-    def _initialize_steps(cls, steps: list[type[BaseConfigurationStep] | str]):
-        step_classes = []
-        for step in steps:
-            try:
-                step_classes.append(
-                    import_string(step) if isinstance(step, str) else step
-                )
-            except ImportError as exc:  # noqa: PERF203
-                raise ConfigurationException(
-                    f"Your configured steps contain `{step}`, which cannot be imported"
-                ) from exc
+        if not inspect.isclass(step_cls) or not isinstance(step_cls, type):
+            raise ConfigurationException(
+                f"Your configured steps contain `{step_cls}`, which is not a "
+                "class: did you perhaps provide an instance?"
+            )
 
-        initialized_steps = []
-        for step_cls in step_classes:
-            if not inspect.isclass(step_cls) or not isinstance(step_cls, type):
-                raise ConfigurationException(
-                    f"Your configured steps contain `{step_cls}`, which is not a "
-                    "class: did you perhaps provide an instance?"
-                )
+        if not issubclass(step_cls, BaseConfigurationStep):
+            raise ConfigurationException(
+                f"Your configured steps contain {step_cls.__name__}` which is not "
+                f"a subclass of `{BaseConfigurationStep.__name__}`"
+            )
 
-            if not issubclass(step_cls, BaseConfigurationStep):
-                raise ConfigurationException(
-                    f"Your configured steps contain {step_cls.__name__}` which is not "
-                    f"a subclass of `{BaseConfigurationStep.__name__}`"
-                )
+        return step_cls
 
-            step = step_cls()
-            initialized_steps.append(step)
+    def _is_selected(self, path: str, namespace: str | None = None) -> bool | None:
+        """
+        Whether a step is selected by the `only` and `exclude` patterns.
+
+        Patterns containing a dot are matched against the step path, other patterns
+        against the step namespace.
+
+        Returns:
+            bool | None: None if this depends on the namespace, and it is not provided.
+        """
+
+        def matches(patterns: list[str]) -> bool | None:
+            if any(
+                fnmatchcase(path, pattern) for pattern in patterns if "." in pattern
+            ):
+                return True
+
+            namespace_patterns = [pattern for pattern in patterns if "." not in pattern]
+            if namespace_patterns and namespace is None:
+                return None
+
+            return any(
+                fnmatchcase(namespace, pattern) for pattern in namespace_patterns
+            )
+
+        if (is_excluded := matches(self.exclude)) is not False:
+            return None if is_excluded is None else False
+
+        return matches(self.only) if self.only else True
+
+    @staticmethod
+    def _get_step_path(step_cls: type[BaseConfigurationStep]) -> str:
+        return f"{step_cls.__module__}.{step_cls.__qualname__}"
 
-        return initialized_steps
+    @property
+    def configured_step_paths(self) -> list[str]:
+        """The dotted paths of all configured steps, including deferred steps."""
+        return list(self._configured_step_paths)
+
+    def _is_enabled(self, enable_setting: str) -> bool:
+        settings_object = self.object_source or {}
+        if enable_setting in settings_object:
+            enable_flag = settings_object[enable_setting]
+        elif self._config_document is not None:
+            enable_flag = self._config_document.get(enable_setting, False)
+        else:
+            enable_flag = False
+
+        return _enable_flag_adapter.validate_python(enable_flag)
+
+    def _get_config_source_models(
+        self, step: BaseConfigurationStep
+    ) -> ConfigSourceModels:
+        if (
+            config_source_models := self._config_source_models_for_step.get(step)
+        ) is None:
+            config_source_models = create_config_source_models(
+                enable_setting_key=step.enable_setting,
+                namespace=step.namespace,
+                config_model=step.config_model,  # type: ignore
+                config_document=self._config_document,
+            )
+            self._config_source_models_for_step[step] = config_source_models
+
+        return config_source_models
 
     def _validate_requirements_for_step(self, step: BaseConfigurationStep):
         if step not in self.configured_steps:
@@ -126,20 +498,133 @@ class SetupConfigurationRunner:
                 f"Step {step} is not configured for this runner"
             )
 
+        if (config_model := self._config_for_step.get(step)) is not None:
+            return config_model
+
         try:
             # Load the model from the source (yaml, environment)
             settings_object = self.object_source or {}
-            model_settings_instance = self._config_source_models_for_step[
+            model_settings_instance = self._get_config_source_models(
                 step
-            ].config_settings_source(**settings_object)
+            ).config_settings_source(**settings_object)
         except ValidationError as exc:
             raise PrerequisiteFailed(step=step, validation_error=exc) from exc
 
         # The step's model is located under the namespace key at the root
-        return getattr(model_settings_instance, step.namespace)
+        config_model = getattr(model_settings_instance, step.namespace)
+        self._config_for_step[step] = config_model
+        return config_model
+
+    def for_database(self, using: str) -> "SetupConfigurationRunner":
+        """
+        Return a runner which executes the same steps with the same configuration
+        against the database `using`.
+
+        The parsed sources, source models and validated configuration models are shared
+        with this runner, but the new runner has its own step instances and context, so
+        both runners can execute their steps concurrently (in different threads).
+
+        Raises:
+            ImproperlyConfigured: If the database is not configured, or the steps cannot
+                be routed to it (see `SetupConfigurationDatabaseRouter`).
+        """
+        check_database(using)
+
+        runner = copy.copy(self)
+        runner.using = using
+        runner.configured_steps = [type(step)() for step in self.configured_steps]
+        new_steps = dict(
+            zip(self.configured_steps, runner.configured_steps, strict=True)
+        )
+        runner._config_source_models_for_step = {
+            new_steps[step]: models
+            for step, models in self._config_source_models_for_step.items()
+        }
+        runner._config_for_step = {
+            new_steps[step]: config_model
+            for step, config_model in self._config_for_step.items()
+        }
+        runner.context = RunContext()
+        runner._deadline = None
+        runner._has_executed_steps = False
+        return runner
+
+    def _is_sharded(self, step: BaseConfigurationStep) -> bool:
+        return isinstance(step, ShardableConfigurationStep) and step.shards > 1
+
+    def _should_execute_shards(self, step: BaseConfigurationStep) -> bool:
+        if not self._is_sharded(step):
+            return False
+
+        # The rows written by the preceding steps are locked until the run's
+        # transaction is committed, which waits for the workers, so a worker which
+        # writes the same rows would wait forever
+        if self._has_executed_steps:
+            logger.warning(
+                "Executing sharded step %s in process, because other steps were "
+                "executed before it in the same run",
+                step,
+            )
+            return False
+
+        return True
+
+    def _prefetch(
+        self, config_models: dict[BaseConfigurationStep, ConfigurationModel]
+    ) -> None:
+        # Sharded steps are executed in worker processes, which have no context
+        self.context.identity_map.prefetch_requests(
+            request
+            for step, config_model in config_models.items()
+            if not self._is_sharded(step)
+            for request in step.get_prefetch_requests(config_model)
+        )
+
+    def _get_step_timeout(self, step: BaseConfigurationStep) -> float | None:
+        timeout = step.timeout if step.timeout is not None else self.step_timeout
+        if self._deadline is not None:
+            remaining = self._deadline - time.monotonic()
+            timeout = remaining if timeout is None else min(timeout, remaining)
+        return timeout
+
+    @contextmanager
+    def _limit_step_duration(
+        self, step: BaseConfigurationStep, timeout: float | None, deadline: float | None
+    ) -> Iterator[None]:
+        if timeout is None or deadline is None:
+            yield
+            return
+
+        # A retried step only has the remainder of its time left
+        try:
+            with limit_duration(deadline - time.monotonic(), using=self.using):
+                yield
+        except TimeLimitExceeded as exc:
+            raise StepTimeout(
+                step, timeout, f"Step {step} did not complete within {timeout:g}s"
+            ) from exc
+
+    def _execute_step_attempt(
+        self,
+        step: BaseConfigurationStep,
+        config_model: ConfigurationModel,
+        timeout: float | None,
+        deadline: float | None,
+    ) -> None:
+        with (
+            transaction.atomic(using=self.using),
+            self._limit_step_duration(step, timeout, deadline),
+        ):
+            # A no-op if the runner prefetched the objects of all steps
+            self._prefetch({step: config_model})
+            step.execute(config_model)
 
     def _execute_step(
-        self, step: BaseConfigurationStep, *, ignore_enabled: bool = False
+        self,
+        step: BaseConfigurationStep,
+        *,
+        ignore_enabled: bool = False,
+        config_model: ConfigurationModel | None = None,
     ):
         if step not in self.configured_steps:
             raise ConfigurationRunFailed(
@@ -158,40 +643,131 @@ class SetupConfigurationRunner:
 
         result_factory = partial(result_factory, is_enabled=True)
 
-        # Validate first
-        config_model = self._validate_requirements_for_step(step)
+        # Validate first, unless the model was validated already
+        if config_model is None:
+            config_model = self._validate_requirements_for_step(step)
 
         result_factory = partial(
             result_factory, is_enabled=is_enabled, config_model=config_model
         )
 
+        timeout = self._get_step_timeout(step)
+        if timeout is not None and timeout <= 0:
+            # The timeouts are positive (see `__init__`), so only the `timeout` of
+            # the run can leave a step without any time
+            return result_factory(
+                run_exception=StepTimeout(
+                    step,
+                    self.timeout,
+                    f"The time budget of {self.timeout:g}s for the run was exhausted "
+                    f"before step {step} was executed",
+                )
+            )
+
         has_run = False
         step_exc = None
+        shard_results = ()
+        executed_in_workers = False
+
+        # The objects used by the step are discarded if its changes are rolled back,
+        # so restore the identity map if it fails
+        step.context = self.context
+        identity_map = self.context.identity_map.savepoint()
+
+        retries, retry_wait = 0, 0.0
+        deadline = None if timeout is None else time.monotonic() + timeout
 
         try:
-            with transaction.atomic():
-                step.execute(config_model)
+            if self._should_execute_shards(step):
+                executed_in_workers = True
+                shard_results = self._execute_step_shards(step, config_model)
+            else:
+                while True:
+                    try:
+                        self._execute_step_attempt(
+                            step, config_model, timeout, deadline
+                        )
+                        break
+                    except Exception as exc:
+                        delay = get_retry_delay(retries, backoff=self.retry_backoff)
+                        if (
+                            retries >= self.max_retries
+                            or not is_transient_error(exc)
+                            or (
+                                deadline is not None
+                                and time.monotonic() + delay >= deadline
+                            )
+                        ):
+                            raise
+
+                        logger.warning(
+                            "Retrying step %s in %.3fs after a transient database "
+                            "error (retry %d of %d): %s",
+                            step,
+                            delay,
+                            retries + 1,
+                            self.max_retries,
+                            exc,
+                        )
+                        # The savepoint of the attempt was rolled back
+                        self.context.identity_map = self.context.identity_map.rollback(
+                            identity_map
+                        )
+                        identity_map = self.context.identity_map.savepoint()
+                        time.sleep(delay)
+                        retries += 1
+                        retry_wait += delay
         except BaseException as exc:
             step_exc = exc
+            self.context.identity_map = self.context.identity_map.rollback(identity_map)
         finally:
             has_run = True
 
-        return result_factory(run_exception=step_exc, has_run=has_run)
+        return result_factory(
+            run_exception=step_exc,
+            has_run=has_run,
+            shard_results=shard_results,
+            executed_in_workers=executed_in_workers,
+            retries=retries,
+            retry_wait=retry_wait,
+        )
 
-    @property
-    def enabled_steps(self) -> list[BaseConfigurationStep]:
-        steps = []
-        settings_object = self.object_source or {}
-        for step in self.configured_steps:
-            enable_settings_instance = self._config_source_models_for_step[
-                step
-            ].enable_setting_source(**settings_object)
-            enable_flag = getattr(enable_settings_instance, step.enable_setting)
+    def _get_shard_executor(self, max_workers: int) -> Executor:
+        # Worker processes are spawned rather than forked, so they do not share the
+        # runner's database connections
+        return ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_initialize_worker,
+        )
+
+    def _execute_step_shards(
+        self, step: ShardableConfigurationStep, config_model: ConfigurationModel
+    ) -> tuple[ShardExecutionResult, ...]:
+        partitions = partition_items(
+            step.get_items(config_model), key=step.get_item_key, shards=step.shards
+        )
+        step_path = self._get_step_path(type(step))
+        model_data = config_model.model_dump()
 
-            if enable_flag:
-                steps.append(step)
+        with self._get_shard_executor(step.shards) as executor:
+            futures = [
+                executor.submit(
+                    _execute_shard, step_path, model_data, items, shard, self.using
+                )
+                for shard, items in enumerate(partitions)
+                if items
+            ]
+            # Raises the exception of the first failed shard, if any
+            return tuple(future.result() for future in futures)
 
-        return steps
+    @property
+    def enabled_steps(self) -> list[BaseConfigurationStep]:
+        return [
+            step
+            for step in self.configured_steps
+            if self._is_enabled(step.enable_setting)
+        ]
 
     @property
     def disabled_steps(self) -> list[BaseConfigurationStep]:
@@ -199,24 +775,229 @@ class SetupConfigurationRunner:
             step for step in self.configured_steps if step not in self.enabled_steps
         ]
 
-    def validate_all_requirements(self):
+    def validate_all_requirements(
+        self,
+        *,
+        fail_fast: bool | int = False,
+        workers: int = 1,
+        use_processes: bool = False,
+    ):
         """
         Validate that the configuration models for each step can be constructed from the
         provided sources.
 
+        Args:
+            fail_fast (bool | int, optional): Stop validating after the first failed
+                step if True, or after the given number of failed steps. The errors
+                of the steps which were validated concurrently are reported as well.
+                By default, all enabled steps are validated.
+            workers (int, optional): The number of steps to validate concurrently.
+                Defaults to 1, i.e. the steps are validated sequentially.
+            use_processes (bool, optional): Validate the steps in a pool of worker
+                processes rather than threads, which helps for very large namespaces.
+                Only applies if `workers` is more than 1. Defaults to False.
+
         Raises:
             ValidateRequirementsFailure: If the provided sources yielded invalid
-                configuration values for one or more steps.
+                configuration values for one or more steps. The errors are always
+                reported in the configured step order.
+        """
+        max_failures = int(fail_fast) or None
+        enabled_steps = self.enabled_steps
+        results = list(
+            self._validate_steps_iter(
+                enabled_steps,
+                workers=workers,
+                use_processes=use_processes,
+                max_failures=max_failures,
+            )
+        )
+        if exceptions := [exc for exc in results if exc is not None]:
+            # The results are yielded in order, so the remaining steps were not
+            # validated if validation stopped early
+            raise ValidateRequirementsFailure(
+                exceptions, unvalidated_steps=enabled_steps[len(results) :]
+            )
+
+    def _validate_steps_iter(
+        self,
+        steps: list[BaseConfigurationStep],
+        *,
+        workers: int = 1,
+        use_processes: bool = False,
+        max_failures: int | None = None,
+    ) -> Generator[PrerequisiteFailed | None, Any, None]:
         """
-        exceptions = []
-        for step in self.enabled_steps:
+        Validate the steps, yielding the error (or None) for each step in order.
+
+        The steps are submitted lazily, with up to `workers` steps in progress. Once
+        `max_failures` steps failed, no more steps are submitted, but the results of
+        the steps which were in progress are still yielded.
+        """
+        failures = 0
+
+        def validate(step: BaseConfigurationStep) -> PrerequisiteFailed | None:
             try:
                 self._validate_requirements_for_step(step)
-            except PrerequisiteFailed as exc:  # noqa: PERF203
-                exceptions.append(exc)
+            except PrerequisiteFailed as exc:
+                return exc
+            return None
 
-        if exceptions:
-            raise ValidateRequirementsFailure(exceptions)
+        def should_stop() -> bool:
+            return max_failures is not None and failures >= max_failures
+
+        if workers <= 1 or len(steps) <= 1:
+            for step in steps:
+                if should_stop():
+                    return
+                if (exc := validate(step)) is not None:
+                    failures += 1
+                yield exc
+            return
+
+        if use_processes:
+            # Only the (substituted) namespace data is sent to the workers. As errors
+            # are expected to be rare, and validation errors do not necessarily
+            # survive pickling, failed steps are validated again to get their errors
+            executor = ProcessPoolExecutor(
+                max_workers=workers, initializer=_initialize_worker
+            )
+            document = self._config_document or ConfigDocument({})
+
+            def submit(step: BaseConfigurationStep) -> Future:
+                return executor.submit(
+                    _validate_step_config,
+                    self._get_step_path(type(step)),
+                    document.get(step.namespace),
+                    self.object_source or {},
+                )
+
+            def get_result(step: BaseConfigurationStep, future: Future):
+                return None if future.result() else validate(step)
+
+        else:
+            # Build the models up front, rather than concurrently in the threads
+            for step in steps:
+                self._get_config_source_models(step)
+
+            executor = ThreadPoolExecutor(max_workers=workers)
+
+            def submit(step: BaseConfigurationStep) -> Future:
+                return executor.submit(validate, step)
+
+            def get_result(step: BaseConfigurationStep, future: Future):
+                return future.result()
+
+        pending = iter(steps)
+        in_progress: deque[tuple[BaseConfigurationStep, Future]] = deque()
+        try:
+            while True:
+                while len(in_progress) < workers and not should_stop():
+                    if (step := next(pending, None)) is None:
+                        break
+                    in_progress.append((step, submit(step)))
+
+                if not in_progress:
+                    return
+
+                step, future = in_progress.popleft()
+                if (exc := get_result(step, future)) is not None:
+                    failures += 1
+                yield exc
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def compile_snapshot(self, destination: PathLike | str | IO) -> str:
+        """
+        Validate all enabled steps and write their configuration to a snapshot.
+
+        The snapshot can subsequently be passed as `snapshot_source`, to skip parsing
+        and substituting the sources. See `django_setup_configuration.sources.
+        write_snapshot` for details on the snapshot.
+
+        Returns:
+            str: The content hash of the snapshot.
+
+        Raises:
+            ValidateRequirementsFailure: If the provided sources yielded invalid
+                configuration values for one or more steps.
+        """
+        self.validate_all_requirements()
+
+        document = self._config_document or ConfigDocument({})
+        enabled_steps = self.enabled_steps
+        data = {}
+        for step in self.configured_steps:
+            data[step.enable_setting] = step in enabled_steps
+            if step in enabled_steps and step.namespace in document:
+                data[step.namespace] = document.get(step.namespace)
+        for deferred_step in self.deferred_steps:
+            data[deferred_step.enable_setting] = False
+
+        return write_snapshot(destination, steps=self.configured_step_paths, data=data)
+
+    def plan_all(self) -> list[StepPlan]:
+        """
+        Describe the changes of all configured and enabled steps, without executing
+        them (see `BaseConfigurationStep.plan`).
+
+        Returns:
+            list[StepPlan]: The planned changes of each step.
+
+        Raises:
+            PrerequisiteFailed: If the configuration of a step is invalid.
+        """
+        with use_database(self.using):
+            return [
+                StepPlan(
+                    step=step,
+                    changes=step.plan(self._validate_requirements_for_step(step)),
+                )
+                for step in self.enabled_steps
+            ]
+
+    def diff_all(self) -> list[StepDiff]:
+        """
+        Compare the configuration of all configured and enabled steps to the current
+        state of the database (see `BaseConfigurationStep.diff`).
+
+        The steps are not executed, and no transaction is used.
+
+        Returns:
+            list[StepDiff]: The differences found for each step.
+
+        Raises:
+            PrerequisiteFailed: If the configuration of a step is invalid.
+        """
+        with use_database(self.using):
+            return [
+                StepDiff(
+                    step=step,
+                    differences=step.diff(self._validate_requirements_for_step(step)),
+                )
+                for step in self.enabled_steps
+            ]
+
+    def export(
+        self, destination: PathLike | str | IO[str]
+    ) -> list[BaseConfigurationStep]:
+        """
+        Export the current database state of all configured steps (including deferred
+        steps) to a YAML file, which can subsequently be used as the YAML source.
+
+        See `django_setup_configuration.export.write_export` for details.
+
+        Returns:
+            list[BaseConfigurationStep]: The steps which were exported.
+        """
+        from django_setup_configuration.export import write_export
+
+        steps = self.configured_steps + [
+            self._import_step(deferred_step.path)()
+            for deferred_step in self.deferred_steps
+        ]
+        with use_database(self.using):
+            return write_export(destination, steps)
 
     def execute_all_iter(self) -> Generator[StepExecutionResult, Any, None]:
         """
@@ -233,17 +1014,41 @@ class SetupConfigurationRunner:
         class Rollback(BaseException):
             pass
 
+        self.context = RunContext()
+        self._has_executed_steps = False
+        if self.timeout is not None:
+            self._deadline = time.monotonic() + self.timeout
         try:
-            with transaction.atomic():
+            with use_database(self.using), transaction.atomic(using=self.using):
+                # The objects declared by the steps are fetched up front, so requests
+                # of several steps for the same table can be batched
+                config_models = {
+                    step: self._validate_requirements_for_step(step)
+                    for step in self.enabled_steps
+                }
+                try:
+                    with transaction.atomic(using=self.using):
+                        self._prefetch(config_models)
+                except Exception:
+                    # The steps prefetch their own objects, and report the error
+                    self.context = RunContext()
+
                 results = []
-                for step in self.enabled_steps:
-                    result = self._execute_step(step)
+                for step, config_model in config_models.items():
+                    result = self._execute_step(step, config_model=config_model)
                     results.append(result)
+                    # Sharded steps write in the transactions of their workers
+                    if result.has_run and not result.shard_results:
+                        self._has_executed_steps = True
 
                 if any(result.run_exception for result in results):
                     raise Rollback  # Trigger the rollback
         except Rollback:
-            pass
+            # The objects in the context no longer exist
+            self.context = RunContext()
+        finally:
+            self._deadline = None
+            self._has_executed_steps = False
 
         for result in results:
             yield result
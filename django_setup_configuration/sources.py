@@ -0,0 +1,563 @@
+import bz2
+import gzip
+import hashlib
+import json
+import sys
+import threading
+from collections.abc import Callable, Iterable, Mapping, Sequence
+from dataclasses import dataclass
+from functools import partial
+from os import PathLike
+from pathlib import Path
+from typing import IO, Any, TypeAlias
+
+import yaml
+
+from django_setup_configuration.exceptions import ConfigurationException
+from django_setup_configuration.model_utils import (
+    _OMIT_KEY,
+    JSONValue,
+    YamlWithEnvSubstitution,
+)
+
+
+class ConfigDocument:
+    """
+    A configuration document, indexed by its top-level keys.
+
+    The value for each top-level key is kept in its unconverted form (e.g. a YAML node)
+    until it is first requested, at which point it is converted into plain Python
+    objects and its `value_from` markers are substituted. Values which are never
+    requested, such as the namespaces of disabled steps, are never converted or
+    substituted at all.
+
+    Args:
+        entries (Mapping[str, Any]): The top-level keys of the document, mapped to
+            their unconverted values.
+        construct (Callable[[Any], JSONValue] | None, optional): A callable to convert
+            an unconverted value into plain Python objects. Defaults to None, meaning
+            the values are already plain Python objects.
+        substitute (bool, optional): Whether to substitute `value_from` markers.
+            Defaults to True.
+    """
+
+    def __init__(
+        self,
+        entries: Mapping[str, Any],
+        *,
+        construct: Callable[[Any], JSONValue] | None = None,
+        substitute: bool = True,
+    ):
+        self._entries = dict(entries)
+        self._construct = construct
+        self._substitute = substitute
+        self._resolved: dict[str, Any] = {}
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._entries
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(keys={list(self._entries)})"
+
+    def keys(self):
+        return self._entries.keys()
+
+    def copy(self) -> "ConfigDocument":
+        """
+        Return a view on the same parsed entries, without any substituted values.
+        """
+        return self.__class__(
+            self._entries, construct=self._construct, substitute=self._substitute
+        )
+
+    def get_raw(self, key: str) -> JSONValue:
+        """
+        Retrieve the converted value for a top-level key, without substitution.
+        """
+        value = self._entries[key]
+        if self._construct is not None:
+            value = self._construct(value)
+        return value
+
+    def get(self, key: str, default: Any = None) -> JSONValue:
+        """
+        Retrieve the converted and substituted value for a top-level key.
+
+        Returns `default` if the key is absent, or if it points to a `value_from`
+        marker which resolved to an omitted value.
+        """
+        if key not in self._entries:
+            return default
+
+        if key not in self._resolved:
+            value = self.get_raw(key)
+            if self._substitute:
+                value = YamlWithEnvSubstitution._drop_omitted_fields(
+                    YamlWithEnvSubstitution.substitute(value, key)
+                )
+            self._resolved[key] = value
+
+        if (value := self._resolved[key]) is _OMIT_KEY:
+            return default
+
+        return value
+
+    def to_dict(self, keys: Iterable[str] | None = None) -> dict[str, JSONValue]:
+        """
+        Materialise the document, or only the provided top-level keys, as a dict.
+        """
+        keys = self.keys() if keys is None else keys
+        return {
+            key: value
+            for key in keys
+            if (value := self.get(key, _OMIT_KEY)) is not _OMIT_KEY
+        }
+
+    @classmethod
+    def merge(cls, documents: Sequence["ConfigDocument"]) -> "ConfigDocument":
+        """
+        Merge several documents into a single document.
+
+        Documents are merged per top-level key, with later documents taking precedence.
+        Mappings are merged recursively, all other values are replaced. Keys provided
+        by a single document are passed through as-is, so only the keys which are
+        touched by more than one document are ever merged, and only once requested.
+        """
+        if len(documents) == 1:
+            return documents[0]
+
+        entries: dict[str, list[ConfigDocument]] = {}
+        for document in documents:
+            for key in document.keys():
+                entries.setdefault(key, []).append(document)
+
+        return cls(
+            {key: (key, sources) for key, sources in entries.items()},
+            construct=_construct_merged_entry,
+        )
+
+
+def _construct_merged_entry(entry: tuple[str, list[ConfigDocument]]) -> JSONValue:
+    key, documents = entry
+    merged = documents[0].get_raw(key)
+    for document in documents[1:]:
+        merged = _deep_merge(merged, document.get_raw(key))
+    return merged
+
+
+def _deep_merge(base: JSONValue, override: JSONValue) -> JSONValue:
+    # A `value_from` marker is a single value, which should be replaced as a whole
+    # rather than merged key-wise with whatever it overrides
+    if (
+        isinstance(base, dict)
+        and isinstance(override, dict)
+        and "value_from" not in override
+    ):
+        merged = dict(base)
+        for key, value in override.items():
+            merged[key] = _deep_merge(base[key], value) if key in base else value
+        return merged
+
+    return override
+
+
+def _raise_for_non_mapping(found: str):
+    raise ConfigurationException(
+        "The configuration source must contain a mapping at the top level, got "
+        f"`{found}`"
+    )
+
+
+# Prefer the (much faster) LibYAML based loader, if PyYAML was built with it
+_YamlLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+def load_yaml_document(stream: str | bytes | IO) -> ConfigDocument:
+    """
+    Parse a YAML stream into a lazily converted `ConfigDocument`.
+
+    Only the top-level mapping is inspected up front: the value for each key is kept
+    as a YAML node, and only converted into Python objects when requested.
+    """
+    loader = _YamlLoader(stream)
+    try:
+        root = loader.get_single_node()
+    finally:
+        loader.dispose()
+
+    if root is None:
+        return ConfigDocument({})
+
+    if not isinstance(root, yaml.MappingNode):
+        _raise_for_non_mapping(root.tag)
+
+    # Resolve any merge keys (`<<: *anchor`) at the top level, as the loader would have
+    # done when constructing the full mapping
+    loader.flatten_mapping(root)
+    entries = {
+        loader.construct_object(key_node, deep=True): value_node
+        for key_node, value_node in root.value
+    }
+    return ConfigDocument(
+        entries, construct=partial(_construct_yaml_node, loader, threading.Lock())
+    )
+
+
+def _construct_yaml_node(
+    loader: yaml.SafeLoader, lock: threading.Lock, node: yaml.Node
+) -> JSONValue:
+    # The constructor keeps state between calls (e.g. its partly constructed objects),
+    # so a document's nodes are constructed one at a time, even when the namespaces are
+    # requested concurrently (e.g. by `--validation-workers`)
+    with lock:
+        return loader.construct_object(node, deep=True)
+
+
+def load_json_document(content: str | bytes) -> ConfigDocument:
+    """
+    Parse JSON content into a `ConfigDocument`.
+
+    JSON is converted in full by the (fast) standard library parser, but the
+    substitution of `value_from` markers is still deferred per top-level key.
+    """
+    if not content.strip():
+        return ConfigDocument({})
+
+    try:
+        data = json.loads(content)
+    except json.JSONDecodeError as exc:
+        raise ConfigurationException(f"Unable to parse JSON source: {exc}") from exc
+
+    if not isinstance(data, dict):
+        _raise_for_non_mapping(type(data).__name__)
+
+    return ConfigDocument(data)
+
+
+def load_toml_document(content: str | bytes) -> ConfigDocument:
+    """
+    Parse TOML content into a `ConfigDocument`.
+
+    Requires Python 3.11+, or the `tomli` package on older Python versions.
+    """
+    try:
+        import tomllib
+    except ImportError:  # pragma: no cover - Python < 3.11
+        try:
+            import tomli as tomllib
+        except ImportError:
+            raise ConfigurationException(
+                "Loading TOML sources requires Python 3.11 or the `tomli` package"
+            ) from None
+
+    if isinstance(content, bytes):
+        content = content.decode("utf-8")
+
+    try:
+        return ConfigDocument(tomllib.loads(content))
+    except tomllib.TOMLDecodeError as exc:
+        raise ConfigurationException(f"Unable to parse TOML source: {exc}") from exc
+
+
+@dataclass(frozen=True)
+class SourceFormat:
+    """
+    A format from which configuration documents can be loaded.
+
+    Attributes:
+        name (`str`): the name by which the format can be selected explicitly
+        suffixes (`tuple[str, ...]`): the file suffixes from which the format is
+            detected
+        parse (`Callable[[bytes], ConfigDocument]`): parses the (decompressed) content
+            of a source into a `ConfigDocument`
+    """
+
+    name: str
+    suffixes: tuple[str, ...]
+    parse: Callable[[bytes], ConfigDocument]
+
+
+DEFAULT_SOURCE_FORMAT = "yaml"
+
+SOURCE_FORMATS: dict[str, SourceFormat] = {}
+
+
+def register_source_format(source_format: SourceFormat) -> SourceFormat:
+    """
+    Register a format from which configuration sources can be loaded.
+
+    Registering a format under an existing name replaces the existing format.
+    """
+    SOURCE_FORMATS[source_format.name] = source_format
+    return source_format
+
+
+register_source_format(SourceFormat("yaml", (".yaml", ".yml"), load_yaml_document))
+register_source_format(SourceFormat("json", (".json",), load_json_document))
+register_source_format(SourceFormat("toml", (".toml",), load_toml_document))
+
+
+def get_source_format(name: str) -> SourceFormat:
+    try:
+        return SOURCE_FORMATS[name]
+    except KeyError:
+        raise ConfigurationException(
+            f"Unknown source format `{name}`, expected one of: "
+            f"{', '.join(sorted(SOURCE_FORMATS))}"
+        ) from None
+
+
+ConfigSource: TypeAlias = PathLike | str | IO
+"""A path to a file or directory, `STDIN` or an (optionally binary) readable stream."""
+
+STDIN = "-"
+"""Marker to read a configuration source from standard input."""
+
+COMPRESSED_FILE_SUFFIXES = (".gz", ".bz2")
+
+_GZIP_MAGIC = b"\x1f\x8b"
+_BZIP2_MAGIC = b"BZh"
+_BZIP2_BLOCK_MAGICS = (b"1AY&SY", b"\x17rE8P\x90")
+
+
+def _decompress(content: bytes) -> bytes:
+    # Compression is detected from the content rather than the file name, so that
+    # compressed streams (e.g. from stdin) are supported transparently as well
+    if content.startswith(_GZIP_MAGIC):
+        return gzip.decompress(content)
+
+    if (
+        content.startswith(_BZIP2_MAGIC)
+        and content[3:4].isdigit()
+        and content[4:10] in _BZIP2_BLOCK_MAGICS
+    ):
+        return bz2.decompress(content)
+
+    return content
+
+
+def read_source(source: ConfigSource) -> bytes:
+    """
+    Read the (decompressed) content of a configuration source.
+
+    Gzip and bzip2 compressed content is decompressed transparently.
+    """
+    if isinstance(source, str | PathLike):
+        if source == STDIN:
+            content = sys.stdin.buffer.read()
+        else:
+            content = Path(source).read_bytes()
+    else:
+        content = source.read()
+
+    if isinstance(content, str):
+        content = content.encode("utf-8")
+
+    return _decompress(content)
+
+
+def detect_source_format(source: ConfigSource) -> SourceFormat | None:
+    """
+    Detect the format of a source from its (optionally compressed) file suffix.
+
+    Returns None if the source is not a path, or has no registered suffix.
+    """
+    if not isinstance(source, str | PathLike) or source == STDIN:
+        return None
+
+    suffixes = Path(source).suffixes
+    if suffixes and suffixes[-1] in COMPRESSED_FILE_SUFFIXES:
+        suffixes = suffixes[:-1]
+
+    if not suffixes:
+        return None
+
+    for source_format in SOURCE_FORMATS.values():
+        if suffixes[-1] in source_format.suffixes:
+            return source_format
+
+    return None
+
+
+_PARSED_DOCUMENTS_MAX_SIZE = 32
+_parsed_documents: dict[str, ConfigDocument] = {}
+
+
+def _parse_content(content: bytes, source_format: SourceFormat) -> ConfigDocument:
+    # Parsed documents are cached by content hash, so that the same file (or the same
+    # content under a different name or compression) is only parsed once per process
+    cache_key = f"{source_format.name}:{hashlib.sha256(content).hexdigest()}"
+    if (document := _parsed_documents.get(cache_key)) is None:
+        document = source_format.parse(content)
+        if len(_parsed_documents) >= _PARSED_DOCUMENTS_MAX_SIZE:
+            _parsed_documents.pop(next(iter(_parsed_documents)))
+        _parsed_documents[cache_key] = document
+
+    # Substituted values depend on the environment, so they are never shared
+    return document.copy()
+
+
+def load_source(
+    source: ConfigSource, *, source_format: str | None = None
+) -> ConfigDocument:
+    """
+    Parse a configuration file or stream into a `ConfigDocument`.
+
+    See `read_source` for the supported sources. Unless `source_format` is provided,
+    the format is detected from the file suffix, falling back to YAML.
+    """
+    if source_format is not None:
+        resolved_format = get_source_format(source_format)
+    else:
+        resolved_format = detect_source_format(source) or get_source_format(
+            DEFAULT_SOURCE_FORMAT
+        )
+
+    return _parse_content(read_source(source), resolved_format)
+
+
+def resolve_source_paths(
+    sources: ConfigSource | Sequence[ConfigSource],
+) -> list[Path | str | IO]:
+    """
+    Expand one or more configuration sources into an ordered list of sources.
+
+    Directories are expanded conf.d-style into the (optionally compressed) files of a
+    registered format they directly contain, in lexicographical order of their names.
+    `STDIN` and streams are passed through as-is.
+
+    Raises:
+        ConfigurationException: If any of the paths does not exist.
+    """
+    if not isinstance(sources, Sequence) or isinstance(sources, str):
+        sources = [sources]
+
+    paths: list[Path | str | IO] = []
+    for source in sources:
+        if source == STDIN or not isinstance(source, str | PathLike):
+            paths.append(source)
+            continue
+
+        path = Path(source).resolve()
+        if path.is_dir():
+            paths.extend(
+                sorted(
+                    child
+                    for child in path.iterdir()
+                    if child.is_file() and detect_source_format(child)
+                )
+            )
+        elif path.is_file():
+            paths.append(path)
+        else:
+            raise ConfigurationException(
+                f"YAML source is not an existing file path: {path}"
+            )
+
+    return paths
+
+
+def load_sources(
+    sources: ConfigSource | Sequence[ConfigSource],
+    *,
+    source_format: str | None = None,
+) -> ConfigDocument:
+    """
+    Parse and merge one or more configuration sources into a `ConfigDocument`.
+
+    See `resolve_source_paths` for how directories are expanded, `load_source` for how
+    the format of each source is determined, and `ConfigDocument.merge` for how the
+    sources are merged.
+    """
+    return ConfigDocument.merge(
+        [
+            load_source(path, source_format=source_format)
+            for path in resolve_source_paths(sources)
+        ]
+    )
+
+
+SNAPSHOT_VERSION = 1
+
+
+def _snapshot_digest(steps: Sequence[str], data: Mapping[str, JSONValue]) -> str:
+    payload = json.dumps(
+        {"steps": list(steps), "data": data}, sort_keys=True, separators=(",", ":")
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def write_snapshot(
+    destination: PathLike | str | IO,
+    *,
+    steps: Sequence[str],
+    data: Mapping[str, JSONValue],
+) -> str:
+    """
+    Write already substituted and validated configuration data to a snapshot.
+
+    The snapshot is a compact JSON document, which records the data, the import paths
+    of the steps it was built for and a content hash. Destinations with a `.gz` suffix
+    are gzip compressed. Note that the snapshot contains the substituted values of any
+    `value_from` markers, and should be treated as a secret if those are.
+
+    Returns:
+        str: The content hash of the snapshot.
+    """
+    digest = _snapshot_digest(steps, data)
+    content = json.dumps(
+        {
+            "version": SNAPSHOT_VERSION,
+            "sha256": digest,
+            "steps": list(steps),
+            "data": data,
+        },
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+    if isinstance(destination, str | PathLike):
+        if Path(destination).suffix == ".gz":
+            content = gzip.compress(content)
+        Path(destination).write_bytes(content)
+    else:
+        destination.write(content)
+
+    return digest
+
+
+def load_snapshot(source: ConfigSource, *, steps: Sequence[str]) -> ConfigDocument:
+    """
+    Load a snapshot written by `write_snapshot` into a `ConfigDocument`.
+
+    The data in the snapshot has already been substituted, so it is not substituted
+    again.
+
+    Raises:
+        ConfigurationException: If the snapshot is invalid, has been modified, or was
+            built for a different set of steps.
+    """
+    try:
+        snapshot = json.loads(read_source(source))
+        version, digest = snapshot["version"], snapshot["sha256"]
+        snapshot_steps, data = snapshot["steps"], snapshot["data"]
+    except (ValueError, TypeError, KeyError) as exc:
+        raise ConfigurationException(f"Unable to read snapshot: {exc}") from exc
+
+    if version != SNAPSHOT_VERSION:
+        raise ConfigurationException(
+            f"Unsupported snapshot version {version}, expected {SNAPSHOT_VERSION}"
+        )
+
+    if _snapshot_digest(snapshot_steps, data) != digest:
+        raise ConfigurationException(
+            "The snapshot content does not match its hash: it may have been modified"
+        )
+
+    if list(snapshot_steps) != list(steps):
+        raise ConfigurationException(
+            "The snapshot was built for a different set of steps "
+            f"({', '.join(snapshot_steps)}) than the steps configured "
+            f"({', '.join(steps)}): please rebuild the snapshot"
+        )
+
+    return ConfigDocument(data, substitute=False)
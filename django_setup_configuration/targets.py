@@ -0,0 +1,196 @@
+import time
+from collections.abc import Generator, Sequence
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Any
+
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from django_setup_configuration.routers import check_database
+from django_setup_configuration.runner import (
+    SetupConfigurationRunner,
+    StepExecutionResult,
+)
+from django_setup_configuration.sources import ConfigSource, resolve_source_paths
+
+
+@dataclass(frozen=True)
+class RunTarget:
+    """
+    A database to execute the steps against, e.g. the database of a tenant.
+
+    Args:
+        name (str): The name of the target, used to report its results.
+        using (str, optional): The alias of the database. Defaults to the default
+            database.
+        yaml_source (optional): The configuration specific to this target, which is
+            merged over the configuration shared by all targets. Defaults to None.
+    """
+
+    name: str
+    using: str = DEFAULT_DB_ALIAS
+    yaml_source: ConfigSource | Sequence[ConfigSource] | None = field(
+        default=None, compare=False
+    )
+
+
+@dataclass(frozen=True)
+class TargetResult:
+    target: RunTarget
+    step_results: tuple[StepExecutionResult, ...] = ()
+    # An error which prevented the steps from being executed at all, e.g. an invalid
+    # configuration or an unavailable database
+    exception: BaseException | None = None
+    duration: float = 0.0
+
+    @property
+    def failed_steps(self) -> list[StepExecutionResult]:
+        return [result for result in self.step_results if result.run_exception]
+
+    @property
+    def succeeded(self) -> bool:
+        return self.exception is None and not self.failed_steps
+
+
+def _get_target_runners(
+    targets: Sequence[RunTarget],
+    yaml_source: ConfigSource | Sequence[ConfigSource] | None,
+    runner_kwargs: dict[str, Any],
+) -> dict[RunTarget, SetupConfigurationRunner | Exception]:
+    """
+    Create a runner for each target, or the error which prevented this.
+
+    Targets with the same sources share a single runner (see
+    `SetupConfigurationRunner.for_database`), so their configuration is parsed and
+    validated once. The files shared by all targets are parsed only once in total.
+    """
+    # Unknown databases are a mistake in the invocation rather than in the
+    # configuration of a target, so fail before doing anything
+    for target in targets:
+        check_database(target.using)
+
+    shared_sources = [] if yaml_source is None else resolve_source_paths(yaml_source)
+    source_cache: dict = {}
+    runners: dict[tuple, SetupConfigurationRunner | Exception] = {}
+    target_runners: dict[RunTarget, SetupConfigurationRunner | Exception] = {}
+    for target in targets:
+        target_sources = (
+            ()
+            if target.yaml_source is None
+            else tuple(resolve_source_paths(target.yaml_source))
+        )
+        if (runner := runners.get(target_sources)) is None:
+            try:
+                runner = SetupConfigurationRunner(
+                    yaml_source=[*shared_sources, *target_sources] or None,
+                    source_cache=source_cache,
+                    **runner_kwargs,
+                )
+                # Populates the validated models shared by the target runners
+                runner.validate_all_requirements()
+            except Exception as exc:
+                runner = exc
+            runners[target_sources] = runner
+
+        target_runners[target] = (
+            runner
+            if isinstance(runner, Exception)
+            else runner.for_database(target.using)
+        )
+
+    return target_runners
+
+
+def _execute_target(
+    target: RunTarget,
+    runner: SetupConfigurationRunner,
+    *,
+    close_connections: bool = False,
+) -> TargetResult:
+    start = time.monotonic()
+    try:
+        step_results = tuple(runner.execute_all_iter())
+    except Exception as exc:
+        return TargetResult(
+            target=target, exception=exc, duration=time.monotonic() - start
+        )
+    finally:
+        # Connections are opened per thread, and would otherwise outlive the worker
+        if close_connections:
+            connections.close_all()
+
+    return TargetResult(
+        target=target, step_results=step_results, duration=time.monotonic() - start
+    )
+
+
+def execute_targets_iter(
+    targets: Sequence[RunTarget],
+    *,
+    yaml_source: ConfigSource | Sequence[ConfigSource] | None = None,
+    max_workers: int = 1,
+    **runner_kwargs,
+) -> Generator[TargetResult, Any, None]:
+    """
+    Execute the configured steps against each of the targets.
+
+    The configuration of each target consists of the `yaml_source` shared by all
+    targets, with the target's own `yaml_source` merged over it. Each target is
+    executed in its own transaction, so a failed target is rolled back without
+    affecting the other targets. The remaining `runner_kwargs` are passed to the
+    `SetupConfigurationRunner` of each target.
+
+    Args:
+        targets (Sequence[RunTarget]): The targets, with unique names.
+        yaml_source (optional): The configuration shared by all targets.
+        max_workers (int, optional): The number of targets to execute concurrently,
+            each in its own thread and database connection. Defaults to 1, i.e. the
+            targets are executed sequentially.
+
+    Yields:
+        TargetResult: The result of each target, in the order in which they complete.
+
+    Raises:
+        ImproperlyConfigured: If the steps cannot be executed against the database of
+            a target (see `SetupConfigurationRunner.for_database`).
+    """
+    if len({target.name for target in targets}) != len(targets):
+        raise ValueError("The names of the targets must be unique")
+
+    target_runners = _get_target_runners(targets, yaml_source, runner_kwargs)
+
+    def get_result(target: RunTarget, **kwargs) -> TargetResult:
+        runner = target_runners[target]
+        if isinstance(runner, Exception):
+            return TargetResult(target=target, exception=runner)
+        return _execute_target(target, runner, **kwargs)
+
+    if max_workers <= 1 or len(targets) <= 1:
+        for target in targets:
+            yield get_result(target)
+        return
+
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    futures = [
+        executor.submit(get_result, target, close_connections=True)
+        for target in targets
+    ]
+    try:
+        for future in as_completed(futures):
+            yield future.result()
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def execute_targets(targets: Sequence[RunTarget], **kwargs) -> list[TargetResult]:
+    """
+    Execute the configured steps against each of the targets, see
+    `execute_targets_iter`.
+
+    Returns:
+        list[TargetResult]: The result of each target, in the order of the targets.
+    """
+    results = {
+        result.target: result for result in execute_targets_iter(targets, **kwargs)
+    }
+    return [results[target] for target in targets]
@@ -1,3 +1,4 @@
+from collections.abc import Sequence
 from os import PathLike
 from typing import Any
 
@@ -10,7 +11,7 @@ from django_setup_configuration.runner import (
 
 def build_step_config_from_sources(
     step: type[BaseConfigurationStep[Any]] | str,
-    yaml_source: str | None = None,
+    yaml_source: PathLike | str | Sequence[PathLike | str] | None = None,
     object_source: dict | None = None,
 ):
     """
@@ -18,7 +19,8 @@ def build_step_config_from_sources(
 
     Args:
         step: The configuration step class or step name to load and validate
-        yaml_source: Optional path to a YAML configuration file
+        yaml_source: Optional path to a YAML configuration file, or a sequence of
+            YAML files and directories to merge
         object_source: Optional dictionary containing configuration settings
 
     Returns:
@@ -38,7 +40,7 @@ def build_step_config_from_sources(
 def execute_single_step(
     step: type[BaseConfigurationStep] | str,
     *,
-    yaml_source: PathLike | str | None = None,
+    yaml_source: PathLike | str | Sequence[PathLike | str] | None = None,
     object_source: dict | None = None,
 ) -> StepExecutionResult:
     """
@@ -47,8 +49,9 @@ def execute_single_step(
     Args:
         step (type[BaseConfigurationStep] | str): The configuration step class or step
             name to load and validate
-        yaml_source (str | None, optional): Optional path to a YAML configuration file.
-            Defaults to None.
+        yaml_source (PathLike | str | Sequence[PathLike | str] | None, optional):
+            Optional path to a YAML configuration file, or a sequence of YAML files
+            and directories to merge. Defaults to None.
         object_source (dict | None, optional): Optional dictionary containing
             configuration settings. Defaults to None.
 
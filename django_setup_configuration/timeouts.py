@@ -0,0 +1,120 @@
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+# The SQLSTATE codes of the errors PostgreSQL raises when a timeout is exceeded
+QUERY_CANCELED = "57014"
+LOCK_NOT_AVAILABLE = "55P03"
+
+_SET_POSTGRES_TIMEOUTS = (
+    "SELECT set_config('statement_timeout', %s, true), "
+    "set_config('lock_timeout', %s, true)"
+)
+
+
+class TimeLimitExceeded(TimeoutError):
+    """
+    Raised when a block of work exceeds its time limit, see `limit_duration`.
+    """
+
+
+def get_sqlstate(exc: BaseException) -> str | None:
+    """
+    Return the SQLSTATE code of a database error, if the driver provides it.
+    """
+    # Django wraps the errors of the driver, which are available as the cause
+    for error in (exc, exc.__cause__):
+        # psycopg 3 and psycopg2 respectively
+        if code := getattr(error, "sqlstate", None) or getattr(error, "pgcode", None):
+            return code
+    return None
+
+
+class _Watchdog:
+    """
+    Interrupt the running query of a connection once the timeout has passed, if the
+    backend supports this (SQLite).
+    """
+
+    def __init__(self, using: str, timeout: float):
+        self.connection = connections[using]
+        self.expired = threading.Event()
+        self.timer = threading.Timer(timeout, self._expire)
+        self.timer.daemon = True
+
+    def _expire(self):
+        self.expired.set()
+        # `interrupt` may be called from another thread; it is a no-op if no query
+        # is running
+        if interrupt := getattr(self.connection.connection, "interrupt", None):
+            interrupt()
+
+    def __enter__(self):
+        self.timer.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.timer.cancel()
+
+
+@contextmanager
+def _set_postgres_timeouts(using: str, timeout: float) -> Iterator[None]:
+    # The settings are local to the current transaction, and reset if its savepoint
+    # is rolled back, but they have to be restored if the block succeeds
+    milliseconds = f"{max(int(timeout * 1000), 1)}ms"
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            "SELECT current_setting('statement_timeout'), "
+            "current_setting('lock_timeout')"
+        )
+        previous = cursor.fetchone()
+        cursor.execute(_SET_POSTGRES_TIMEOUTS, [milliseconds, milliseconds])
+
+    yield
+
+    with connections[using].cursor() as cursor:
+        cursor.execute(_SET_POSTGRES_TIMEOUTS, previous)
+
+
+@contextmanager
+def limit_duration(timeout: float, *, using: str = DEFAULT_DB_ALIAS) -> Iterator[None]:
+    """
+    Limit the duration of a block of database work to `timeout` seconds.
+
+    On PostgreSQL, the `statement_timeout` and `lock_timeout` are set for the current
+    transaction, so the database cancels a query or lock wait which exceeds the time.
+    The block must be run in a transaction (e.g. `transaction.atomic`). On other
+    backends, a watchdog thread interrupts the running query once the time has passed,
+    if the backend supports this (SQLite).
+
+    In any case, the block fails if it did not complete in time, so that its changes
+    can be rolled back.
+
+    Raises:
+        TimeLimitExceeded: If the block did not complete within `timeout` seconds.
+    """
+    start = time.monotonic()
+    is_postgres = connections[using].vendor == "postgresql"
+    limit = (
+        _set_postgres_timeouts(using, timeout)
+        if is_postgres
+        else _Watchdog(using, timeout)
+    )
+
+    try:
+        with limit:
+            yield
+    except DatabaseError as exc:
+        if is_postgres:
+            timed_out = get_sqlstate(exc) in (QUERY_CANCELED, LOCK_NOT_AVAILABLE)
+        else:
+            timed_out = limit.expired.is_set()
+        if timed_out:
+            raise TimeLimitExceeded(f"Exceeded the time limit of {timeout:g}s") from exc
+        raise
+
+    if time.monotonic() - start > timeout:
+        raise TimeLimitExceeded(f"Exceeded the time limit of {timeout:g}s")
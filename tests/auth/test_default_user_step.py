@@ -1,10 +1,15 @@
 import warnings
 
 from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
 import pytest
 
 from django_setup_configuration.contrib.auth.steps import UserConfigurationStep
+from django_setup_configuration.fields import StreamedList
+from django_setup_configuration.journal import StepJournalEntry, get_item_digest
+from django_setup_configuration.runner import SetupConfigurationRunner
 from django_setup_configuration.test_utils import execute_single_step
 
 
@@ -254,3 +259,196 @@ def test_load_step_config_from_source_user_is_updated_with_username(
 
     new_username = "new_admin_username"
     assert user.username == new_username
+
+
+@pytest.mark.django_db
+def test_only_changed_users_are_applied(yaml_file_factory):
+    def make_config(users):
+        return yaml_file_factory(
+            {
+                "default_user_configuration_enable": True,
+                "default_user_configuration_config": {
+                    "only_changed": True,
+                    "users": [
+                        {
+                            "email": f"{username}@example.com",
+                            "username": username,
+                            "is_staff": is_staff,
+                            "is_superuser": False,
+                            "password": "secret",
+                        }
+                        for username, is_staff in users
+                    ],
+                },
+            }
+        )
+
+    User = get_user_model()
+    users = [(f"user{i}", False) for i in range(10)]
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        execute_single_step(UserConfigurationStep, yaml_source=make_config(users))
+
+    users[3] = ("user3", True)
+    with (
+        CaptureQueriesContext(connection) as queries,
+        warnings.catch_warnings(),
+    ):
+        warnings.simplefilter("ignore")
+        execute_single_step(UserConfigurationStep, yaml_source=make_config(users))
+
+    updates = [
+        query
+        for query in queries.captured_queries
+        if query["sql"].startswith('UPDATE "auth_user"')
+    ]
+    assert len(updates) == 1
+    assert User.objects.get(username="user3").is_staff
+
+
+@pytest.mark.django_db
+def test_prune_only_deletes_users_configured_by_the_step(yaml_file_factory):
+    def make_config(usernames, prune=False):
+        return yaml_file_factory(
+            {
+                "default_user_configuration_enable": True,
+                "default_user_configuration_config": {
+                    "prune": prune,
+                    "users": [
+                        {
+                            "email": f"{username}@example.com",
+                            "username": username,
+                            "is_staff": False,
+                            "is_superuser": False,
+                            "password": "secret",
+                        }
+                        for username in usernames
+                    ],
+                },
+            }
+        )
+
+    User = get_user_model()
+    username_field = User.USERNAME_FIELD
+    User.objects.create(username="other", email="other@example.com")
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        execute_single_step(
+            UserConfigurationStep, yaml_source=make_config(["a", "b", "c"])
+        )
+        # Without pruning, removed users are kept
+        execute_single_step(UserConfigurationStep, yaml_source=make_config(["a", "b"]))
+
+        assert User.objects.count() == 4
+
+        step = UserConfigurationStep()
+        plan = step.plan(
+            step.config_model(
+                users=[
+                    {
+                        "email": "a@example.com",
+                        "username": "a",
+                        "password": "secret",
+                    }
+                ],
+                prune=True,
+                only_changed=True,
+            )
+        )
+        execute_single_step(
+            UserConfigurationStep, yaml_source=make_config(["a"], prune=True)
+        )
+
+    removed = [
+        getattr(
+            User(username=username, email=f"{username}@example.com"), username_field
+        )
+        for username in ("c", "b")
+    ]
+    assert sorted(plan) == sorted(f"Delete user {key}" for key in removed)
+    assert set(User.objects.values_list("username", flat=True)) == {"a", "other"}
+
+
+@pytest.mark.django_db
+def test_diff_reports_drift():
+    User = get_user_model()
+    username_field = User.USERNAME_FIELD
+    User.objects.create(username="admin", email="admin@example.com", is_staff=True)
+    step = UserConfigurationStep()
+    users = [
+        {"username": "admin", "email": "admin@example.com", "password": "secret"},
+        {"username": "new", "email": "new@example.com", "password": "secret"},
+    ]
+
+    differences = step.diff(step.config_model(users=users))
+
+    assert differences == [
+        f"User {users[0][username_field]}: is_staff is True, expected False",
+        f"User {users[1][username_field]} is missing",
+    ]
+
+
+@pytest.mark.django_db
+def test_users_are_validated_once(mocker):
+    User = get_user_model()
+    User.objects.create(username="other", email="other")
+    step = UserConfigurationStep()
+    users = [
+        {"username": f"user{i}", "email": f"user{i}", "password": "secret"}
+        for i in range(5)
+    ]
+    runner = SetupConfigurationRunner(
+        steps=[UserConfigurationStep],
+        object_source={
+            "default_user_configuration_enable": True,
+            "default_user_configuration_config": {"users": users, "prune": True},
+        },
+    )
+    chunks = mocker.spy(StreamedList, "chunks")
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        (result,) = runner.execute_all()
+
+    assert result.run_exception is None
+    assert chunks.call_count == 1
+    assert User.objects.count() == 6
+
+    model = step.config_model(users=users[1:], prune=True)
+    for method in (step.plan, step.diff):
+        chunks.reset_mock()
+        method(model)
+
+        assert chunks.call_count == 1, method
+
+
+@pytest.mark.django_db
+def test_journal_digest_does_not_depend_on_the_password(yaml_file_factory):
+    def make_config(password):
+        return yaml_file_factory(
+            {
+                "default_user_configuration_enable": True,
+                "default_user_configuration_config": {
+                    "users": [
+                        {
+                            "email": "bob",
+                            "username": "bob",
+                            "is_staff": True,
+                            "is_superuser": False,
+                            "password": password,
+                        }
+                    ],
+                },
+            }
+        )
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        execute_single_step(UserConfigurationStep, yaml_source=make_config("hunter2"))
+        (digest,) = StepJournalEntry.objects.values_list("digest", flat=True)
+        execute_single_step(UserConfigurationStep, yaml_source=make_config("other"))
+
+    assert StepJournalEntry.objects.get().digest == digest
+    assert digest == get_item_digest(
+        {"email": "bob", "is_staff": True, "is_superuser": False, "username": "bob"}
+    )
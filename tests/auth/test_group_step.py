@@ -0,0 +1,282 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+import pytest
+
+from django_setup_configuration.configuration import BaseConfigurationStep
+from django_setup_configuration.contrib.auth.steps import GroupConfigurationStep
+from django_setup_configuration.exceptions import (
+    ConfigurationRunFailed,
+    PrerequisiteFailed,
+)
+from django_setup_configuration.models import ConfigurationModel
+from django_setup_configuration.runner import SetupConfigurationRunner
+from django_setup_configuration.test_utils import execute_single_step
+
+pytestmark = pytest.mark.django_db
+
+User = get_user_model()
+
+
+def make_config(groups):
+    return {
+        "group_configuration_enable": True,
+        "group_configuration_config": {"groups": groups},
+    }
+
+
+def get_permissions(name):
+    return sorted(
+        f"{permission.content_type.app_label}.{permission.codename}"
+        for permission in Group.objects.get(name=name).permissions.all()
+    )
+
+
+def get_members(name):
+    return sorted(
+        Group.objects.get(name=name).user_set.values_list("username", flat=True)
+    )
+
+
+@pytest.fixture()
+def users():
+    # The username and email are equal, as the username field may be either
+    return [
+        User.objects.create(username=f"{name}@example.com", email=f"{name}@example.com")
+        for name in ("alice", "bob", "carol")
+    ]
+
+
+def test_groups_are_created_with_permissions_and_members(users):
+    groups = [
+        {
+            "name": f"group{i}",
+            "permissions": ["auth.view_user", "auth.change_user", "sites.view_site"],
+            "users": ["alice@example.com", "bob@example.com"],
+        }
+        for i in range(20)
+    ]
+
+    with CaptureQueriesContext(connection) as queries:
+        execute_single_step(GroupConfigurationStep, object_source=make_config(groups))
+
+    assert Group.objects.count() == 20
+    assert get_permissions("group7") == [
+        "auth.change_user",
+        "auth.view_user",
+        "sites.view_site",
+    ]
+    assert get_members("group7") == ["alice@example.com", "bob@example.com"]
+
+    # The number of queries does not depend on the number of groups or memberships
+    assert len(queries) < 15
+    permission_queries = [
+        query
+        for query in queries.captured_queries
+        if query["sql"].startswith("SELECT")
+        and 'FROM "auth_permission"' in query["sql"]
+    ]
+    assert len(permission_queries) == 1
+
+
+def test_memberships_are_replaced(users):
+    carol = users[2]
+    group = Group.objects.create(name="editors")
+    unmanaged = Group.objects.create(name="unmanaged")
+    execute_single_step(
+        GroupConfigurationStep,
+        object_source=make_config(
+            [
+                {
+                    "name": "editors",
+                    "permissions": ["auth.view_user", "auth.add_user"],
+                    "users": ["alice@example.com", "bob@example.com"],
+                },
+                {"name": "unmanaged", "permissions": ["auth.view_user"]},
+            ]
+        ),
+    )
+    carol.groups.add(unmanaged)
+
+    execute_single_step(
+        GroupConfigurationStep,
+        object_source=make_config(
+            [
+                {
+                    "name": "editors",
+                    "permissions": ["auth.view_user", "sites.view_site"],
+                    "users": ["bob@example.com", "carol@example.com"],
+                },
+                {"name": "unmanaged", "permissions": []},
+            ]
+        ),
+    )
+
+    assert Group.objects.get(name="editors").pk == group.pk
+    assert get_permissions("editors") == ["auth.view_user", "sites.view_site"]
+    assert get_members("editors") == ["bob@example.com", "carol@example.com"]
+    # The members of groups without `users` are not changed
+    assert get_permissions("unmanaged") == []
+    assert get_members("unmanaged") == ["carol@example.com"]
+
+
+def test_unknown_permission_fails(users):
+    with pytest.raises(ConfigurationRunFailed) as exc_info:
+        execute_single_step(
+            GroupConfigurationStep,
+            object_source=make_config(
+                [
+                    {
+                        "name": "editors",
+                        "permissions": ["auth.view_user", "sites.view_user"],
+                    }
+                ]
+            ),
+        )
+
+    assert "Unknown permissions: sites.view_user" in str(exc_info.value)
+    assert not Group.objects.exists()
+
+
+def test_unknown_user_fails(users):
+    with pytest.raises(ConfigurationRunFailed, match="User dave does not exist"):
+        execute_single_step(
+            GroupConfigurationStep,
+            object_source=make_config([{"name": "editors", "users": ["dave"]}]),
+        )
+
+
+class EmptyConfigurationModel(ConfigurationModel):
+    pass
+
+
+class UnregisteredObjectsStep(BaseConfigurationStep[EmptyConfigurationModel]):
+    verbose_name = "Unregistered objects"
+    config_model = EmptyConfigurationModel
+    namespace = "unregistered_objects"
+    enable_setting = "unregistered_objects_enable"
+
+    def execute(self, model):
+        # Created without registering them in the identity map of the run
+        User.objects.create(username="dave@example.com", email="dave@example.com")
+        Group.objects.create(name="existing")
+
+
+def test_objects_created_by_preceding_steps_are_resolved(users):
+    runner = SetupConfigurationRunner(
+        steps=[UnregisteredObjectsStep, GroupConfigurationStep],
+        object_source={
+            "unregistered_objects_enable": True,
+            "unregistered_objects": {},
+            **make_config(
+                [
+                    {"name": "existing", "users": ["dave@example.com"]},
+                    {"name": "new", "users": ["alice@example.com"]},
+                ]
+            ),
+        },
+    )
+
+    results = runner.execute_all()
+
+    assert [result.run_exception for result in results] == [None, None]
+    assert get_members("existing") == ["dave@example.com"]
+    assert get_members("new") == ["alice@example.com"]
+
+
+def test_invalid_permission_label_fails_validation():
+    with pytest.raises(PrerequisiteFailed):
+        execute_single_step(
+            GroupConfigurationStep,
+            object_source=make_config([{"name": "editors", "permissions": ["view"]}]),
+        )
+
+
+def test_plan_and_diff(users):
+    alice = users[0]
+    group = Group.objects.create(name="editors")
+    execute_single_step(
+        GroupConfigurationStep,
+        object_source=make_config(
+            [
+                {
+                    "name": "editors",
+                    "permissions": ["auth.view_user"],
+                    "users": ["alice@example.com"],
+                }
+            ]
+        ),
+    )
+    runner = SetupConfigurationRunner(
+        steps=[GroupConfigurationStep],
+        object_source=make_config(
+            [
+                {
+                    "name": "editors",
+                    "permissions": ["auth.change_user"],
+                    "users": ["bob@example.com"],
+                },
+                {"name": "viewers", "permissions": ["auth.view_user"]},
+            ]
+        ),
+    )
+
+    (step_plan,) = runner.plan_all()
+    (step_diff,) = runner.diff_all()
+
+    assert step_plan.changes == [
+        "Create group viewers",
+        "Add permission auth.change_user to group editors",
+        "Add permission auth.view_user to group viewers",
+        "Remove permission auth.view_user from group editors",
+        "Add user bob@example.com to group editors",
+        "Remove user alice@example.com from group editors",
+    ]
+    assert step_diff.differences == [
+        "Group viewers is missing",
+        "Group editors: permission auth.change_user is missing",
+        "Group viewers: permission auth.view_user is missing",
+        "Group editors: permission auth.view_user is not in the configuration",
+        "Group editors: user bob@example.com is missing",
+        "Group editors: user alice@example.com is not in the configuration",
+    ]
+    assert list(group.user_set.all()) == [alice]
+    assert not Group.objects.filter(name="viewers").exists()
+
+
+def test_export_round_trips(tmp_path, users):
+    execute_single_step(
+        GroupConfigurationStep,
+        object_source=make_config(
+            [
+                {
+                    "name": "editors",
+                    "permissions": ["sites.view_site", "auth.view_user"],
+                    "users": ["alice@example.com"],
+                },
+                {"name": "viewers"},
+            ]
+        ),
+    )
+    export_path = tmp_path / "export.yaml"
+    runner = SetupConfigurationRunner(steps=[GroupConfigurationStep])
+
+    runner.export(export_path)
+
+    runner = SetupConfigurationRunner(
+        steps=[GroupConfigurationStep], yaml_source=export_path
+    )
+    (step_diff,) = runner.diff_all()
+    assert step_diff.differences == []
+    assert runner._validate_requirements_for_step(
+        runner.configured_steps[0]
+    ).model_dump()["groups"] == [
+        {
+            "name": "editors",
+            "permissions": ["auth.view_user", "sites.view_site"],
+            "users": None,
+        },
+        {"name": "viewers", "permissions": [], "users": None},
+    ]
@@ -1,12 +1,17 @@
 from io import StringIO
+from unittest import mock
 
 from django.contrib.sites.models import Site
 from django.core.exceptions import ImproperlyConfigured, ValidationError
 from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
 import pytest
 
 from django_setup_configuration.contrib.sites.steps import SitesConfigurationStep
+from django_setup_configuration.fields import StreamedList
+from django_setup_configuration.runner import SetupConfigurationRunner
 from django_setup_configuration.test_utils import execute_single_step
 
 pytestmark = pytest.mark.django_db
@@ -158,3 +163,259 @@ def test_command_reports_validation_error():
         == "Aborting run due to a failed step. All database changes have been rolled "
         "back."
     )
+
+
+@pytest.mark.django_db
+def test_execute_configuration_step_only_applies_changed_sites(yaml_file_factory):
+    def make_config(names):
+        return yaml_file_factory(
+            {
+                "sites_config_enable": True,
+                "sites_config": {
+                    "items": [
+                        {"domain": f"{name}.example.com", "name": name}
+                        for name in names
+                    ],
+                    "only_changed": True,
+                },
+            }
+        )
+
+    execute_single_step(
+        SitesConfigurationStep, yaml_source=make_config(["a", "b", "c", "d"])
+    )
+    Site.objects.filter(domain="c.example.com").delete()
+
+    with mock.patch.object(
+        Site.objects, "update_or_create", wraps=Site.objects.update_or_create
+    ) as m:
+        execute_single_step(
+            SitesConfigurationStep, yaml_source=make_config(["a", "b", "c", "e"])
+        )
+
+    # "b" is unchanged, "c" was deleted and "e" is new
+    assert [call.kwargs["domain"] for call in m.call_args_list] == [
+        "e.example.com",
+        "c.example.com",
+    ]
+
+
+@pytest.mark.django_db
+def test_execute_configuration_step_reverts_manual_changes(yaml_file_factory):
+    config = yaml_file_factory(
+        {
+            "sites_config_enable": True,
+            "sites_config": {
+                "items": [
+                    {"domain": f"{name}.example.com", "name": name}
+                    for name in ("a", "b")
+                ]
+            },
+        }
+    )
+    execute_single_step(SitesConfigurationStep, yaml_source=config)
+    Site.objects.filter(domain="b.example.com").update(name="hand edited")
+
+    step = SitesConfigurationStep()
+    plan = step.plan(
+        step.config_model(
+            items=[
+                {"domain": f"{name}.example.com", "name": name} for name in ("a", "b")
+            ]
+        )
+    )
+    execute_single_step(SitesConfigurationStep, yaml_source=config)
+
+    assert plan == [
+        "Update 1 unchanged sites, reverting any changes made by other means"
+    ]
+    assert Site.objects.get(domain="b.example.com").name == "b"
+
+
+@pytest.mark.django_db
+def test_execute_configuration_step_prunes_sites(yaml_file_factory, monkeypatch):
+    Site.objects.bulk_create(
+        [Site(domain=f"old{i}.example.com", name=f"old{i}") for i in range(3)]
+    )
+    Site.objects.create(domain="domain.local2:8000", name="Domain2")
+    current_site_pk = Site.objects.get_current().pk
+    yaml_file = yaml_file_factory(
+        {
+            "sites_config_enable": True,
+            "sites_config": {
+                "prune": True,
+                "items": [
+                    {"domain": "domain.local1:8000", "name": "Domain1"},
+                    {"domain": "domain.local2:8000", "name": "Domain2"},
+                ],
+            },
+        }
+    )
+    monkeypatch.setattr(SitesConfigurationStep, "prune_batch_size", 2)
+
+    plan = SitesConfigurationStep().plan(
+        SitesConfigurationStep.config_model(
+            items=[
+                {"domain": "domain.local1:8000", "name": "Domain1"},
+                {"domain": "domain.local2:8000", "name": "Domain2"},
+            ],
+            prune=True,
+        )
+    )
+
+    assert plan == [
+        "Update current site to domain.local1:8000",
+        "Create site domain.local2:8000",
+        "Delete site old0.example.com",
+        "Delete site old1.example.com",
+        "Delete site old2.example.com",
+    ]
+    assert Site.objects.count() == 5
+
+    execute_single_step(SitesConfigurationStep, yaml_source=yaml_file)
+
+    assert set(Site.objects.values_list("domain", flat=True)) == {
+        "domain.local1:8000",
+        "domain.local2:8000",
+    }
+    assert Site.objects.get_current().pk == current_site_pk
+
+
+@pytest.mark.django_db
+def test_command_plan_reports_sites_to_prune(yaml_file_factory):
+    Site.objects.create(domain="old.example.com", name="old")
+    yaml_file = yaml_file_factory(
+        {
+            "sites_config_enable": True,
+            "sites_config": {
+                "prune": True,
+                "items": [{"domain": "example.com", "name": "example.com"}],
+            },
+        }
+    )
+    stdout = StringIO()
+
+    call_command(
+        "setup_configuration",
+        "--plan",
+        "--only",
+        "sites_config",
+        yaml_file=yaml_file,
+        stdout=stdout,
+        stderr=StringIO(),
+    )
+
+    assert stdout.getvalue().endswith(
+        "Planned changes:\n"
+        "    Sites configuration:\n"
+        "        Delete site old.example.com\n"
+    )
+    assert Site.objects.filter(domain="old.example.com").exists()
+
+
+@pytest.mark.django_db
+def test_diff_reports_drift():
+    Site.objects.filter(pk=Site.objects.get_current().pk).update(
+        domain="domain.local1:8000", name="Changed"
+    )
+    Site.objects.clear_cache()
+    Site.objects.create(domain="domain.local2:8000", name="Other")
+    Site.objects.create(domain="unknown.example.com", name="unknown")
+    step = SitesConfigurationStep()
+
+    differences = step.diff(
+        step.config_model(
+            items=[
+                {"domain": "domain.local1:8000", "name": "Domain1"},
+                {"domain": "domain.local2:8000", "name": "Domain2"},
+                {"domain": "domain.local3:8000", "name": "Domain3"},
+            ],
+            prune=True,
+        )
+    )
+
+    assert differences == [
+        "Current site: name is 'Changed', expected 'Domain1'",
+        "Site domain.local2:8000: name is 'Other', expected 'Domain2'",
+        "Site domain.local3:8000 is missing",
+        "Site unknown.example.com is not in the configuration",
+    ]
+
+
+@pytest.mark.django_db
+def test_command_check_drift(yaml_file_factory):
+    stdout = StringIO()
+    call_command(
+        "setup_configuration",
+        "--only",
+        "sites_config",
+        yaml_file=CONFIG_FILE_PATH,
+        stdout=StringIO(),
+        stderr=StringIO(),
+    )
+
+    call_command(
+        "setup_configuration",
+        "--check-drift",
+        "--only",
+        "sites_config",
+        yaml_file=CONFIG_FILE_PATH,
+        stdout=stdout,
+        stderr=StringIO(),
+    )
+
+    assert stdout.getvalue().endswith(
+        "    Sites configuration: no drift\nNo drift detected.\n"
+    )
+
+    Site.objects.filter(domain="domain.local2:8000").update(name="Changed")
+    stdout = StringIO()
+    with pytest.raises(CommandError, match="Drift detected for 1 steps"):
+        call_command(
+            "setup_configuration",
+            "--check-drift",
+            "--only",
+            "sites_config",
+            yaml_file=CONFIG_FILE_PATH,
+            stdout=stdout,
+            stderr=StringIO(),
+        )
+
+    assert stdout.getvalue().endswith(
+        "    Sites configuration:\n"
+        "        Site domain.local2:8000: name is 'Changed', expected 'Domain2'\n"
+    )
+
+
+@pytest.mark.django_db
+def test_runner_diff_all_is_read_only():
+    runner = SetupConfigurationRunner(
+        steps=[SitesConfigurationStep], yaml_source=CONFIG_FILE_PATH
+    )
+
+    with CaptureQueriesContext(connection) as context:
+        (step_diff,) = runner.diff_all()
+
+    assert step_diff.differences
+    assert all(query["sql"].startswith("SELECT") for query in context.captured_queries)
+
+
+@pytest.mark.django_db
+def test_items_are_validated_once(mocker):
+    Site.objects.create(domain="old.example.com", name="old")
+    step = SitesConfigurationStep()
+    model = step.config_model(
+        items=[
+            {"domain": f"domain.local{i}:8000", "name": f"Domain{i}"} for i in range(5)
+        ],
+        prune=True,
+    )
+    chunks = mocker.spy(StreamedList, "chunks")
+
+    for method in (step.plan, step.diff, step.execute):
+        chunks.reset_mock()
+        method(model)
+
+        assert chunks.call_count == 1, method
+
+    assert not Site.objects.filter(domain="old.example.com").exists()
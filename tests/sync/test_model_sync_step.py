@@ -0,0 +1,241 @@
+from django.contrib.auth.models import Group
+from django.contrib.sites.models import Site
+from django.core.exceptions import ValidationError
+from django.db import connection
+
+import pytest
+
+from django_setup_configuration.contrib.sync.steps import ModelSyncStep, SyncResult
+from django_setup_configuration.exceptions import ConfigurationException
+from django_setup_configuration.fields import StreamedList
+from django_setup_configuration.test_utils import execute_single_step
+
+pytestmark = pytest.mark.django_db
+
+
+class SiteSyncStep(ModelSyncStep):
+    verbose_name = "Sites"
+    namespace = "synced_sites"
+    enable_setting = "synced_sites_enable"
+    model = Site
+    natural_key = "domain"
+    batch_size = 2
+
+
+class PruningSiteSyncStep(SiteSyncStep):
+    prune = True
+
+    def get_queryset(self):
+        return super().get_queryset().exclude(domain="example.com")
+
+
+class CompositeKeySiteSyncStep(SiteSyncStep):
+    natural_key = ("domain", "name")
+
+
+class GroupSyncStep(ModelSyncStep):
+    verbose_name = "Groups"
+    namespace = "synced_groups"
+    enable_setting = "synced_groups_enable"
+    model = "auth.Group"
+    natural_key = ("name",)
+
+
+def execute(step, items):
+    result = execute_single_step(step, object_source={step.namespace: {"items": items}})
+    return result.step.sync_result
+
+
+def test_config_model_is_derived_from_the_model():
+    config_model = SiteSyncStep.config_model
+    items_field = config_model.model_fields["items"]
+    item_model = items_field.annotation.__args__[0]
+
+    assert items_field.annotation.__origin__ is StreamedList
+    assert list(item_model.model_fields) == ["domain", "name"]
+    assert item_model.model_fields["domain"].title == (
+        Site._meta.get_field("domain").verbose_name
+    )
+    assert PruningSiteSyncStep.config_model is not SiteSyncStep.config_model
+
+
+def test_config_model_is_derived_on_first_access():
+    # Defining the step does not resolve the model, which requires the app registry
+    class UnknownModelStep(SiteSyncStep):
+        model = "unknown.Model"
+
+    assert "_config_model" not in UnknownModelStep.__dict__
+    with pytest.raises(LookupError):
+        UnknownModelStep.config_model  # noqa: B018
+
+    assert SiteSyncStep.config_model is SiteSyncStep().config_model
+
+
+def test_natural_key_must_be_a_field():
+    with pytest.raises(ConfigurationException):
+
+        class InvalidStep(SiteSyncStep):
+            fields = ("name",)
+
+
+def test_sync_creates_and_updates_in_bulk(django_assert_num_queries):
+    Site.objects.create(domain="a.example.com", name="old")
+    Site.objects.create(domain="b.example.com", name="b")
+
+    with django_assert_num_queries(6):
+        result = execute(
+            SiteSyncStep,
+            [
+                {"domain": "a.example.com", "name": "a"},
+                {"domain": "b.example.com", "name": "b"},
+                {"domain": "c.example.com", "name": "c"},
+            ],
+        )
+
+    # savepoint, two batches with a select each, and bulk_update and bulk_create
+    assert result == SyncResult(created=1, updated=1, unchanged=1)
+    assert set(Site.objects.values_list("domain", "name")) >= {
+        ("a.example.com", "a"),
+        ("b.example.com", "b"),
+        ("c.example.com", "c"),
+    }
+
+
+def test_sync_with_composite_key():
+    Site.objects.create(domain="a.example.com", name="a")
+
+    result = execute(
+        CompositeKeySiteSyncStep,
+        [
+            {"domain": "a.example.com", "name": "a"},
+            {"domain": "b.example.com", "name": "b"},
+        ],
+    )
+
+    assert result == SyncResult(created=1, unchanged=1)
+
+
+@pytest.mark.parametrize("returns_rows", [True, False])
+def test_sync_with_composite_key_applies_full_batches(
+    mocker, monkeypatch, returns_rows
+):
+    monkeypatch.setattr(CompositeKeySiteSyncStep, "batch_size", 1000)
+    # Without returned rows, the created objects are fetched by their keys again
+    mocker.patch.object(
+        type(connection.features),
+        "can_return_rows_from_bulk_insert",
+        new_callable=mocker.PropertyMock,
+        return_value=returns_rows,
+    )
+    Site.objects.bulk_create(
+        [Site(domain=f"{i}.example.com", name=str(i)) for i in range(500)]
+    )
+    items = [{"domain": f"{i}.example.com", "name": str(i)} for i in range(1000)]
+
+    result = execute(CompositeKeySiteSyncStep, items)
+
+    assert result == SyncResult(created=500, unchanged=500)
+    assert Site.objects.filter(domain__endswith=".example.com").count() == 1000
+
+
+def test_sync_validates_objects():
+    with pytest.raises(ValidationError):
+        execute(SiteSyncStep, [{"domain": "invalid domain", "name": "a"}])
+
+    assert not Site.objects.filter(name="a").exists()
+
+
+def test_sync_with_model_label():
+    Group.objects.create(name="existing")
+
+    result = execute(GroupSyncStep, [{"name": "existing"}, {"name": "new"}])
+
+    assert result == SyncResult(created=1, unchanged=1)
+    assert set(Group.objects.values_list("name", flat=True)) == {"existing", "new"}
+
+
+def test_prune_deletes_rows_in_queryset():
+    Site.objects.bulk_create(
+        [Site(domain=f"{i}.example.com", name=str(i)) for i in range(5)]
+    )
+
+    result = execute(PruningSiteSyncStep, [{"domain": "1.example.com", "name": "1"}])
+
+    assert result == SyncResult(unchanged=1, deleted=4)
+    assert set(Site.objects.values_list("domain", flat=True)) == {
+        "example.com",
+        "1.example.com",
+    }
+
+
+def test_plan_does_not_write():
+    Site.objects.create(domain="a.example.com", name="old")
+    Site.objects.create(domain="b.example.com", name="b")
+    step = PruningSiteSyncStep()
+
+    plan = step.plan(
+        step.config_model(
+            items=[
+                {"domain": "a.example.com", "name": "a"},
+                {"domain": "c.example.com", "name": "c"},
+            ]
+        )
+    )
+
+    assert plan == [
+        "Create site c.example.com",
+        "Update site a.example.com",
+        "Delete site b.example.com",
+    ]
+    assert Site.objects.get(domain="a.example.com").name == "old"
+    assert Site.objects.count() == 3
+
+
+def test_diff_does_not_write():
+    Site.objects.create(domain="a.example.com", name="old")
+    Site.objects.create(domain="b.example.com", name="b")
+    step = PruningSiteSyncStep()
+
+    differences = step.diff(
+        step.config_model(
+            items=[
+                {"domain": "a.example.com", "name": "a"},
+                {"domain": "c.example.com", "name": "c"},
+            ]
+        )
+    )
+
+    assert differences == [
+        "site c.example.com is missing",
+        "site a.example.com: name is 'old', expected 'a'",
+        "site b.example.com is not in the configuration",
+    ]
+    assert Site.objects.get(domain="a.example.com").name == "old"
+
+
+def test_sync_registers_created_objects_without_returned_primary_keys(mocker):
+    mocker.patch.object(
+        type(connection.features),
+        "can_return_rows_from_bulk_insert",
+        new_callable=mocker.PropertyMock,
+        return_value=False,
+    )
+    Site.objects.create(domain="a.example.com", name="a")
+
+    result = execute_single_step(
+        SiteSyncStep,
+        object_source={
+            "synced_sites": {
+                "items": [
+                    {"domain": "a.example.com", "name": "a"},
+                    {"domain": "b.example.com", "name": "b"},
+                    {"domain": "c.example.com", "name": "c"},
+                ]
+            }
+        },
+    )
+
+    identity_map = result.step.context.identity_map
+    for domain in ("a.example.com", "b.example.com", "c.example.com"):
+        site = identity_map.lookup(Site, domain=domain)
+        assert site.pk == Site.objects.get(domain=domain).pk
@@ -0,0 +1,62 @@
+from django.contrib.sites.models import Site
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+import pytest
+
+from django_setup_configuration.contrib.sync.prune import (
+    delete_in_batches,
+    get_prunable,
+)
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture()
+def sites():
+    return Site.objects.bulk_create(
+        [Site(domain=f"{i}.example.com", name=str(i % 2)) for i in range(5)]
+    )
+
+
+def test_get_prunable_uses_a_single_query(sites, django_assert_num_queries):
+    with django_assert_num_queries(1):
+        prunable = get_prunable(
+            Site.objects.filter(domain__endswith=".example.com"),
+            "domain",
+            {"0.example.com", "3.example.com"},
+        )
+
+    assert sorted(key for _, key in prunable) == [
+        "1.example.com",
+        "2.example.com",
+        "4.example.com",
+    ]
+
+
+def test_get_prunable_with_composite_key(sites):
+    prunable = get_prunable(
+        Site.objects.filter(domain__endswith=".example.com"),
+        ("domain", "name"),
+        {("0.example.com", "0"), ("1.example.com", "0")},
+    )
+
+    assert len(prunable) == 4
+    assert ("0.example.com", "0") not in {key for _, key in prunable}
+
+
+def test_delete_in_batches(sites):
+    pks = [site.pk for site in sites[:3]]
+
+    with CaptureQueriesContext(connection) as context:
+        deleted = delete_in_batches(Site.objects.all(), pks, batch_size=2)
+
+    delete_queries = [
+        query["sql"]
+        for query in context.captured_queries
+        if query["sql"].startswith('DELETE FROM "django_site"')
+    ]
+    assert len(delete_queries) == 2
+
+    assert deleted == 3
+    assert Site.objects.filter(pk__in=pks).count() == 0
@@ -1,4 +1,5 @@
-from io import StringIO
+import gzip
+from io import BytesIO, StringIO
 
 from django.contrib.auth.models import User
 from django.core.management import CommandError, call_command
@@ -557,6 +558,100 @@ def test_command_with_disabled_and_enabled_steps_lists_the_disabled_steps(
     step_execute_mock.assert_not_called()
 
 
+def test_command_only_runs_selected_steps(
+    step_execute_mock, yaml_file_with_valid_configuration
+):
+    stdout = StringIO()
+    call_command(
+        "setup_configuration",
+        "--yaml-file",
+        yaml_file_with_valid_configuration,
+        "--only",
+        "user_*",
+        stdout=stdout,
+    )
+
+    assert "ConfigStep" not in stdout.getvalue()
+    assert User.objects.count() == 1
+    step_execute_mock.assert_not_called()
+
+
+def test_command_errors_if_no_steps_are_selected(
+    step_execute_mock, yaml_file_with_valid_configuration
+):
+    with pytest.raises(CommandError) as exc:
+        call_command(
+            "setup_configuration",
+            "--yaml-file",
+            yaml_file_with_valid_configuration,
+            "--exclude",
+            "*",
+        )
+
+    assert str(exc.value) == "No steps match the step selection, aborting."
+    step_execute_mock.assert_not_called()
+
+
+def test_command_fail_fast_stops_after_first_invalid_step(
+    step_execute_mock, yaml_file_factory
+):
+    yaml_path = yaml_file_factory(
+        {
+            "user_configuration_enabled": True,
+            "user_configuration": {"username": None},
+            "test_step_is_enabled": True,
+            "test_step": {"a_string": 42, "username": None},
+        }
+    )
+    stderr = StringIO()
+
+    with pytest.raises(CommandError) as exc:
+        call_command(
+            "setup_configuration",
+            "--yaml-file",
+            yaml_path,
+            "--fail-fast",
+            "--max-errors-per-step",
+            "1",
+            stdout=StringIO(),
+            stderr=stderr,
+        )
+
+    assert str(exc.value) == "Failed to validate requirements for 1 steps"
+    output = stderr.getvalue()
+    assert "User Configuration" in output
+    assert "ConfigStep" not in output
+    assert "... and 1 more errors (not shown)" in output
+    assert "Stopped validating early, 1 steps were not validated." in output
+    step_execute_mock.assert_not_called()
+
+
+def test_command_lists_steps_which_were_not_imported_as_disabled(
+    settings, step_execute_mock, yaml_file_factory
+):
+    settings.SETUP_CONFIGURATION_STEPS = [
+        "testapp.configuration.UserConfigurationStep",
+        ("module.does.not.exist.Step", "missing_step_enabled"),
+    ]
+    yaml_path = yaml_file_factory(
+        {
+            "user_configuration_enabled": True,
+            "user_configuration": {
+                "username": "alice",
+                "password": "secret",
+            },
+        }
+    )
+
+    stdout = StringIO()
+    call_command("setup_configuration", yaml_file=yaml_path, stdout=stdout)
+
+    output = stdout.getvalue().splitlines()
+    assert "    module.does.not.exist.Step [***disabled***]" in output
+    assert "    module.does.not.exist.Step [missing_step_enabled = false]" in output
+    assert User.objects.count() == 1
+
+
 @pytest.fixture()
 def valid_config_object(test_step_valid_config):
     return {
@@ -626,3 +721,126 @@ def test_model_exceptions_are_reported_to_user(
         str(excinfo.value)
         == "Aborting run due to a failed step. All database changes have been rolled back."
     )
+
+
+def test_command_merges_multiple_yaml_files(
+    yaml_file_factory, yaml_file_with_valid_configuration, step_execute_mock
+):
+    overlay_path = yaml_file_factory({"user_configuration": {"username": "overlay"}})
+    stdout, stderr = StringIO(), StringIO()
+
+    call_command(
+        "setup_configuration",
+        "--yaml-file",
+        yaml_file_with_valid_configuration,
+        "--yaml-file",
+        overlay_path,
+        validate_only=True,
+        stdout=stdout,
+        stderr=stderr,
+    )
+
+    assert stdout.getvalue().splitlines()[0] == (
+        "Loading config settings from "
+        f"{yaml_file_with_valid_configuration}, {overlay_path}"
+    )
+    assert build_step_config_from_sources(
+        UserConfigurationStep, [yaml_file_with_valid_configuration, overlay_path]
+    ) == UserConfigurationModel(username="overlay", password="secret")
+
+
+def test_command_reads_compressed_yaml_from_stdin(
+    yaml_file_with_valid_configuration, step_execute_mock
+):
+    with open(yaml_file_with_valid_configuration, "rb") as yaml_file:
+        stdin = BytesIO(gzip.compress(yaml_file.read()))
+    stdout = StringIO()
+
+    call_command(
+        "setup_configuration",
+        yaml_file="-",
+        stdin=stdin,
+        stdout=stdout,
+        stderr=StringIO(),
+    )
+
+    output = stdout.getvalue().splitlines()
+    assert output[0] == "Loading config settings from <stdin>"
+    assert output[-1] == "Configuration completed."
+    assert User.objects.get().username == "demo"
+
+
+def test_command_reads_json_from_stdin_with_explicit_format(step_execute_mock):
+    stdin = StringIO(
+        '{"user_configuration_enabled": true, "test_step_is_enabled": false, '
+        '"user_configuration": {"username": "demo", "password": "secret"}}'
+    )
+
+    call_command(
+        "setup_configuration",
+        "--yaml-file",
+        "-",
+        "--format",
+        "json",
+        stdin=stdin,
+        stdout=StringIO(),
+        stderr=StringIO(),
+    )
+
+    assert User.objects.get().username == "demo"
+    step_execute_mock.assert_not_called()
+
+
+def test_command_compiles_and_runs_from_snapshot(
+    tmp_path, yaml_file_with_valid_configuration, step_execute_mock
+):
+    snapshot_path = tmp_path / "snapshot.json"
+    stdout = StringIO()
+
+    call_command(
+        "setup_configuration",
+        yaml_file=yaml_file_with_valid_configuration,
+        compile=str(snapshot_path),
+        stdout=stdout,
+        stderr=StringIO(),
+    )
+
+    assert (
+        stdout.getvalue()
+        .splitlines()[-1]
+        .startswith(f"Wrote configuration snapshot to {snapshot_path} (sha256: ")
+    )
+    assert User.objects.count() == 0
+    step_execute_mock.assert_not_called()
+
+    stdout = StringIO()
+    call_command(
+        "setup_configuration",
+        snapshot=str(snapshot_path),
+        stdout=stdout,
+        stderr=StringIO(),
+    )
+
+    output = stdout.getvalue().splitlines()
+    assert output[0] == f"Loading config settings from snapshot {snapshot_path}"
+    assert output[-1] == "Configuration completed."
+    assert User.objects.get().username == "demo"
+    step_execute_mock.assert_called_once()
+
+
+def test_command_errors_on_snapshot_for_other_steps(
+    settings, tmp_path, yaml_file_with_valid_configuration
+):
+    snapshot_path = tmp_path / "snapshot.json"
+    call_command(
+        "setup_configuration",
+        yaml_file=yaml_file_with_valid_configuration,
+        compile=str(snapshot_path),
+        stdout=StringIO(),
+    )
+    settings.SETUP_CONFIGURATION_STEPS = [ConfigStep]
+
+    with pytest.raises(CommandError) as exc:
+        call_command("setup_configuration", snapshot=str(snapshot_path))
+
+    assert "The snapshot was built for a different set of steps" in str(exc.value)
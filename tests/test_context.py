@@ -0,0 +1,274 @@
+from django.contrib.auth.models import Group
+from django.contrib.sites.models import Site
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+import pytest
+
+from django_setup_configuration.configuration import BaseConfigurationStep
+from django_setup_configuration.context import IdentityMap, PrefetchRequest
+from django_setup_configuration.contrib.sites.steps import SitesConfigurationStep
+from django_setup_configuration.models import ConfigurationModel
+from django_setup_configuration.runner import SetupConfigurationRunner
+
+pytestmark = pytest.mark.django_db
+
+
+class EmptyConfigurationModel(ConfigurationModel):
+    pass
+
+
+class LookupSiteStep(BaseConfigurationStep[EmptyConfigurationModel]):
+    verbose_name = "Lookup site"
+    config_model = EmptyConfigurationModel
+    namespace = "lookup_site"
+    enable_setting = "lookup_site_enable"
+
+    def execute(self, model):
+        self.context.data["site"] = self.context.identity_map.lookup(
+            Site, domain="domain.local2:8000"
+        )
+
+
+class FailingGroupStep(LookupSiteStep):
+    verbose_name = "Failing group"
+    namespace = "failing_group"
+    enable_setting = "failing_group_enable"
+
+    def execute(self, model):
+        self.context.identity_map.add(Group.objects.create(name="group"), "name")
+        raise ValueError("Failed")
+
+
+class RenameSiteStep(LookupSiteStep):
+    verbose_name = "Rename site"
+    namespace = "rename_site"
+    enable_setting = "rename_site_enable"
+
+    def execute(self, model):
+        site = self.context.identity_map.get(Site, domain="domain.local2:8000")
+        site.name = "Renamed"
+        site.save()
+        raise ValueError("Failed")
+
+
+class PrefetchSitesStep(LookupSiteStep):
+    verbose_name = "Prefetch sites"
+    namespace = "prefetch_sites"
+    enable_setting = "prefetch_sites_enable"
+    domains = ("a.example.com", "b.example.com")
+
+    def get_prefetch_requests(self, model):
+        return [PrefetchRequest(Site, "domain", self.domains)]
+
+    def execute(self, model):
+        self.context.data.setdefault("sites", []).extend(
+            self.context.identity_map.lookup(Site, domain=domain)
+            for domain in self.domains
+        )
+
+
+class PrefetchOtherSitesStep(PrefetchSitesStep):
+    verbose_name = "Prefetch other sites"
+    namespace = "prefetch_other_sites"
+    enable_setting = "prefetch_other_sites_enable"
+    domains = ("b.example.com", "c.example.com")
+
+
+def test_identity_map_get_caches_objects(django_assert_num_queries):
+    site = Site.objects.create(domain="a.example.com", name="A")
+    identity_map = IdentityMap()
+
+    assert identity_map.lookup(Site, domain="a.example.com") is None
+    with django_assert_num_queries(1):
+        assert identity_map.get(Site, domain="a.example.com") == site
+        assert identity_map.get(Site, domain="a.example.com") == site
+
+    with pytest.raises(Site.DoesNotExist):
+        identity_map.get(Site, domain="b.example.com")
+
+
+def test_identity_map_prefetch_and_composite_keys(django_assert_num_queries):
+    Site.objects.bulk_create(
+        [Site(domain=f"{i}.example.com", name=str(i)) for i in range(3)]
+    )
+    identity_map = IdentityMap()
+
+    with django_assert_num_queries(1):
+        identity_map.prefetch(Site.objects.all(), "name", "domain")
+
+    with django_assert_num_queries(0):
+        site = identity_map.get(Site, domain="1.example.com", name="1")
+    assert site.name == "1"
+    assert identity_map.lookup(Site, domain="1.example.com") is None
+
+
+def test_identity_map_copy_is_independent():
+    identity_map = IdentityMap()
+    copy = identity_map.copy()
+
+    copy.add(Site(domain="a.example.com"), "domain")
+
+    assert len(identity_map) == 0
+    assert len(copy) == 1
+
+
+def test_identity_map_rollback_discards_used_objects():
+    identity_map = IdentityMap()
+    kept, used = Site(domain="a.example.com"), Site(domain="b.example.com")
+    identity_map.add(kept, "domain")
+    identity_map.add(used, "domain", "name")
+
+    savepoint = identity_map.savepoint()
+    assert identity_map.lookup(Site, domain="b.example.com", name="") is used
+    identity_map.add(Site(domain="c.example.com"), "domain")
+    identity_map = identity_map.rollback(savepoint)
+
+    assert identity_map.lookup(Site, domain="a.example.com") is kept
+    # Including the other natural keys of the object
+    assert identity_map.lookup(Site, domain="b.example.com") is None
+    assert identity_map.lookup(Site, domain="c.example.com") is None
+
+
+def test_failed_step_discards_the_objects_it_modified():
+    runner = SetupConfigurationRunner(
+        steps=[SitesConfigurationStep, RenameSiteStep, LookupSiteStep],
+        object_source={
+            "sites_config_enable": True,
+            "sites_config": {
+                "items": [{"domain": "domain.local2:8000", "name": "Domain2"}]
+            },
+            "rename_site_enable": True,
+            "rename_site": {},
+            "lookup_site_enable": True,
+            "lookup_site": {},
+        },
+    )
+    sites_step, rename_step, lookup_step = runner.configured_steps
+
+    runner._execute_step(sites_step)
+    rename_result = runner._execute_step(rename_step)
+    runner._execute_step(lookup_step)
+
+    assert isinstance(rename_result.run_exception, ValueError)
+    # The renamed instance is not handed out, although it was registered before
+    assert runner.context.data["site"] is None
+    assert runner.context.identity_map.get(Site, domain="domain.local2:8000").name == (
+        "Domain2"
+    )
+
+
+def test_steps_share_the_run_context(django_assert_num_queries):
+    runner = SetupConfigurationRunner(
+        steps=[SitesConfigurationStep, FailingGroupStep, LookupSiteStep],
+        object_source={
+            "sites_config_enable": True,
+            "sites_config": {
+                "items": [
+                    {"domain": "domain.local1:8000", "name": "Domain1"},
+                    {"domain": "domain.local2:8000", "name": "Domain2"},
+                ]
+            },
+            "failing_group_enable": True,
+            "failing_group": {},
+            "lookup_site_enable": True,
+            "lookup_site": {},
+        },
+    )
+    sites_step, failing_step, lookup_step = runner.configured_steps
+
+    sites_result = runner._execute_step(sites_step)
+    failing_result = runner._execute_step(failing_step)
+    with django_assert_num_queries(2):  # The savepoint of the step
+        runner._execute_step(lookup_step)
+
+    assert sites_result.run_exception is None
+    assert isinstance(failing_result.run_exception, ValueError)
+    assert runner.context.data["site"] == Site.objects.get(domain="domain.local2:8000")
+    assert runner.context.identity_map.lookup(Group, name="group") is None
+
+
+def test_context_is_reset_for_each_run():
+    runner = SetupConfigurationRunner(
+        steps=[FailingGroupStep],
+        object_source={"failing_group_enable": True, "failing_group": {}},
+    )
+    runner.context.data["stale"] = True
+
+    runner.execute_all()
+
+    assert runner.context.data == {}
+
+
+def test_identity_map_merges_prefetch_requests(django_assert_num_queries):
+    Site.objects.bulk_create(
+        [Site(domain=f"{i}.example.com", name=str(i)) for i in range(5)]
+    )
+    identity_map = IdentityMap()
+    requests = [
+        PrefetchRequest(Site, "domain", ["0.example.com", "1.example.com"]),
+        PrefetchRequest(Site, "domain", ["1.example.com", "missing.example.com"]),
+        PrefetchRequest(Site, "domain", {"2.example.com", "3.example.com"}),
+    ]
+
+    with django_assert_num_queries(2):
+        assert identity_map.prefetch_requests(requests, batch_size=3) == 4
+
+    # Requests which were fetched before are skipped
+    with django_assert_num_queries(0):
+        assert identity_map.prefetch_requests(requests[:2]) == 0
+    assert identity_map.lookup(Site, domain="3.example.com").name == "3"
+
+
+def test_runner_batches_prefetch_requests_of_steps():
+    Site.objects.bulk_create(
+        [
+            Site(domain=domain, name=domain)
+            for domain in ("a.example.com", "c.example.com")
+        ]
+    )
+    runner = SetupConfigurationRunner(
+        steps=[PrefetchSitesStep, PrefetchOtherSitesStep],
+        object_source={
+            "prefetch_sites_enable": True,
+            "prefetch_sites": {},
+            "prefetch_other_sites_enable": True,
+            "prefetch_other_sites": {},
+        },
+    )
+
+    with CaptureQueriesContext(connection) as queries:
+        results = runner.execute_all()
+
+    assert all(result.run_exception is None for result in results)
+    site_queries = [
+        query for query in queries.captured_queries if "django_site" in query["sql"]
+    ]
+    assert len(site_queries) == 1
+    assert [site and site.domain for site in runner.context.data["sites"]] == [
+        "a.example.com",
+        None,
+        None,
+        "c.example.com",
+    ]
+
+
+def test_failing_prefetch_request_is_reported_by_step():
+    class InvalidPrefetchStep(PrefetchSitesStep):
+        def get_prefetch_requests(self, model):
+            return [PrefetchRequest(Site, "unknown_field", ["a.example.com"])]
+
+    runner = SetupConfigurationRunner(
+        steps=[InvalidPrefetchStep, PrefetchOtherSitesStep],
+        object_source={
+            "prefetch_sites_enable": True,
+            "prefetch_sites": {},
+            "prefetch_other_sites_enable": True,
+            "prefetch_other_sites": {},
+        },
+    )
+
+    invalid_result, other_result = runner.execute_all()
+
+    assert invalid_result.run_exception is not None
+    assert other_result.run_exception is None
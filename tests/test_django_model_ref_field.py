@@ -1,15 +1,25 @@
 from typing import Literal
+from unittest import mock
 
 from django.core.exceptions import ValidationError as DjangoValidationError
 from django.core.validators import validate_slug
+from django.db import models
 
 import pytest
 from pydantic import ValidationError
 from pydantic.fields import PydanticUndefined
 
-from django_setup_configuration.fields import DjangoModelRef
+from django_setup_configuration import fields
+from django_setup_configuration.fields import (
+    UNMAPPED_DJANGO_FIELD,
+    DjangoModelRef,
+    DjangoModelRefInfo,
+    get_django_field_type,
+    get_model_from_ref,
+    register_django_field_type,
+)
 from django_setup_configuration.models import ConfigurationModel
-from testapp.models import DjangoModel, StrChoices
+from testapp.models import DjangoModel, StrChoices, UnmappedDjangoField
 
 
 def test_meta_spec_is_equivalent_to_inline_fields():
@@ -261,10 +271,48 @@ def test_verbose_name_sets_title():
 
 
 def test_unmapped_type_raises():
+    class Config(ConfigurationModel):
+        foreign_key = DjangoModelRef(DjangoModel, "foreign_key")
+
+    # The Django fields are resolved on first use
     with pytest.raises(ValueError):
+        Config.model_fields  # noqa: B018
+
+
+def test_django_fields_are_not_resolved_on_class_creation():
+    with mock.patch(
+        "django_setup_configuration.fields.get_model_from_ref",
+        wraps=get_model_from_ref,
+    ) as m:
 
         class Config(ConfigurationModel):
-            foreign_key = DjangoModelRef(DjangoModel, "foreign_key")
+            required_int = DjangoModelRef("testapp.DjangoModel", "required_int")
+
+        m.assert_not_called()
+
+        assert Config(required_int=1).required_int == 1
+        assert Config.model_fields["required_int"].annotation is int
+
+    m.assert_called_once()
+
+
+def test_django_fields_are_resolved_for_nested_models_and_subclasses():
+    class Config(ConfigurationModel):
+        required_int = DjangoModelRef(DjangoModel, "required_int")
+
+    class SubConfig(Config):
+        slug = DjangoModelRef(DjangoModel, "slug")
+
+    class Parent(ConfigurationModel):
+        config: SubConfig
+
+    parent = Parent(config={"required_int": "1", "slug": "foo"})
+
+    assert parent.config.required_int == 1
+    with pytest.raises(ValidationError):
+        Parent(config={"required_int": "foo", "slug": "foo"})
+    assert set(SubConfig.model_fields) == {"required_int", "slug"}
+    assert Config.model_fields["required_int"].annotation is int
 
 
 def test_unmapped_type_does_not_raise_if_annotation_is_overridden():
@@ -425,3 +473,52 @@ def test_defaults_and_null_flags_are_respected_for_unmapped_fields():
         Config.model_fields["unmapped_django_field_without_default_with_blank"].default
         == ""
     )
+
+
+def test_field_types_are_resolved_through_the_mro():
+    class CustomCharField(models.CharField):
+        pass
+
+    assert get_django_field_type(CustomCharField) is str
+    assert get_django_field_type(models.BigAutoField) is int
+    assert get_django_field_type(models.ForeignKey) is UNMAPPED_DJANGO_FIELD
+
+
+def test_registered_field_types_are_used(monkeypatch):
+    monkeypatch.setattr(fields, "DJANGO_FIELD_TYPES", dict(fields.DJANGO_FIELD_TYPES))
+    register_django_field_type(UnmappedDjangoField, str)
+
+    class Config(ConfigurationModel):
+        field = DjangoModelRef(
+            DjangoModel, "unmapped_django_field_without_default_without_blank"
+        )
+
+    try:
+        assert Config.model_fields["field"].annotation is str
+    finally:
+        get_django_field_type.cache_clear()
+        fields._field_info_cache.clear()
+
+
+def test_type_inference_is_memoized():
+    fields._field_info_cache.clear()
+
+    with mock.patch.object(
+        DjangoModelRefInfo,
+        "_infer_field_info",
+        autospec=True,
+        side_effect=DjangoModelRefInfo._infer_field_info,
+    ) as infer_field_info:
+
+        class Config(ConfigurationModel):
+            int_with_default = DjangoModelRef(DjangoModel, "int_with_default")
+
+        class OtherConfig(ConfigurationModel):
+            int_with_default = DjangoModelRef("testapp.DjangoModel", "int_with_default")
+            overridden = DjangoModelRef(DjangoModel, "int_with_default", default=1)
+
+        assert Config.model_fields["int_with_default"].default == 42
+        assert OtherConfig.model_fields["int_with_default"].default == 42
+        assert OtherConfig.model_fields["overridden"].default == 1
+
+    assert infer_field_info.call_count == 2
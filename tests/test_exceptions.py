@@ -0,0 +1,35 @@
+import pydantic
+import pytest
+
+from django_setup_configuration.exceptions import format_validation_error
+
+
+class Model(pydantic.BaseModel):
+    items: list[int]
+
+
+@pytest.fixture()
+def validation_error():
+    with pytest.raises(pydantic.ValidationError) as excinfo:
+        Model(items=["a", "b", "c" * 100])
+
+    return excinfo.value
+
+
+def test_format_validation_error_renders_all_errors_by_default(validation_error):
+    assert format_validation_error(validation_error) == str(validation_error)
+    assert format_validation_error(validation_error, max_errors=3) == str(
+        validation_error
+    )
+
+
+def test_format_validation_error_caps_the_number_of_errors(validation_error):
+    rendered = format_validation_error(validation_error, max_errors=1)
+
+    assert rendered.splitlines() == [
+        "3 validation errors for Model",
+        "items.0",
+        "  Input should be a valid integer, unable to parse string as an integer "
+        "[type=int_parsing, input_value='a', input_type=str]",
+        "... and 2 more errors (not shown)",
+    ]
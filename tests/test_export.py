@@ -0,0 +1,126 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.contrib.sites.models import Site
+from django.core.management import call_command
+from django.db.models import QuerySet
+
+import pytest
+import yaml
+
+from django_setup_configuration.contrib.auth.steps import UserConfigurationStep
+from django_setup_configuration.contrib.sites.steps import SitesConfigurationStep
+from django_setup_configuration.contrib.sync.steps import ModelSyncStep
+from django_setup_configuration.export import write_export
+from django_setup_configuration.runner import SetupConfigurationRunner
+from testapp import configuration as testapp_configuration
+
+pytestmark = pytest.mark.django_db
+
+
+class GroupSyncStep(ModelSyncStep):
+    verbose_name = "Groups"
+    namespace = "groups_config"
+    enable_setting = "groups_config_enable"
+    model = Group
+    natural_key = "name"
+
+
+STEPS = [SitesConfigurationStep, UserConfigurationStep, GroupSyncStep]
+
+
+@pytest.fixture()
+def database_state():
+    Site.objects.bulk_create(
+        [Site(domain=f"site{i}.example.com", name=f"Site {i}") for i in range(2500)]
+    )
+    get_user_model().objects.create_user(
+        username="admin", email="admin@example.com", password="secret", is_staff=True
+    )
+    get_user_model().objects.create_user(
+        username="john.doe", email="john@example.com", password="other"
+    )
+
+
+def test_export_round_trips(tmp_path, monkeypatch, database_state):
+    export_path = tmp_path / "export.yaml"
+    runner = SetupConfigurationRunner(
+        steps=STEPS + [testapp_configuration.UserConfigurationStep]
+    )
+
+    exported_steps = runner.export(export_path)
+
+    # The test app's user step has required fields which can not be exported
+    assert [type(step) for step in exported_steps] == STEPS
+
+    data = yaml.safe_load(export_path.read_text())
+    assert data["sites_config_enable"] is True
+    assert len(data["sites_config"]["items"]) == 2501
+    assert data["sites_config"]["items"][0] == {
+        "domain": "example.com",
+        "name": "example.com",
+    }
+    assert data["default_user_configuration_config"]["users"] == [
+        {
+            "email": "admin@example.com",
+            "username": "admin",
+            "password": {
+                "value_from": {"env": "SETUP_CONFIGURATION_EXPORTED_PASSWORD"}
+            },
+            "is_staff": True,
+            "is_superuser": False,
+        },
+        {
+            "email": "john@example.com",
+            "username": "john.doe",
+            "password": {
+                "value_from": {"env": "SETUP_CONFIGURATION_EXPORTED_PASSWORD"}
+            },
+            "is_staff": False,
+            "is_superuser": False,
+        },
+    ]
+    assert data["groups_config"] == {"items": []}
+
+    # A single password must be provided to apply the export
+    runner = SetupConfigurationRunner(steps=STEPS, yaml_source=export_path)
+    with pytest.raises(ValueError, match="SETUP_CONFIGURATION_EXPORTED_PASSWORD"):
+        runner.validate_all_requirements()
+
+    monkeypatch.setenv("SETUP_CONFIGURATION_EXPORTED_PASSWORD", "secret")
+    runner = SetupConfigurationRunner(steps=STEPS, yaml_source=export_path)
+    runner.validate_all_requirements()
+    (step_diff,) = [
+        step_diff
+        for step_diff in runner.diff_all()
+        if isinstance(step_diff.step, SitesConfigurationStep)
+    ]
+    assert step_diff.differences == []
+
+
+def test_export_streams_rows(mocker, database_state):
+    iterator = mocker.spy(QuerySet, "iterator")
+    Group.objects.create(name="editors")
+    stream = StringIO()
+
+    write_export(stream, [GroupSyncStep()])
+
+    assert iterator.call_args.kwargs == {"chunk_size": 2000}
+    assert stream.getvalue() == (
+        "groups_config_enable: true\ngroups_config:\n  items:\n  - name: editors\n"
+    )
+
+
+def test_command_exports_to_stdout(settings, database_state):
+    settings.SETUP_CONFIGURATION_STEPS = [GroupSyncStep]
+    Group.objects.create(name="editors")
+    stdout, stderr = StringIO(), StringIO()
+
+    call_command("setup_configuration", "--export", "-", stdout=stdout, stderr=stderr)
+
+    assert yaml.safe_load(stdout.getvalue()) == {
+        "groups_config_enable": True,
+        "groups_config": {"items": [{"name": "editors"}]},
+    }
+    assert "Exported step: Groups" in stderr.getvalue()
@@ -0,0 +1,144 @@
+import json
+import re
+import subprocess
+import sys
+
+# The import time budget in microseconds for the modules imported by every
+# `manage.py` invocation (through INSTALLED_APPS and the command discovery), excluding
+# Django itself. This is generous, to avoid flakiness on slow CI runners: the point
+# is to catch regressions such as eagerly importing pydantic, which alone costs more.
+IMPORT_TIME_BUDGET_US = 50_000
+
+# Modules which should only be imported when the command is actually used
+DEFERRED_MODULES = {"pydantic", "pydantic_settings", "yaml"}
+
+# The modules imported on every `manage.py` invocation
+STARTUP_MODULES = (
+    "django_setup_configuration",
+    "django_setup_configuration.apps",
+    "django_setup_configuration.management.commands.setup_configuration",
+)
+
+# Populates the app registry with the package installed, like `django.setup()` does
+# before running any command, which imports the `models` module of the app. The app
+# registry imports it with `importlib`, which `-X importtime` does not report, so the
+# modules and the time are measured by the script itself. Django is set up without the
+# package first, to exclude the cost of Django itself.
+DJANGO_SETUP_SCRIPT = """
+import json, sys, time
+import django, django.core.management
+from django.apps import apps
+from django.conf import settings
+
+settings.configure(INSTALLED_APPS=[])
+django.setup()
+preloaded = set(sys.modules)
+start = time.perf_counter()
+apps.set_installed_apps(["django_setup_configuration"])
+import django_setup_configuration.management.commands.setup_configuration
+json.dump(
+    {
+        "modules": sorted(set(sys.modules) - preloaded),
+        "duration_us": (time.perf_counter() - start) * 1_000_000,
+    },
+    sys.stdout,
+)
+"""
+
+_IMPORT_TIME_RE = re.compile(
+    r"^import time:\s+\d+ \|\s+(\d+) \| ( *)(\S+)$", re.MULTILINE
+)
+
+
+def _get_import_times(modules, *, preload=()) -> list[tuple[str, int, bool]]:
+    """
+    Import `modules` in a fresh interpreter, and parse the `-X importtime` output.
+
+    Modules in `preload` are imported first, and are not included in the results.
+
+    Returns:
+        A list of (module, cumulative import time in microseconds, is top-level
+        import) tuples for all the modules imported.
+    """
+    code = "; ".join(f"import {module}" for module in (*preload, "sys"))
+    code += "; sys.stderr.write('--- start ---\\n'); "
+    code += "; ".join(f"import {module}" for module in modules)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    _, _, output = result.stderr.partition("--- start ---\n")
+    return [
+        (module, int(cumulative_us), not indent)
+        for cumulative_us, indent, module in _IMPORT_TIME_RE.findall(output)
+    ]
+
+
+def test_import_does_not_load_deferred_modules():
+    import_times = _get_import_times(
+        STARTUP_MODULES, preload=("django.core.management",)
+    )
+
+    imported_packages = {module.split(".")[0] for module, _, _ in import_times}
+    assert "django_setup_configuration" in imported_packages
+    assert not imported_packages & DEFERRED_MODULES
+
+
+def _run_django_setup() -> dict:
+    """
+    Populate the app registry in a fresh interpreter, see `DJANGO_SETUP_SCRIPT`.
+
+    Returns:
+        A dict with the newly imported `modules`, and the `duration_us` of the setup
+        in microseconds.
+    """
+    result = subprocess.run(
+        [sys.executable, "-c", DJANGO_SETUP_SCRIPT],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(result.stdout)
+
+
+def test_django_setup_does_not_load_deferred_modules():
+    modules = _run_django_setup()["modules"]
+
+    assert "django_setup_configuration.models" in modules
+    assert not {module.split(".")[0] for module in modules} & DEFERRED_MODULES
+
+
+def test_import_time_is_within_budget():
+    import_times = _get_import_times(
+        STARTUP_MODULES, preload=("django.core.management",)
+    )
+
+    total_us = sum(cumulative_us for _, cumulative_us, top in import_times if top)
+    assert total_us < IMPORT_TIME_BUDGET_US, import_times
+
+
+def test_django_setup_import_time_is_within_budget():
+    result = _run_django_setup()
+
+    assert result["duration_us"] < IMPORT_TIME_BUDGET_US, result
+
+
+def test_lazy_exports():
+    import django_setup_configuration
+    from django_setup_configuration.configuration import BaseConfigurationStep
+    from django_setup_configuration.configuration_models import ConfigurationModel
+    from django_setup_configuration.fields import DjangoModelRef
+    from django_setup_configuration.models import (
+        ConfigurationModel as LegacyConfigurationModel,
+    )
+
+    assert LegacyConfigurationModel is ConfigurationModel
+    assert django_setup_configuration.BaseConfigurationStep is BaseConfigurationStep
+    assert django_setup_configuration.DjangoModelRef is DjangoModelRef
+    assert django_setup_configuration.ConfigurationModel is ConfigurationModel
+    assert set(django_setup_configuration.__all__) <= set(
+        dir(django_setup_configuration)
+    )
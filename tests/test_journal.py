@@ -0,0 +1,127 @@
+from django.contrib.sites.models import Site
+
+import pytest
+
+from django_setup_configuration.contrib.sites.models import SiteConfigurationModel
+from django_setup_configuration.journal import (
+    StepJournal,
+    StepJournalEntry,
+    get_item_digest,
+)
+
+pytestmark = pytest.mark.django_db
+
+
+def make_sites(*names):
+    return [
+        SiteConfigurationModel(domain=f"{name}.example.com", name=name)
+        for name in names
+    ]
+
+
+def get_domain(item):
+    return item.domain
+
+
+def test_get_item_digest_is_stable():
+    item = SiteConfigurationModel(domain="example.com", name="Example")
+
+    assert get_item_digest(item) == get_item_digest(item.model_copy())
+    assert get_item_digest({"b": 1, "a": 2}) == get_item_digest({"a": 2, "b": 1})
+    assert get_item_digest(item) != get_item_digest(
+        item.model_copy(update={"name": "Other"})
+    )
+
+
+def test_get_item_digest_excludes_fields():
+    item = SiteConfigurationModel(domain="example.com", name="Example")
+    other = item.model_copy(update={"name": "Other"})
+
+    assert get_item_digest(item, exclude={"name"}) == get_item_digest(
+        other, exclude={"name"}
+    )
+    assert get_item_digest({"a": 1, "b": 2}, exclude={"b"}) == get_item_digest({"a": 1})
+
+
+def test_first_run_reports_all_items_as_added():
+    journal = StepJournal("sites")
+
+    changes = journal.get_changes(make_sites("a", "b"), key=get_domain)
+
+    assert [item.name for item in changes.added] == ["a", "b"]
+    assert changes.changed == []
+    assert changes.removed == []
+    assert changes.unchanged_count == 0
+    assert changes.has_changes
+
+
+def test_changes_relative_to_recorded_run():
+    journal = StepJournal("sites")
+    journal.record(journal.get_changes(make_sites("a", "b", "c"), key=get_domain))
+
+    items = make_sites("a", "c", "d")
+    items[1].name = "C"
+    changes = journal.get_changes(items, key=get_domain)
+
+    assert [item.name for item in changes.added] == ["d"]
+    assert [item.name for item in changes.changed] == ["C"]
+    assert changes.removed == ["b.example.com"]
+    assert changes.unchanged_count == 1
+    assert [item.name for item in changes.pending] == ["d", "C"]
+
+    journal.record(changes)
+
+    assert dict(StepJournalEntry.objects.values_list("key", "digest")) == {
+        item.domain: get_item_digest(item) for item in items
+    }
+    assert not journal.get_changes(items, key=get_domain).has_changes
+
+
+def test_journal_is_scoped_to_the_step():
+    items = make_sites("a")
+    StepJournal("sites").record(StepJournal("sites").get_changes(items, key=get_domain))
+
+    changes = StepJournal("other").get_changes(items, key=get_domain)
+
+    assert len(changes.added) == 1
+
+
+def test_duplicate_keys_use_the_last_item():
+    journal = StepJournal("sites")
+    items = make_sites("a", "a")
+    items[1].name = "A"
+
+    changes = journal.get_changes(items, key=get_domain)
+
+    assert [item.name for item in changes.added] == ["A"]
+
+
+def test_unchanged_items_without_existing_object_are_added(
+    django_assert_num_queries,
+):
+    journal = StepJournal("sites", batch_size=2)
+    items = make_sites("a", "b", "c")
+    journal.record(journal.get_changes(items, key=get_domain))
+    Site.objects.create(domain="b.example.com", name="b")
+
+    # One query for the journal, and two batches of existing keys
+    with django_assert_num_queries(3):
+        changes = journal.get_changes(
+            items,
+            key=get_domain,
+            get_existing_keys=lambda domains: Site.objects.filter(
+                domain__in=domains
+            ).values_list("domain", flat=True),
+        )
+
+    assert [item.name for item in changes.added] == ["a", "c"]
+    assert changes.unchanged_count == 1
+
+
+def test_clear():
+    journal = StepJournal("sites")
+    journal.record(journal.get_changes(make_sites("a"), key=get_domain))
+
+    journal.clear()
+
+    assert not StepJournalEntry.objects.exists()
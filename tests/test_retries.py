@@ -0,0 +1,147 @@
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import Group
+from django.core.management import call_command
+from django.db import IntegrityError, OperationalError
+
+import pytest
+
+from django_setup_configuration.configuration import BaseConfigurationStep
+from django_setup_configuration.models import ConfigurationModel
+from django_setup_configuration.retries import get_retry_delay, is_transient_error
+from django_setup_configuration.runner import SetupConfigurationRunner
+from tests.conftest import ConfigStep
+
+pytestmark = pytest.mark.django_db
+
+
+class EmptyConfigurationModel(ConfigurationModel):
+    pass
+
+
+class ConflictingStep(BaseConfigurationStep[EmptyConfigurationModel]):
+    verbose_name = "Conflicting"
+    config_model = EmptyConfigurationModel
+    namespace = "conflicting"
+    enable_setting = "conflicting_enable"
+
+    def __init__(self):
+        super().__init__()
+        self.errors = [OperationalError("database is locked")] * 2
+
+    def execute(self, model):
+        group = Group.objects.create(name="conflicting")
+        self.context.identity_map.add(group, "name")
+        if self.errors:
+            raise self.errors.pop()
+
+
+OBJECT_SOURCE = {"conflicting_enable": True, "conflicting": {}}
+
+
+def make_error(error_class, cause):
+    error = error_class("error")
+    error.__cause__ = cause
+    return error
+
+
+def test_is_transient_error():
+    class PostgresError(Exception):
+        def __init__(self, sqlstate):
+            self.sqlstate = sqlstate
+
+    assert is_transient_error(make_error(OperationalError, PostgresError("40P01")))
+    assert is_transient_error(OperationalError("database is locked"))
+
+    # These errors cannot be resolved by retrying from the savepoint of the step
+    assert not is_transient_error(make_error(OperationalError, PostgresError("40001")))
+    assert not is_transient_error(
+        make_error(OperationalError, Exception(1213, "Deadlock found"))
+    )
+
+    assert not is_transient_error(make_error(IntegrityError, PostgresError("23505")))
+    assert not is_transient_error(OperationalError("no such table: foo"))
+    assert not is_transient_error(ValueError("database is locked"))
+
+
+def test_retry_delay_is_jittered_and_bounded():
+    delays = [get_retry_delay(3, backoff=0.1, max_delay=0.5) for _ in range(100)]
+
+    assert all(0 <= delay <= 0.5 for delay in delays)
+    assert len(set(delays)) > 1
+
+
+def test_step_is_retried_on_transient_errors():
+    runner = SetupConfigurationRunner(
+        steps=[ConflictingStep],
+        object_source=OBJECT_SOURCE,
+        max_retries=3,
+        retry_backoff=0.01,
+    )
+
+    with mock.patch("django_setup_configuration.runner.time.sleep") as sleep:
+        (result,) = runner.execute_all()
+
+    assert result.run_exception is None
+    assert result.retries == 2
+    assert result.retry_wait == pytest.approx(
+        sum(call.args[0] for call in sleep.call_args_list)
+    )
+    # The changes of the failed attempts were rolled back
+    assert Group.objects.get().name == "conflicting"
+    assert len(runner.context.identity_map) == 1
+
+
+def test_step_fails_once_retries_are_exhausted():
+    runner = SetupConfigurationRunner(
+        steps=[ConflictingStep],
+        object_source=OBJECT_SOURCE,
+        max_retries=1,
+        retry_backoff=0.01,
+    )
+
+    (result,) = runner.execute_all()
+
+    assert isinstance(result.run_exception, OperationalError)
+    assert result.retries == 1
+    assert not Group.objects.exists()
+    assert len(runner.context.identity_map) == 0
+
+
+def test_steps_are_not_retried_by_default_or_on_other_errors():
+    runner = SetupConfigurationRunner(
+        steps=[ConflictingStep], object_source=OBJECT_SOURCE
+    )
+
+    (result,) = runner.execute_all()
+
+    assert result.retries == 0
+
+    runner = SetupConfigurationRunner(
+        steps=[ConflictingStep], object_source=OBJECT_SOURCE, max_retries=3
+    )
+    runner.configured_steps[0].errors = [OperationalError("no such table: foo")]
+
+    (result,) = runner.execute_all()
+
+    assert isinstance(result.run_exception, OperationalError)
+    assert result.retries == 0
+
+
+def test_command_reports_retries(settings, step_execute_mock, test_step_yaml_path):
+    settings.SETUP_CONFIGURATION_STEPS = [ConfigStep]
+    step_execute_mock.side_effect = [OperationalError("database is locked"), None]
+    stdout = StringIO()
+
+    with mock.patch("django_setup_configuration.runner.time.sleep"):
+        call_command(
+            "setup_configuration",
+            yaml_file=test_step_yaml_path,
+            max_retries=2,
+            stdout=stdout,
+        )
+
+    assert "Successfully executed step: ConfigStep (after 1 retry, waited" in (
+        stdout.getvalue()
+    )
@@ -1,17 +1,24 @@
 from pathlib import Path
+from unittest import mock
 
 import pytest
+import yaml
+from pydantic import ValidationError
 
+from django_setup_configuration.configuration import BaseConfigurationStep
 from django_setup_configuration.exceptions import (
     ConfigurationException,
     PrerequisiteFailed,
     ValidateRequirementsFailure,
 )
+from django_setup_configuration.models import ConfigurationModel
 from django_setup_configuration.runner import (
+    DeferredStep,
     SetupConfigurationRunner,
     StepExecutionResult,
 )
 from django_setup_configuration.test_utils import execute_single_step
+from testapp.configuration import UserConfigurationStep
 from tests.conftest import ConfigModel, ConfigStep
 
 pytestmark = pytest.mark.django_db
@@ -227,3 +234,371 @@ def test_yaml_source_can_be_string_or_path_like(
     )
     assert type(result.step) is ConfigStep
     step_execute_mock.assert_called_once_with(expected_step_config)
+
+
+def test_namespaces_of_disabled_steps_are_not_substituted(
+    step_execute_mock, yaml_file_factory
+):
+    yaml_path = yaml_file_factory(
+        {
+            "test_step_is_enabled": False,
+            "test_step": {
+                "a_string": {"value_from": {"env": "DOES_NOT_EXIST"}},
+                "username": "johndoe",
+            },
+        }
+    )
+    runner = SetupConfigurationRunner(steps=[ConfigStep], yaml_source=yaml_path)
+
+    runner.validate_all_requirements()
+
+    assert runner.enabled_steps == []
+    assert runner.execute_all() == []
+    step_execute_mock.assert_not_called()
+
+
+def test_yaml_sources_are_merged_in_order(
+    step_execute_mock, yaml_file_factory, test_step_valid_config, expected_step_config
+):
+    base_path = yaml_file_factory(test_step_valid_config)
+    overlay_path = yaml_file_factory({"test_step": {"username": "janedoe"}})
+
+    runner = SetupConfigurationRunner(
+        steps=[ConfigStep], yaml_source=[base_path, overlay_path]
+    )
+    results = runner.execute_all()
+
+    assert results[0].config_model == expected_step_config.model_copy(
+        update={"username": "janedoe"}
+    )
+    step_execute_mock.assert_called_once()
+
+
+def test_yaml_source_can_be_a_directory(
+    step_execute_mock, tmp_path, test_step_valid_config, expected_step_config
+):
+    (tmp_path / "00-base.yaml").write_text(yaml.dump(test_step_valid_config))
+    (tmp_path / "10-disable.yaml").write_text("test_step_is_enabled: false\n")
+
+    runner = SetupConfigurationRunner(steps=[ConfigStep], yaml_source=tmp_path)
+
+    assert runner.yaml_sources == [
+        tmp_path / "00-base.yaml",
+        tmp_path / "10-disable.yaml",
+    ]
+    assert runner.enabled_steps == []
+
+
+def test_compiled_snapshot_is_loaded_without_substitution(
+    monkeypatch, tmp_path, step_execute_mock, yaml_file_factory, expected_step_config
+):
+    monkeypatch.setenv("A_STRING", "hello")
+    yaml_path = yaml_file_factory(
+        {
+            "test_step_is_enabled": True,
+            "test_step": {
+                "a_string": {"value_from": {"env": "A_STRING"}},
+                "username": "johndoe",
+                "optional_sub_model": {"another_foo": 42},
+            },
+        }
+    )
+    snapshot_path = tmp_path / "snapshot.json"
+    SetupConfigurationRunner(
+        steps=[ConfigStep], yaml_source=yaml_path
+    ).compile_snapshot(snapshot_path)
+
+    monkeypatch.delenv("A_STRING")
+    runner = SetupConfigurationRunner(steps=[ConfigStep], snapshot_source=snapshot_path)
+    results = runner.execute_all()
+
+    assert results[0].config_model == expected_step_config
+    step_execute_mock.assert_called_once_with(expected_step_config)
+
+
+def test_compile_snapshot_raises_on_invalid_configuration(
+    tmp_path, runner_with_invalid_yaml
+):
+    with pytest.raises(ValidateRequirementsFailure):
+        runner_with_invalid_yaml.compile_snapshot(tmp_path / "snapshot.json")
+
+    assert not (tmp_path / "snapshot.json").exists()
+
+
+def test_steps_declared_with_enable_setting_are_only_imported_if_enabled(
+    step_execute_mock, yaml_file_factory, test_step_valid_config
+):
+    yaml_path = yaml_file_factory(
+        test_step_valid_config | {"missing_step_enabled": False}
+    )
+
+    runner = SetupConfigurationRunner(
+        steps=[
+            ("module.does.not.exist.Step", "missing_step_enabled"),
+            ("tests.conftest.ConfigStep", "test_step_is_enabled"),
+        ],
+        yaml_source=yaml_path,
+    )
+
+    assert [type(step) for step in runner.enabled_steps] == [ConfigStep]
+    assert runner.deferred_steps == [
+        DeferredStep("module.does.not.exist.Step", "missing_step_enabled")
+    ]
+    assert runner.configured_step_paths == [
+        "module.does.not.exist.Step",
+        "tests.conftest.ConfigStep",
+    ]
+    runner.execute_all()
+    step_execute_mock.assert_called_once()
+
+
+def test_enabled_steps_declared_with_enable_setting_are_imported(yaml_file_factory):
+    yaml_path = yaml_file_factory({"missing_step_enabled": True})
+
+    with pytest.raises(ConfigurationException):
+        SetupConfigurationRunner(
+            steps=[("module.does.not.exist.Step", "missing_step_enabled")],
+            yaml_source=yaml_path,
+        )
+
+
+def test_runner_raises_on_mismatched_declared_enable_setting(
+    yaml_file_factory, test_step_valid_config
+):
+    yaml_path = yaml_file_factory(test_step_valid_config | {"other_enabled": True})
+
+    with pytest.raises(ConfigurationException):
+        SetupConfigurationRunner(
+            steps=[("tests.conftest.ConfigStep", "other_enabled")],
+            yaml_source=yaml_path,
+        )
+
+
+def test_source_models_are_not_built_for_disabled_steps(yaml_file_factory):
+    yaml_path = yaml_file_factory({"test_step_is_enabled": False})
+
+    with mock.patch(
+        "django_setup_configuration.runner.create_config_source_models"
+    ) as create_config_source_models:
+        runner = SetupConfigurationRunner(steps=[ConfigStep], yaml_source=yaml_path)
+        runner.validate_all_requirements()
+
+    assert runner.disabled_steps == runner.configured_steps
+    create_config_source_models.assert_not_called()
+
+
+@pytest.mark.parametrize(
+    "only,exclude,expected_steps",
+    (
+        (["tests.conftest.ConfigStep"], None, [ConfigStep]),
+        (["test_step"], None, [ConfigStep]),
+        (["test_*"], None, [ConfigStep]),
+        (["testapp.*"], None, [UserConfigurationStep]),
+        (None, ["tests.*"], [UserConfigurationStep]),
+        (None, ["user_*"], [ConfigStep]),
+        (["*"], ["test_step"], [UserConfigurationStep]),
+        (["does.not.Match"], None, []),
+    ),
+)
+def test_steps_can_be_selected(only, exclude, expected_steps, test_step_yaml_path):
+    runner = SetupConfigurationRunner(
+        steps=[ConfigStep, UserConfigurationStep],
+        yaml_source=test_step_yaml_path,
+        only=only,
+        exclude=exclude,
+    )
+
+    assert [type(step) for step in runner.configured_steps] == expected_steps
+
+
+def test_steps_outside_selection_are_not_imported(
+    step_execute_mock, yaml_file_factory, test_step_valid_config
+):
+    runner = SetupConfigurationRunner(
+        steps=["module.does.not.exist.Step", "tests.conftest.ConfigStep"],
+        yaml_source=yaml_file_factory(test_step_valid_config),
+        exclude=["module.does.*"],
+    )
+    runner.execute_all()
+
+    assert runner.configured_step_paths == ["tests.conftest.ConfigStep"]
+    step_execute_mock.assert_called_once()
+
+
+@pytest.fixture()
+def yaml_path_with_two_invalid_steps(yaml_file_factory):
+    return yaml_file_factory(
+        {
+            "user_configuration_enabled": True,
+            "user_configuration": {"username": None},
+            "test_step_is_enabled": True,
+            "test_step": {"a_string": 42, "username": None},
+        }
+    )
+
+
+@pytest.mark.parametrize(
+    "workers,fail_fast,expected_failures",
+    (
+        (1, True, 1),
+        (1, 2, 2),
+        (1, 0, 2),
+        # Both steps are validated concurrently, so both errors are reported
+        (2, True, 2),
+        (2, 2, 2),
+        (2, 0, 2),
+    ),
+)
+def test_validate_all_requirements_fail_fast(
+    workers, fail_fast, expected_failures, yaml_path_with_two_invalid_steps
+):
+    runner = SetupConfigurationRunner(
+        steps=[UserConfigurationStep, ConfigStep],
+        yaml_source=yaml_path_with_two_invalid_steps,
+    )
+
+    with pytest.raises(ValidateRequirementsFailure) as excinfo:
+        runner.validate_all_requirements(fail_fast=fail_fast, workers=workers)
+
+    assert len(excinfo.value.exceptions) == expected_failures
+    assert len(excinfo.value.unvalidated_steps) == 2 - expected_failures
+
+
+class OtherConfigStep(ConfigStep):
+    verbose_name = "OtherConfigStep"
+    namespace = "other_test_step"
+    enable_setting = "other_test_step_is_enabled"
+
+
+@pytest.mark.parametrize("use_processes", (False, True))
+def test_validate_all_requirements_fail_fast_in_parallel(
+    use_processes, mocker, yaml_file_factory
+):
+    yaml_path = yaml_file_factory(
+        {
+            "user_configuration_enabled": True,
+            "user_configuration": {"username": None},
+            "test_step_is_enabled": True,
+            "test_step": {"a_string": 42, "username": None},
+            "other_test_step_is_enabled": True,
+            "other_test_step": {"a_string": 42, "username": None},
+        }
+    )
+    runner = SetupConfigurationRunner(
+        steps=[UserConfigurationStep, ConfigStep, OtherConfigStep],
+        yaml_source=yaml_path,
+    )
+    get_config_source_models = mocker.spy(runner, "_get_config_source_models")
+
+    with pytest.raises(ValidateRequirementsFailure) as excinfo:
+        runner.validate_all_requirements(
+            fail_fast=True, workers=2, use_processes=use_processes
+        )
+
+    # The second step was in progress when the first one failed, so it is reported
+    # as well, and the third step is not submitted at all
+    assert [type(exc.step) for exc in excinfo.value.exceptions] == [
+        UserConfigurationStep,
+        ConfigStep,
+    ]
+    assert [type(step) for step in excinfo.value.unvalidated_steps] == [OtherConfigStep]
+    if use_processes:
+        # Only the failed steps are validated again in the runner's process
+        assert [
+            type(call.args[0]) for call in get_config_source_models.call_args_list
+        ] == [UserConfigurationStep, ConfigStep]
+
+
+@pytest.mark.parametrize("use_processes", (False, True))
+def test_validate_all_requirements_in_parallel(
+    use_processes, yaml_path_with_two_invalid_steps
+):
+    runner = SetupConfigurationRunner(
+        steps=[UserConfigurationStep, ConfigStep],
+        yaml_source=yaml_path_with_two_invalid_steps,
+    )
+
+    with pytest.raises(ValidateRequirementsFailure) as excinfo:
+        runner.validate_all_requirements(workers=2, use_processes=use_processes)
+
+    # The errors are reported in the configured step order
+    assert [type(exc.step) for exc in excinfo.value.exceptions] == [
+        UserConfigurationStep,
+        ConfigStep,
+    ]
+    assert all(
+        isinstance(exc.validation_error, ValidationError)
+        for exc in excinfo.value.exceptions
+    )
+
+
+@pytest.mark.parametrize("use_processes", (False, True))
+def test_validate_all_requirements_in_parallel_passes_on_valid_config(
+    use_processes, monkeypatch, yaml_file_factory, test_step_valid_config
+):
+    monkeypatch.setenv("USERNAME_FROM_ENV", "demo")
+    yaml_path = yaml_file_factory(
+        {
+            "user_configuration_enabled": True,
+            "user_configuration": {
+                "username": {"value_from": {"env": "USERNAME_FROM_ENV"}},
+                "password": "secret",
+            },
+        }
+        | test_step_valid_config
+    )
+    runner = SetupConfigurationRunner(
+        steps=[UserConfigurationStep, ConfigStep], yaml_source=yaml_path
+    )
+
+    runner.validate_all_requirements(workers=2, use_processes=use_processes)
+
+
+class NestedItem(ConfigurationModel):
+    a: int
+    b: list[str]
+
+
+class NestedConfigModel(ConfigurationModel):
+    items: list[NestedItem]
+
+
+def make_nested_step(index):
+    return type(
+        f"NestedStep{index}",
+        (BaseConfigurationStep,),
+        {
+            "verbose_name": f"Nested step {index}",
+            "config_model": NestedConfigModel,
+            "namespace": f"nested_{index}",
+            "enable_setting": f"nested_{index}_enable",
+            "execute": lambda self, model: None,
+        },
+    )
+
+
+def test_validate_all_requirements_in_threads_with_nested_namespaces(
+    yaml_file_factory,
+):
+    steps = [make_nested_step(index) for index in range(16)]
+    yaml_path = yaml_file_factory(
+        {
+            key: value
+            for step in steps
+            for key, value in (
+                (step.enable_setting, True),
+                (
+                    step.namespace,
+                    {"items": [{"a": i, "b": [str(i)] * 3} for i in range(200)]},
+                ),
+            )
+        }
+    )
+
+    for _ in range(2):
+        runner = SetupConfigurationRunner(steps=steps, yaml_source=yaml_path)
+        runner.validate_all_requirements(workers=8)
+
+        for step in runner.configured_steps:
+            model = runner._validate_requirements_for_step(step)
+            assert [item.a for item in model.items] == list(range(200))
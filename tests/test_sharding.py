@@ -0,0 +1,360 @@
+import json
+import os
+import subprocess
+import sys
+from concurrent.futures import Executor, Future
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+from django.contrib.auth.models import Group
+from django.contrib.sites.models import Site
+from django.core.management import CommandError, call_command
+
+import pytest
+
+from django_setup_configuration.configuration import (
+    BaseConfigurationStep,
+    ShardableConfigurationStep,
+)
+from django_setup_configuration.configuration_models import ConfigurationModel
+from django_setup_configuration.contrib.sites.models import SitesConfigurationModel
+from django_setup_configuration.exceptions import ConfigurationRunFailed
+from django_setup_configuration.runner import (
+    SetupConfigurationRunner,
+    partition_items,
+)
+
+pytestmark = pytest.mark.django_db
+
+
+class ShardedSitesStep(ShardableConfigurationStep[SitesConfigurationModel]):
+    verbose_name = "Sharded sites"
+    config_model = SitesConfigurationModel
+    namespace = "sharded_sites"
+    enable_setting = "sharded_sites_enabled"
+    shards = 3
+
+    def get_items(self, model):
+        return model.items
+
+    def get_item_key(self, item):
+        return item.domain
+
+    def execute_items(self, model, items):
+        for item in items:
+            Site.objects.update_or_create(
+                domain=item.domain, defaults={"name": item.name}
+            )
+
+
+class BulkShardedSitesStep(ShardedSitesStep):
+    def execute_items(self, model, items):
+        # Only writes, so the SQLite workers wait for each other's write locks
+        Site.objects.bulk_create(
+            [Site(domain=item.domain, name=item.name) for item in items]
+        )
+
+
+class ShardedNoOpStep(ShardedSitesStep):
+    def execute_items(self, model, items):
+        pass
+
+
+class FailingShardedSitesStep(ShardedSitesStep):
+    def execute_items(self, model, items):
+        if any(item.domain == "site0.example.com" for item in items):
+            raise ConfigurationRunFailed("Failed shard")
+
+        super().execute_items(model, items)
+
+
+class GroupConfigurationModel(ConfigurationModel):
+    name: str
+
+
+class GroupStep(BaseConfigurationStep[GroupConfigurationModel]):
+    verbose_name = "Group"
+    config_model = GroupConfigurationModel
+    namespace = "group"
+    enable_setting = "group_enabled"
+
+    def execute(self, model):
+        Group.objects.create(name=model.name)
+
+
+class FailingGroupStep(GroupStep):
+    def execute(self, model):
+        raise ConfigurationRunFailed("Failed step")
+
+
+class InlineExecutor(Executor):
+    def submit(self, fn, /, *args, **kwargs):
+        future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except BaseException as exc:
+            future.set_exception(exc)
+        return future
+
+
+# The worker processes are spawned, and set up Django from these settings, so they
+# use the same database file as the command
+WORKER_SETTINGS = """
+from testapp.settings import *
+
+DATABASES = {{
+    **DATABASES,
+    "default": {{
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": {database!r},
+        "OPTIONS": {{"init_command": "PRAGMA journal_mode=WAL;", "timeout": 60}},
+    }},
+}}
+SETUP_CONFIGURATION_STEPS = [
+    "tests.test_sharding.BulkShardedSitesStep",
+    "tests.test_sharding.FailingGroupStep",
+]
+"""
+
+WORKER_RUN_SCRIPT = """
+import io, json, sys
+import django
+from django.core.management import CommandError, call_command
+
+django.setup()
+call_command("migrate", verbosity=0)
+
+from django.contrib.auth.models import Group
+from django.contrib.sites.models import Site
+
+try:
+    call_command("setup_configuration", yaml_file=sys.argv[1], stdout=io.StringIO())
+except CommandError as exc:
+    error = str(exc)
+json.dump(
+    {
+        "error": error,
+        "sites": Site.objects.filter(domain__startswith="site").count(),
+        "groups": Group.objects.count(),
+    },
+    sys.stdout,
+)
+"""
+
+
+@pytest.fixture()
+def sites_config():
+    return {
+        "sharded_sites_enabled": True,
+        "sharded_sites": {
+            "items": [
+                {"domain": f"site{i}.example.com", "name": f"Site {i}"}
+                for i in range(20)
+            ]
+        },
+    }
+
+
+def test_partition_items_is_stable_and_complete():
+    items = [f"item-{i}" for i in range(100)]
+
+    partitions = partition_items(items, key=str, shards=4)
+
+    assert len(partitions) == 4
+    assert sorted(item for partition in partitions for item in partition) == sorted(
+        items
+    )
+    assert partition_items(items, key=str, shards=4) == partitions
+
+
+def test_sharded_step_results_are_merged(sites_config):
+    runner = SetupConfigurationRunner(
+        steps=[ShardedSitesStep], object_source=sites_config
+    )
+
+    with mock.patch.object(
+        SetupConfigurationRunner,
+        "_get_shard_executor",
+        return_value=InlineExecutor(),
+    ):
+        (result,) = runner.execute_all()
+
+    assert result.run_exception is None
+    assert result.item_count == 20
+    assert 1 < len(result.shard_results) <= 3
+    assert all(shard_result.duration >= 0 for shard_result in result.shard_results)
+    assert Site.objects.filter(domain__startswith="site").count() == 20
+
+
+def test_sharded_step_reports_shard_failures(sites_config):
+    runner = SetupConfigurationRunner(
+        steps=[FailingShardedSitesStep], object_source=sites_config
+    )
+
+    with mock.patch.object(
+        SetupConfigurationRunner,
+        "_get_shard_executor",
+        return_value=InlineExecutor(),
+    ):
+        (result,) = runner.execute_all()
+
+    assert isinstance(result.run_exception, ConfigurationRunFailed)
+
+
+def test_unsharded_step_runs_in_process(sites_config):
+    with mock.patch.object(ShardedSitesStep, "shards", 1):
+        runner = SetupConfigurationRunner(
+            steps=[ShardedSitesStep], object_source=sites_config
+        )
+        (result,) = runner.execute_all()
+
+    assert result.run_exception is None
+    assert result.shard_results == ()
+    assert result.item_count is None
+    assert Site.objects.filter(domain__startswith="site").count() == 20
+
+
+def test_sharded_step_runs_in_worker_processes(sites_config):
+    runner = SetupConfigurationRunner(
+        steps=[ShardedNoOpStep], object_source=sites_config
+    )
+
+    (result,) = runner.execute_all()
+
+    assert result.run_exception is None
+    assert result.item_count == 20
+
+
+def test_sharded_step_after_other_steps_runs_in_process(sites_config):
+    runner = SetupConfigurationRunner(
+        steps=[GroupStep, ShardedSitesStep],
+        object_source={
+            **sites_config,
+            "group_enabled": True,
+            "group": {"name": "editors"},
+        },
+    )
+
+    with mock.patch.object(
+        SetupConfigurationRunner, "_get_shard_executor"
+    ) as get_shard_executor:
+        group_result, sites_result = runner.execute_all()
+
+    get_shard_executor.assert_not_called()
+    assert group_result.run_exception is None
+    assert sites_result.run_exception is None
+    assert sites_result.shard_results == ()
+    assert Group.objects.filter(name="editors").exists()
+    assert Site.objects.filter(domain__startswith="site").count() == 20
+
+
+def test_sharded_steps_before_other_steps_run_in_worker_processes(sites_config):
+    runner = SetupConfigurationRunner(
+        steps=[ShardedSitesStep, GroupStep],
+        object_source={
+            **sites_config,
+            "group_enabled": True,
+            "group": {"name": "editors"},
+        },
+    )
+
+    with mock.patch.object(
+        SetupConfigurationRunner,
+        "_get_shard_executor",
+        return_value=InlineExecutor(),
+    ):
+        sites_result, group_result = runner.execute_all()
+
+    assert sites_result.run_exception is None
+    assert sites_result.item_count == 20
+    assert group_result.run_exception is None
+
+
+def test_command_names_the_committed_sharded_steps(
+    settings, sites_config, yaml_file_factory
+):
+    settings.SETUP_CONFIGURATION_STEPS = [ShardedSitesStep, FailingGroupStep]
+    yaml_file = yaml_file_factory(
+        {**sites_config, "group_enabled": True, "group": {"name": "editors"}}
+    )
+
+    with (
+        mock.patch.object(
+            SetupConfigurationRunner,
+            "_get_shard_executor",
+            return_value=InlineExecutor(),
+        ),
+        pytest.raises(CommandError) as exc,
+    ):
+        call_command(
+            "setup_configuration",
+            yaml_file=yaml_file,
+            stdout=StringIO(),
+            stderr=StringIO(),
+        )
+
+    assert str(exc.value) == (
+        "Aborting run due to a failed step. All database changes have been rolled "
+        "back, except those of the sharded steps `Sharded sites`, which were "
+        "committed by their worker processes."
+    )
+
+
+def test_command_names_the_failed_sharded_steps(
+    sites_config, settings, yaml_file_factory
+):
+    settings.SETUP_CONFIGURATION_STEPS = [FailingShardedSitesStep]
+
+    with (
+        mock.patch.object(
+            SetupConfigurationRunner,
+            "_get_shard_executor",
+            return_value=InlineExecutor(),
+        ),
+        pytest.raises(CommandError) as exc,
+    ):
+        call_command(
+            "setup_configuration",
+            yaml_file=yaml_file_factory(sites_config),
+            stdout=StringIO(),
+            stderr=StringIO(),
+        )
+
+    assert "`Sharded sites` (only the shards which succeeded)" in str(exc.value)
+
+
+def test_sharded_step_changes_are_committed_by_worker_processes(
+    tmp_path, sites_config, yaml_file_factory
+):
+    (tmp_path / "worker_settings.py").write_text(
+        WORKER_SETTINGS.format(database=str(tmp_path / "db.sqlite3"))
+    )
+    yaml_file = yaml_file_factory(
+        {**sites_config, "group_enabled": True, "group": {"name": "editors"}}
+    )
+    root = Path(__file__).resolve().parent.parent
+
+    result = subprocess.run(
+        [sys.executable, "-c", WORKER_RUN_SCRIPT, yaml_file],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=root,
+        env={
+            **os.environ,
+            "DJANGO_SETTINGS_MODULE": "worker_settings",
+            "PYTHONPATH": os.pathsep.join([str(tmp_path), str(root)]),
+        },
+    )
+
+    # The failed step is rolled back, but the shards were committed by the workers
+    assert json.loads(result.stdout) == {
+        "error": (
+            "Aborting run due to a failed step. All database changes have been "
+            "rolled back, except those of the sharded steps `Sharded sites`, which "
+            "were committed by their worker processes."
+        ),
+        "sites": 20,
+        "groups": 0,
+    }
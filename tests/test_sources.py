@@ -0,0 +1,330 @@
+import bz2
+import gzip
+import io
+from unittest import mock
+
+import pytest
+
+from django_setup_configuration import sources
+from django_setup_configuration.exceptions import ConfigurationException
+from django_setup_configuration.sources import (
+    SOURCE_FORMATS,
+    STDIN,
+    ConfigDocument,
+    SourceFormat,
+    get_source_format,
+    load_snapshot,
+    load_source,
+    load_sources,
+    load_yaml_document,
+    read_source,
+    register_source_format,
+    resolve_source_paths,
+    write_snapshot,
+)
+
+
+def test_yaml_document_only_converts_requested_keys():
+    document = load_yaml_document("enabled: true\nfoo:\n  bar: 1\nbaz:\n  - 1\n  - 2\n")
+    construct = mock.Mock(wraps=document._construct)
+    document._construct = construct
+
+    assert set(document.keys()) == {"enabled", "foo", "baz"}
+    assert document.get("foo") == {"bar": 1}
+    assert document.get("foo") == {"bar": 1}
+
+    construct.assert_called_once()
+
+
+def test_yaml_document_substitutes_only_requested_keys(monkeypatch):
+    monkeypatch.setenv("FOO_VAR", "from env")
+    document = load_yaml_document(
+        """
+        foo:
+          bar:
+            value_from:
+              env: FOO_VAR
+        disabled_namespace:
+          bar:
+            value_from:
+              env: MISSING_VAR
+        """
+    )
+
+    assert document.to_dict(["foo"]) == {"foo": {"bar": "from env"}}
+
+    with pytest.raises(ValueError):
+        document.get("disabled_namespace")
+
+
+def test_yaml_document_omits_top_level_keys_resolving_to_omitted_values():
+    document = load_yaml_document(
+        "foo:\n  value_from:\n    env: MISSING_VAR\n    required: false\nbar: 1\n"
+    )
+
+    assert "foo" in document
+    assert document.get("foo", "default") == "default"
+    assert document.to_dict() == {"bar": 1}
+
+
+def test_yaml_document_resolves_anchors_and_merge_keys_across_namespaces():
+    document = load_yaml_document(
+        """
+        base: &base
+          foo: 1
+        other:
+          <<: *base
+          bar: 2
+        <<: {merged: true}
+        """
+    )
+
+    assert document.get("other") == {"foo": 1, "bar": 2}
+    assert document.get("merged") is True
+
+
+@pytest.mark.parametrize("content", ("", "# only a comment\n"))
+def test_empty_yaml_document(content):
+    assert load_yaml_document(content).to_dict() == {}
+
+
+def test_yaml_document_with_non_mapping_root_raises():
+    with pytest.raises(ConfigurationException):
+        load_yaml_document("- foo\n- bar\n")
+
+
+def test_load_source(yaml_file_factory):
+    path = yaml_file_factory({"foo": {"bar": [1, 2]}})
+
+    assert load_source(path).to_dict() == {"foo": {"bar": [1, 2]}}
+
+
+def test_document_from_plain_objects():
+    document = ConfigDocument({"foo": {"bar": 1}})
+
+    assert document.get("foo") == {"bar": 1}
+    assert document.get("missing") is None
+
+
+def test_merged_documents_merge_mappings_and_replace_other_values():
+    base = load_yaml_document(
+        """
+        enabled: true
+        namespace:
+          foo: base
+          nested:
+            bar: base
+            baz: base
+          items: [1, 2]
+          secret:
+            value_from:
+              env: BASE_SECRET
+        """
+    )
+    overlay = load_yaml_document(
+        """
+        enabled: false
+        namespace:
+          nested:
+            baz: overlay
+          items: [3]
+          secret:
+            value_from:
+              env: OVERLAY_SECRET
+              default: overlay
+        """
+    )
+
+    document = ConfigDocument.merge([base, overlay])
+
+    assert document.to_dict() == {
+        "enabled": False,
+        "namespace": {
+            "foo": "base",
+            "nested": {"bar": "base", "baz": "overlay"},
+            "items": [3],
+            "secret": "overlay",
+        },
+    }
+
+
+def test_merged_documents_only_merge_keys_touched_by_multiple_documents():
+    base = load_yaml_document("untouched: {foo: 1}\ntouched: {foo: 1}\n")
+    overlay = load_yaml_document("touched: {bar: 2}\n")
+
+    with mock.patch(
+        "django_setup_configuration.sources._deep_merge",
+        wraps=sources._deep_merge,
+    ) as deep_merge:
+        document = ConfigDocument.merge([base, overlay])
+
+        deep_merge.assert_not_called()
+        assert document.get("untouched") == {"foo": 1}
+        deep_merge.assert_not_called()
+        assert document.get("touched") == {"foo": 1, "bar": 2}
+
+    deep_merge.assert_called_once()
+
+
+def test_identical_files_are_only_parsed_once(monkeypatch, yaml_file_factory):
+    monkeypatch.setattr(sources, "_parsed_documents", {})
+    parse = mock.Mock(wraps=load_yaml_document)
+    monkeypatch.setitem(SOURCE_FORMATS, "yaml", SourceFormat("yaml", (".yaml",), parse))
+    first_path = yaml_file_factory({"foo": {"bar": 1}})
+    second_path = yaml_file_factory({"foo": {"bar": 1}})
+
+    first = load_source(first_path)
+    second = load_source(second_path)
+
+    assert first.to_dict() == second.to_dict() == {"foo": {"bar": 1}}
+    parse.assert_called_once()
+
+
+def test_resolve_source_paths_expands_directories_in_order(tmp_path):
+    (tmp_path / "20-overlay.yml").write_text("foo: 2\n")
+    (tmp_path / "10-base.yaml").write_text("foo: 1\n")
+    (tmp_path / "README.txt").write_text("Not a YAML file\n")
+    (tmp_path / "subdirectory").mkdir()
+    extra = tmp_path / "subdirectory" / "extra.yaml"
+    extra.write_text("bar: 1\n")
+
+    assert resolve_source_paths([tmp_path, extra]) == [
+        tmp_path / "10-base.yaml",
+        tmp_path / "20-overlay.yml",
+        extra,
+    ]
+    assert load_sources(tmp_path).to_dict() == {"foo": 2}
+
+
+def test_resolve_source_paths_raises_on_non_existent_path():
+    with pytest.raises(ConfigurationException):
+        resolve_source_paths(["/does/not/exist/anywhere"])
+
+
+@pytest.mark.parametrize(
+    "compress,suffix", ((gzip.compress, ".yaml.gz"), (bz2.compress, ".yml.bz2"))
+)
+def test_compressed_files_are_decompressed(tmp_path, compress, suffix):
+    path = tmp_path / f"config{suffix}"
+    path.write_bytes(compress(b"foo:\n  bar: 1\n"))
+
+    assert resolve_source_paths(tmp_path) == [path]
+    assert load_source(path).to_dict() == {"foo": {"bar": 1}}
+
+
+def test_yaml_resembling_compression_magic_is_not_decompressed():
+    assert read_source(io.BytesIO(b"BZh: 1\n")) == b"BZh: 1\n"
+
+
+def test_stdin_is_read(monkeypatch):
+    stdin = mock.Mock(buffer=io.BytesIO(gzip.compress(b"foo: 1\n")))
+    monkeypatch.setattr("sys.stdin", stdin)
+
+    assert resolve_source_paths(STDIN) == [STDIN]
+    assert load_source(STDIN).to_dict() == {"foo": 1}
+
+
+@pytest.mark.parametrize("stream", (io.StringIO("foo: 1\n"), io.BytesIO(b"foo: 1\n")))
+def test_streams_are_read(stream):
+    assert load_sources([stream]).to_dict() == {"foo": 1}
+
+
+@pytest.mark.parametrize(
+    "filename,content",
+    (
+        ("config.yaml", b"namespace:\n  foo: 1\n  bar: [a, b]\n"),
+        ("config.json", b'{"namespace": {"foo": 1, "bar": ["a", "b"]}}'),
+        ("config.toml", b'[namespace]\nfoo = 1\nbar = ["a", "b"]\n'),
+        (
+            "config.json.gz",
+            gzip.compress(b'{"namespace": {"foo": 1, "bar": ["a", "b"]}}'),
+        ),
+    ),
+)
+def test_source_format_is_detected_from_suffix(tmp_path, filename, content):
+    path = tmp_path / filename
+    path.write_bytes(content)
+
+    assert load_source(path).to_dict() == {"namespace": {"foo": 1, "bar": ["a", "b"]}}
+
+
+@pytest.mark.parametrize(
+    "source_format,content",
+    (
+        ("json", '{"namespace": {"foo": {"value_from": {"env": "FOO_VAR"}}}}'),
+        ("toml", '[namespace.foo.value_from]\nenv = "FOO_VAR"\n'),
+    ),
+)
+def test_explicit_source_format_supports_value_from(
+    monkeypatch, source_format, content
+):
+    monkeypatch.setenv("FOO_VAR", "from env")
+
+    document = load_source(io.StringIO(content), source_format=source_format)
+
+    assert document.to_dict() == {"namespace": {"foo": "from env"}}
+
+
+@pytest.mark.parametrize(
+    "source_format,content",
+    (("json", "[1, 2]"), ("json", "{"), ("toml", "foo = ")),
+)
+def test_invalid_documents_raise(source_format, content):
+    with pytest.raises(ConfigurationException):
+        load_source(io.StringIO(content), source_format=source_format)
+
+
+def test_unknown_source_format_raises():
+    with pytest.raises(ConfigurationException):
+        get_source_format("xml")
+
+
+def test_custom_source_formats_can_be_registered(monkeypatch, tmp_path):
+    monkeypatch.setattr(sources, "SOURCE_FORMATS", dict(SOURCE_FORMATS))
+    register_source_format(
+        SourceFormat(
+            "lines",
+            (".lines",),
+            lambda content: ConfigDocument(
+                dict(line.split("=") for line in content.decode().splitlines())
+            ),
+        )
+    )
+    (tmp_path / "config.lines").write_text("foo=bar\n")
+    (tmp_path / "ignored.txt").write_text("foo=baz\n")
+
+    assert load_sources(tmp_path).to_dict() == {"foo": "bar"}
+
+
+def test_snapshot_round_trip_does_not_substitute(tmp_path):
+    path = tmp_path / "snapshot.json.gz"
+    data = {"enabled": True, "namespace": {"foo": {"value_from": {"env": "FOO"}}}}
+
+    digest = write_snapshot(path, steps=["foo.Step"], data=data)
+
+    assert gzip.decompress(path.read_bytes())
+    assert len(digest) == 64
+    assert load_snapshot(path, steps=["foo.Step"]).to_dict() == data
+
+
+def test_snapshot_for_other_steps_raises(tmp_path):
+    path = tmp_path / "snapshot.json"
+    write_snapshot(path, steps=["foo.Step"], data={"enabled": False})
+
+    with pytest.raises(ConfigurationException, match="different set of steps"):
+        load_snapshot(path, steps=["foo.Step", "bar.Step"])
+
+
+def test_modified_snapshot_raises(tmp_path):
+    path = tmp_path / "snapshot.json"
+    write_snapshot(path, steps=["foo.Step"], data={"enabled": False})
+    path.write_text(path.read_text().replace("false", "true"))
+
+    with pytest.raises(ConfigurationException, match="does not match its hash"):
+        load_snapshot(path, steps=["foo.Step"])
+
+
+@pytest.mark.parametrize("content", ("", "[]", '{"version": 1}'))
+def test_invalid_snapshot_raises(content):
+    with pytest.raises(ConfigurationException):
+        load_snapshot(io.StringIO(content), steps=[])
@@ -0,0 +1,66 @@
+import pytest
+from pydantic import ValidationError
+
+from django_setup_configuration.fields import StreamedList
+from django_setup_configuration.models import ConfigurationModel
+
+
+class Item(ConfigurationModel):
+    name: str
+    value: int
+
+
+class Config(ConfigurationModel):
+    items: StreamedList[Item]
+
+
+@pytest.fixture(autouse=True)
+def small_chunks(monkeypatch):
+    monkeypatch.setattr(StreamedList, "chunk_size", 2)
+
+
+def test_items_are_validated_in_chunks():
+    config = Config(items=[{"name": f"item-{i}", "value": i} for i in range(5)])
+
+    assert len(config.items) == 5
+    assert [len(chunk) for chunk in config.items.chunks()] == [2, 2, 1]
+    assert [item.value for item in config.items] == [0, 1, 2, 3, 4]
+    assert config.items[1] == Item(name="item-1", value=1)
+    assert config.items[3:] == [
+        Item(name="item-3", value=3),
+        Item(name="item-4", value=4),
+    ]
+
+
+def test_errors_are_reported_with_the_item_index():
+    with pytest.raises(ValidationError) as excinfo:
+        Config(
+            items=[
+                {"name": "foo", "value": 1},
+                {"name": "bar", "value": 2},
+                {"name": "baz", "value": "not an int"},
+                {"name": "qux", "value": 3},
+                {"value": 4},
+            ]
+        )
+
+    assert [error["loc"] for error in excinfo.value.errors()] == [
+        ("items", 2, "value"),
+        ("items", 4, "name"),
+    ]
+
+
+def test_non_list_input_is_rejected():
+    with pytest.raises(ValidationError) as excinfo:
+        Config(items=42)
+
+    assert excinfo.value.errors()[0]["type"] == "list_type"
+
+
+def test_serialization_and_equality():
+    config = Config(items=[{"name": "foo", "value": 1}])
+
+    assert config.model_dump() == {"items": [{"name": "foo", "value": 1}]}
+    assert config == Config(items=[Item(name="foo", value=1)])
+    assert config.items == [Item(name="foo", value=1)]
+    assert Config.model_json_schema()["properties"]["items"]["type"] == "array"
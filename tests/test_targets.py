@@ -0,0 +1,238 @@
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import Group
+from django.core.management import CommandError, call_command
+
+import pytest
+import yaml
+
+from django_setup_configuration.configuration import BaseConfigurationStep
+from django_setup_configuration.exceptions import (
+    ImproperlyConfigured,
+    ValidateRequirementsFailure,
+)
+from django_setup_configuration.models import ConfigurationModel
+from django_setup_configuration.runner import SetupConfigurationRunner
+from django_setup_configuration.sources import load_source
+from django_setup_configuration.targets import (
+    RunTarget,
+    execute_targets,
+    execute_targets_iter,
+)
+
+pytestmark = pytest.mark.django_db(databases=["default", "other"])
+
+
+class GroupsConfigurationModel(ConfigurationModel):
+    names: list[str]
+    suffix: str = ""
+
+
+class GroupsStep(BaseConfigurationStep[GroupsConfigurationModel]):
+    verbose_name = "Groups"
+    config_model = GroupsConfigurationModel
+    namespace = "groups"
+    enable_setting = "groups_enable"
+
+    def execute(self, model):
+        for name in model.names:
+            Group.objects.create(name=f"{name}{model.suffix}")
+
+
+@pytest.fixture
+def yaml_files(tmp_path):
+    def write(name, data):
+        path = tmp_path / name
+        path.write_text(yaml.safe_dump(data))
+        return path
+
+    return {
+        "shared": write(
+            "shared.yaml", {"groups_enable": True, "groups": {"names": ["editors"]}}
+        ),
+        "tenant_a": write("tenant_a.yaml", {"groups": {"suffix": " (a)"}}),
+        "tenant_b": write("tenant_b.yaml", {"groups": {"suffix": " (b)"}}),
+        "invalid": write("invalid.yaml", {"groups": {"names": "editors"}}),
+    }
+
+
+def group_names(using):
+    return list(Group.objects.using(using).values_list("name", flat=True))
+
+
+def test_runner_executes_steps_against_database(yaml_files):
+    runner = SetupConfigurationRunner(
+        steps=[GroupsStep], yaml_source=yaml_files["shared"], using="other"
+    )
+
+    (result,) = runner.execute_all()
+
+    assert result.run_exception is None
+    assert group_names("other") == ["editors"]
+    assert group_names("default") == []
+
+
+def test_runner_rolls_back_failed_run_on_database(yaml_files):
+    runner = SetupConfigurationRunner(
+        steps=[GroupsStep], yaml_source=yaml_files["shared"], using="other"
+    )
+    Group.objects.using("other").create(name="editors")
+
+    (result,) = runner.execute_all()
+
+    assert result.run_exception is not None
+    assert group_names("other") == ["editors"]
+
+
+def test_runner_rejects_databases_the_steps_cannot_be_routed_to(settings):
+    with pytest.raises(ImproperlyConfigured, match="not configured"):
+        SetupConfigurationRunner(steps=[GroupsStep], using="unknown")
+
+    settings.DATABASE_ROUTERS = []
+
+    with pytest.raises(ImproperlyConfigured, match="DATABASE_ROUTERS"):
+        SetupConfigurationRunner(steps=[GroupsStep], using="other")
+
+    # The default database does not need the router
+    SetupConfigurationRunner(steps=[GroupsStep])
+
+
+def test_for_database_shares_parsed_and_validated_configuration(yaml_files):
+    runner = SetupConfigurationRunner(
+        steps=[GroupsStep], yaml_source=yaml_files["shared"]
+    )
+    runner.validate_all_requirements()
+
+    other_runner = runner.for_database("other")
+
+    (step,), (other_step,) = runner.configured_steps, other_runner.configured_steps
+    assert other_step is not step
+    assert other_runner.context is not runner.context
+    assert other_runner._get_config_source_models(
+        other_step
+    ) is runner._get_config_source_models(step)
+    assert other_runner._validate_requirements_for_step(
+        other_step
+    ) is runner._validate_requirements_for_step(step)
+
+    other_runner.execute_all()
+
+    assert group_names("other") == ["editors"]
+    assert group_names("default") == []
+
+
+def test_execute_targets_merges_target_configuration(yaml_files):
+    targets = [
+        RunTarget("a", using="default", yaml_source=yaml_files["tenant_a"]),
+        RunTarget("b", using="other", yaml_source=yaml_files["tenant_b"]),
+    ]
+
+    with mock.patch(
+        "django_setup_configuration.runner.load_source", side_effect=load_source
+    ) as load_source_mock:
+        results = execute_targets(
+            targets, yaml_source=yaml_files["shared"], steps=[GroupsStep]
+        )
+
+    assert [result.target for result in results] == targets
+    assert all(result.succeeded for result in results)
+    assert group_names("default") == ["editors (a)"]
+    assert group_names("other") == ["editors (b)"]
+    # The shared file is only parsed once
+    assert load_source_mock.call_count == 3
+
+
+def test_execute_targets_isolates_failed_targets(yaml_files):
+    targets = [
+        RunTarget("a", using="default"),
+        RunTarget("b", using="other", yaml_source=yaml_files["invalid"]),
+    ]
+
+    result_a, result_b = execute_targets(
+        targets, yaml_source=yaml_files["shared"], steps=[GroupsStep]
+    )
+
+    assert result_a.succeeded
+    assert group_names("default") == ["editors"]
+    assert not result_b.succeeded
+    assert isinstance(result_b.exception, ValidateRequirementsFailure)
+    assert group_names("other") == []
+
+
+def test_execute_targets_rejects_invalid_targets():
+    with pytest.raises(ValueError):
+        list(
+            execute_targets_iter(
+                [RunTarget("a"), RunTarget("a", using="other")], steps=[GroupsStep]
+            )
+        )
+
+    with pytest.raises(ImproperlyConfigured):
+        list(execute_targets_iter([RunTarget("a", using="unknown")]))
+
+
+@pytest.mark.django_db(transaction=True, databases=["default", "other"])
+def test_execute_targets_concurrently(yaml_files):
+    targets = [RunTarget("a", using="default"), RunTarget("b", using="other")]
+
+    results = execute_targets(
+        targets, yaml_source=yaml_files["shared"], steps=[GroupsStep], max_workers=2
+    )
+
+    assert all(result.succeeded for result in results)
+    assert group_names("default") == ["editors"]
+    assert group_names("other") == ["editors"]
+
+
+def test_command_executes_steps_per_tenant(settings, yaml_files):
+    settings.SETUP_CONFIGURATION_STEPS = [GroupsStep]
+    stdout = StringIO()
+
+    call_command(
+        "setup_configuration",
+        yaml_file=yaml_files["shared"],
+        tenants=[
+            f"default={yaml_files['tenant_a']}",
+            f"other={yaml_files['tenant_b']}",
+        ],
+        stdout=stdout,
+    )
+
+    output = stdout.getvalue()
+    assert "Executing steps against 2 databases..." in output
+    assert "default: successfully executed 1 steps" in output
+    assert "other: successfully executed 1 steps" in output
+    assert group_names("default") == ["editors (a)"]
+    assert group_names("other") == ["editors (b)"]
+
+
+def test_command_reports_failed_databases(settings, yaml_files):
+    settings.SETUP_CONFIGURATION_STEPS = [GroupsStep]
+    Group.objects.using("other").create(name="editors")
+    stdout, stderr = StringIO(), StringIO()
+
+    with pytest.raises(CommandError, match="Failed to configure 1 of 2 databases"):
+        call_command(
+            "setup_configuration",
+            yaml_file=yaml_files["shared"],
+            databases=["default", "other"],
+            stdout=stdout,
+            stderr=stderr,
+        )
+
+    assert "default: successfully executed 1 steps" in stdout.getvalue()
+    assert "other: failed" in stderr.getvalue()
+    assert "Error while executing step `Groups`" in stderr.getvalue()
+    assert group_names("default") == ["editors"]
+
+
+def test_command_rejects_tenants_with_other_modes(yaml_files):
+    with pytest.raises(CommandError, match="--plan cannot be combined"):
+        call_command(
+            "setup_configuration",
+            yaml_file=yaml_files["shared"],
+            tenants=[f"other={yaml_files['tenant_b']}"],
+            plan=True,
+            stdout=StringIO(),
+        )
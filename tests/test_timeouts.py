@@ -0,0 +1,205 @@
+import time
+from io import StringIO
+
+from django.contrib.auth.models import Group
+from django.core.management import CommandError, call_command
+from django.db import OperationalError, connection, transaction
+
+import pytest
+
+from django_setup_configuration.configuration import BaseConfigurationStep
+from django_setup_configuration.exceptions import ImproperlyConfigured, StepTimeout
+from django_setup_configuration.models import ConfigurationModel
+from django_setup_configuration.runner import SetupConfigurationRunner
+from django_setup_configuration.timeouts import (
+    TimeLimitExceeded,
+    get_sqlstate,
+    limit_duration,
+)
+from tests.conftest import ConfigStep
+
+pytestmark = pytest.mark.django_db
+
+# A query which takes (much) longer than the time limits of the tests
+SLOW_QUERY = """
+    WITH RECURSIVE numbers(n) AS (
+        SELECT 1 UNION ALL SELECT n + 1 FROM numbers WHERE n < 1000000000
+    )
+    SELECT COUNT(*) FROM numbers
+"""
+
+
+def run_slow_query():
+    with connection.cursor() as cursor:
+        cursor.execute(SLOW_QUERY)
+
+
+class EmptyConfigurationModel(ConfigurationModel):
+    pass
+
+
+class SlowQueryStep(BaseConfigurationStep[EmptyConfigurationModel]):
+    verbose_name = "Slow query"
+    config_model = EmptyConfigurationModel
+    namespace = "slow_query"
+    enable_setting = "slow_query_enable"
+    timeout = 0.2
+
+    def execute(self, model):
+        Group.objects.create(name="slow query")
+        run_slow_query()
+
+
+class SleepingStep(SlowQueryStep):
+    verbose_name = "Sleeping"
+    namespace = "sleeping"
+    enable_setting = "sleeping_enable"
+    timeout = None
+
+    def execute(self, model):
+        Group.objects.create(name="sleeping")
+        time.sleep(0.3)
+
+
+class FastStep(SlowQueryStep):
+    verbose_name = "Fast"
+    namespace = "fast"
+    enable_setting = "fast_enable"
+    timeout = None
+
+    def execute(self, model):
+        Group.objects.create(name="fast")
+
+
+OBJECT_SOURCE = {
+    f"{namespace}_enable": True for namespace in ("slow_query", "sleeping", "fast")
+} | {namespace: {} for namespace in ("slow_query", "sleeping", "fast")}
+
+
+def test_limit_duration_interrupts_running_query():
+    start = time.monotonic()
+
+    with (
+        pytest.raises(TimeLimitExceeded) as exc_info,
+        transaction.atomic(),
+        limit_duration(0.1),
+    ):
+        run_slow_query()
+
+    assert time.monotonic() - start < 5
+    assert isinstance(exc_info.value.__cause__, OperationalError)
+
+    # The connection can still be used
+    assert not Group.objects.exists()
+
+
+def test_limit_duration_fails_block_which_took_too_long():
+    with pytest.raises(TimeLimitExceeded), transaction.atomic(), limit_duration(0.1):
+        Group.objects.create(name="sleeping")
+        time.sleep(0.2)
+
+    assert not Group.objects.exists()
+
+
+def test_limit_duration_passes_other_database_errors():
+    with (
+        pytest.raises(OperationalError),
+        transaction.atomic(),
+        limit_duration(5),
+        connection.cursor() as cursor,
+    ):
+        cursor.execute("SELECT * FROM unknown_table")
+
+
+def test_get_sqlstate():
+    class DriverError(Exception):
+        pgcode = "57014"
+
+    error = OperationalError("canceled")
+    error.__cause__ = DriverError()
+
+    assert get_sqlstate(error) == "57014"
+    assert get_sqlstate(OperationalError("other")) is None
+
+
+def test_step_exceeding_its_timeout_fails():
+    runner = SetupConfigurationRunner(
+        steps=[SlowQueryStep, FastStep], object_source=OBJECT_SOURCE
+    )
+
+    slow_result, fast_result = runner.execute_all()
+
+    assert isinstance(slow_result.run_exception, StepTimeout)
+    assert slow_result.run_exception.timeout == 0.2
+    assert str(slow_result.run_exception) == (
+        "Step Slow query did not complete within 0.2s"
+    )
+    assert fast_result.run_exception is None
+    # The run is rolled back
+    assert not Group.objects.exists()
+
+
+def test_step_timeout_of_runner_applies_to_steps_without_timeout():
+    runner = SetupConfigurationRunner(
+        steps=[SleepingStep, FastStep], object_source=OBJECT_SOURCE, step_timeout=0.1
+    )
+
+    sleeping_result, fast_result = runner.execute_all()
+
+    assert isinstance(sleeping_result.run_exception, StepTimeout)
+    assert fast_result.run_exception is None
+
+
+def test_steps_are_not_executed_once_run_timeout_passed():
+    runner = SetupConfigurationRunner(
+        steps=[SleepingStep, FastStep], object_source=OBJECT_SOURCE, timeout=0.2
+    )
+
+    sleeping_result, fast_result = runner.execute_all()
+
+    assert isinstance(sleeping_result.run_exception, StepTimeout)
+    assert sleeping_result.has_run
+    assert isinstance(fast_result.run_exception, StepTimeout)
+    assert not fast_result.has_run
+    assert str(fast_result.run_exception) == (
+        "The time budget of 0.2s for the run was exhausted before step Fast was "
+        "executed"
+    )
+
+
+@pytest.mark.parametrize(
+    "kwargs", [{"step_timeout": 0}, {"timeout": -1}, {"step_timeout": -0.5}]
+)
+def test_runner_rejects_non_positive_timeouts(kwargs):
+    with pytest.raises(ImproperlyConfigured, match="must be a positive number"):
+        SetupConfigurationRunner(
+            steps=[FastStep], object_source=OBJECT_SOURCE, **kwargs
+        )
+
+
+def test_runner_rejects_steps_with_non_positive_timeout():
+    class NoTimeStep(FastStep):
+        timeout = 0
+
+    # Previously failed with a TypeError while reporting the exhausted time budget
+    with pytest.raises(ImproperlyConfigured, match="must be a positive number"):
+        SetupConfigurationRunner(steps=[NoTimeStep], object_source=OBJECT_SOURCE)
+
+
+def test_command_fails_on_step_timeout(
+    settings, step_execute_mock, test_step_yaml_path
+):
+    settings.SETUP_CONFIGURATION_STEPS = [ConfigStep]
+    step_execute_mock.side_effect = lambda model: time.sleep(0.2)
+    stderr = StringIO()
+
+    with pytest.raises(CommandError):
+        call_command(
+            "setup_configuration",
+            yaml_file=test_step_yaml_path,
+            step_timeout=0.1,
+            stdout=StringIO(),
+            stderr=stderr,
+        )
+
+    assert "did not complete within 0.1s" in stderr.getvalue()